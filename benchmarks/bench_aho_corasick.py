@@ -0,0 +1,86 @@
+# benchmarks/bench_aho_corasick.py
+"""
+Compares keyword lists ('word1|word2|...') compiled by the usual pipeline (Thompson
+NFA, subset construction, minimization) with the AhoCorasick engine RegexLib picks
+for alternations of literals. Build time is compile() minus lexing and parsing,
+which both share; scan time is a findall over random text seeded with keywords.
+The usual pipeline only runs up to DFA_MAX_WORDS words, as building it for larger
+lists takes minutes; those cells are shown as '-'. Run from the repository root:
+
+    python -m benchmarks.bench_aho_corasick
+"""
+import random
+import time
+
+from lib.regex_lib import RegexLib
+
+SIZES = [10, 100, 1000, 10000, 50000]
+DFA_MAX_WORDS = 1000
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+INPUT_LENGTH = 200_000
+REPEATS = 3
+
+
+def keywords(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def text_with(rng, words):
+    pieces = []
+    length = 0
+    while length < INPUT_LENGTH:
+        piece = rng.choice(words) if rng.random() < 0.2 else "".join(rng.choice(LETTERS + " ") for _ in range(8))
+        pieces.append(piece)
+        length += len(piece)
+    return "".join(pieces)
+
+
+def build(pattern, shift_and):
+    # Best compile time without lex and parse
+    best = None
+    for _ in range(REPEATS):
+        regex = RegexLib()
+        stats = regex.compile(pattern, shift_and=shift_and)
+        elapsed = stats.total_time - stats.get_phase_time("lex") - stats.get_phase_time("parse")
+        best = elapsed if best is None else min(best, elapsed)
+    return regex, best
+
+
+def scan(regex, text):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        matches = regex.findall(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return matches, best
+
+
+def cell(seconds, scale=1000):
+    return f"{seconds * scale:>10.1f}" if seconds is not None else f"{'-':>10}"
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'words':>6} {'build ms':>21} {'findall ms':>21} {'matches':>8}")
+    print(f"{'':>6} {'dfa':>10}{'aho':>11} {'dfa':>10}{'aho':>11}")
+    for size in SIZES:
+        words = keywords(rng, size)
+        pattern = "|".join(words)
+        text = text_with(rng, words)
+        aho, aho_build = build(pattern, None)
+        assert aho.engine == "aho_corasick"
+        aho_matches, aho_scan = scan(aho, text)
+        dfa = dfa_build = dfa_scan = None
+        if size <= DFA_MAX_WORDS:
+            dfa, dfa_build = build(pattern, False)
+            dfa_matches, dfa_scan = scan(dfa, text)
+            assert dfa_matches == aho_matches, size
+        print(f"{size:>6} {cell(dfa_build)} {cell(aho_build)} {cell(dfa_scan)} {cell(aho_scan)} {len(aho_matches):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_compile_many.py
+"""
+Compiles a generated catalog of rule-like patterns with compile_many for growing
+worker counts and reports throughput and speedup over one worker. Speedup is
+bounded by the number of available cores. Run from the repository root:
+
+    python -m benchmarks.bench_compile_many
+"""
+import os
+import random
+import time
+
+from lib.pattern import compile_many
+
+CATALOG_SIZE = 2000
+PIECES = ["[a-z]+", "[0-9]{2,4}", "(get|post|put)", "\\.", "user", "id=", "(a|b)*c", "[A-F0-9]{8}", "x?y?z?", "-"]
+
+
+def make_catalog(rng, size):
+    catalog = ["".join(rng.choice(PIECES) for _ in range(rng.randint(2, 6))) for _ in range(size)]
+    catalog[::500] = ["(unclosed"] * len(catalog[::500])  # A few failing rules, reported per pattern
+    return catalog
+
+
+def main():
+    rng = random.Random(42)
+    catalog = make_catalog(rng, CATALOG_SIZE)
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{len(catalog)} patterns, {cores} cores available")
+    print(f"{'workers':>7} {'seconds':>8} {'patterns/s':>11} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    workers = 1
+    while workers <= max(cores, 1) * 2:
+        start = time.perf_counter()
+        results = compile_many(catalog, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        errors = sum(not result.ok for result in results)
+        print(f"{workers:>7} {elapsed:>8.2f} {len(catalog) / elapsed:>11.1f} {baseline / elapsed:>8.2f} {errors:>7}")
+        workers *= 2
+    slowest = max(results, key=lambda result: result.seconds)
+    print(f"slowest pattern: {slowest.pattern!r} ({slowest.seconds * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_derivatives.py
+"""
+Compares the derivative engine with the DFA path. Cold numbers include compiling
+(for the DFA path: NFA, subset construction and minimization; for derivatives:
+building the expression) plus a first findall over the input, during which the
+derivative engine creates its states. Warm numbers repeat findall on the same
+compiled instance. Run from the repository root:
+
+    python -m benchmarks.bench_derivatives
+"""
+import random
+import time
+
+from lib.regex_lib import RegexLib
+
+# (name, pattern, input alphabet) - the suffix window has a DFA of over a thousand
+# states; matches end at the rare 'c', so there are few of them
+CASES = [
+    ("small loop", "(a|b)*c{2,3}", "abc"),
+    ("identifier", "[a-z][a-z0-9]*", "abz09 "),
+    ("suffix window", "(a|b)*a(a|b){9}c", "ab" * 25 + "c"),
+]
+INPUT_LENGTH = 20_000
+REPEATS = 3
+
+
+def run(pattern, text, derivatives):
+    regex = RegexLib()
+    start = time.perf_counter()
+    regex.compile(pattern, derivatives=derivatives)
+    matches = regex.findall(text)
+    cold = time.perf_counter() - start
+    warm = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        regex.findall(text)
+        elapsed = time.perf_counter() - start
+        warm = elapsed if warm is None else min(warm, elapsed)
+    return matches, cold, warm
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'case':<14} {'engine':<11} {'cold ms':>9} {'warm Mchar/s':>13}")
+    for name, pattern, alphabet in CASES:
+        text = "".join(rng.choice(alphabet) for _ in range(INPUT_LENGTH))
+        results = {}
+        for engine, derivatives in (("dfa", False), ("derivative", True)):
+            matches, cold, warm = run(pattern, text, derivatives)
+            results[engine] = matches
+            print(f"{name:<14} {engine:<11} {cold * 1000:>9.1f} {len(text) / warm / 1e6:>13.2f}")
+        assert results["dfa"] == results["derivative"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_frontend.py
+"""
+Measures lexing and parsing of megabyte-sized generated patterns: the Lexer's
+get_token, called once per token, against its single-pass scan(), and the Parser
+over the scanned TokenBuffer. 'streamed' is the old front-end path, the Parser
+pulling tokens from get_token; 'scanned' is scan() then parse(), as
+RegexLib.compile does. Both must see the same tokens. On patterns this large much
+of the parse time goes to garbage collector passes over the new AST nodes; the
+library leaves the collector alone, so an application compiling such patterns can
+pause it (gc.disable, or gc.freeze after start-up) around the compile itself.
+Run from the repository root:
+
+    python -m benchmarks.bench_frontend
+"""
+import random
+import time
+
+from lib.lexer import Lexer
+from lib.parser import Parser
+from lib.token import TokenType
+
+PIECES = ["abc", "(x|y)*", "(?:ab)+", "[a-z0-9]", "\\.", "z{2,5}", "q?", "$", "^", "\\b", "(:k)", "7", ".", "|"]
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+SIZES = [100_000, 1_000_000]
+REPEATS = 3
+
+
+def mixed(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        piece = rng.choice(PIECES)
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)
+
+
+def keywords(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10)))
+        words.append(word)
+        length += len(word) + 1
+    return "|".join(words)
+
+
+def get_token_loop(pattern):
+    lexer = Lexer(pattern)
+    count = 1
+    while lexer.get_token().type is not TokenType.END:
+        count += 1
+    return count
+
+
+def scan(pattern):
+    return len(Lexer(pattern).scan())
+
+
+def streamed(pattern):
+    return Parser(Lexer(pattern)).parse()
+
+
+def scanned(pattern):
+    return Parser(Lexer(pattern).scan()).parse()
+
+
+def best_time(function, argument):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'shape':<9} {'chars':>9} {'tokens':>8} {'get_token ms':>13} {'scan ms':>8} "
+          f"{'streamed ms':>12} {'scanned ms':>11}")
+    for shape, make in (("mixed", mixed), ("keywords", keywords)):
+        for size in SIZES:
+            pattern = make(rng, size)
+            tokens, loop_time = best_time(get_token_loop, pattern)
+            scanned_tokens, scan_time = best_time(scan, pattern)
+            assert tokens == scanned_tokens
+            streamed_ast, streamed_time = best_time(streamed, pattern)
+            scanned_ast, scanned_time = best_time(scanned, pattern)
+            assert type(streamed_ast) is type(scanned_ast)
+            print(f"{shape:<9} {len(pattern):>9} {tokens:>8} {loop_time * 1000:>13.1f} {scan_time * 1000:>8.1f} "
+                  f"{streamed_time * 1000:>12.1f} {scanned_time * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_fuzzy.py
+"""
+Compares approximate matching with up to k edits done the old way, by generating
+every edit variant of a word and running RegexLib.match on each, with the
+bit-parallel FuzzyMatcher (RegexLib.fuzzy_match). Inputs are words from a small
+vocabulary with OCR-like character noise; both approaches must flag the same
+words. Variants only use characters that occur in the pattern, as others cannot
+help a match. Also reports fuzzy_search throughput over the joined text. Run from
+the repository root:
+
+    python -m benchmarks.bench_fuzzy
+"""
+import random
+import time
+
+from lib.regex_lib import RegexLib
+
+CASES = [
+    ("recogni(s|z)ed", ["recognised", "recognized", "organised", "recession", "cognizant"]),
+    ("(colou?r|grey)s?", ["colours", "color", "greys", "glory", "cooler"]),
+    ("[0-9]{3}-[0-9]{2}", ["555-12", "123-45", "12-345", "9999", "a12-34"]),
+]
+WORDS = 300
+NOISE = 0.08  # Per-character probability of an OCR error
+MAX_ERRORS = (1, 2)
+
+
+def noisy(rng, word, alphabet):
+    chars = []
+    for ch in word:
+        roll = rng.random()
+        if roll < NOISE / 3:
+            continue  # Dropped
+        if roll < 2 * NOISE / 3:
+            ch = rng.choice(alphabet)  # Misread
+        elif roll < NOISE:
+            chars.append(rng.choice(alphabet))  # Spurious
+        chars.append(ch)
+    return "".join(chars)
+
+
+def edit_variants(word, alphabet, max_errors):
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_errors):
+        next_frontier = set()
+        for current in frontier:
+            for i in range(len(current) + 1):
+                if i < len(current):
+                    next_frontier.add(current[:i] + current[i + 1:])
+                for ch in alphabet:
+                    next_frontier.add(current[:i] + ch + current[i:])
+                    if i < len(current):
+                        next_frontier.add(current[:i] + ch + current[i + 1:])
+        next_frontier -= variants
+        variants |= next_frontier
+        frontier = next_frontier
+    return variants
+
+
+def by_variants(regex, words, alphabet, max_errors):
+    return [any(regex.match(variant) for variant in edit_variants(word, alphabet, max_errors)) for word in words]
+
+
+def by_fuzzy(regex, words, max_errors):
+    return [regex.fuzzy_match(word, max_errors) is not None for word in words]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'pattern':<20} {'k':>2} {'hits':>5} {'variants s':>11} {'fuzzy s':>9} {'speedup':>8} {'search Mchar/s':>15}")
+    for pattern, vocabulary in CASES:
+        regex = RegexLib()
+        regex.compile(pattern)
+        regex.fuzzy_match("", 0)  # Builds the position automaton
+        alphabet = sorted(regex.glushkov.alphabet())
+        noise_alphabet = sorted(set("".join(vocabulary)))
+        words = [noisy(rng, rng.choice(vocabulary), noise_alphabet) for _ in range(WORDS)]
+        text = " ".join(words)
+        for max_errors in MAX_ERRORS:
+            expected, variants_time = timed(by_variants, regex, words, alphabet, max_errors)
+            found, fuzzy_time = timed(by_fuzzy, regex, words, max_errors)
+            assert found == expected, pattern
+            _, search_time = timed(regex.fuzzy_search, text, max_errors)
+            print(f"{pattern:<20} {max_errors:>2} {sum(found):>5} {variants_time:>11.3f} {fuzzy_time:>9.3f} "
+                  f"{variants_time / fuzzy_time:>7.0f}x {len(text) / search_time / 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_incremental.py
+"""
+Compares keeping the matches of a document up to date after small edits by
+re-running findall on the whole text with IncrementalMatcher.edit, which rescans
+from the last checkpoint before the edit until its run re-converges with the
+previous one. Edits are random insertions, deletions and replacements of a few
+characters; both approaches must report the same matches. Run from the
+repository root:
+
+    python -m benchmarks.bench_incremental
+"""
+import random
+import time
+
+from lib.regex_lib import RegexLib
+
+PATTERNS = ["[a-z]+@[a-z]+\\.(com|org)", "[0-9]{2,4}-[0-9]{2}", "(ab|ba)+c"]
+DOCUMENT_WORDS = 50_000
+EDITS = 200
+INTERVALS = [256, 1024, 4096]
+VERIFY_EVERY = 50  # Edits between checks against a full findall
+
+
+def document(rng):
+    words = ["contact", "bob@example.com", "12-34", "abbac", "alice@test.org", "lorem", "ipsum", "2024-05"]
+    return " ".join(rng.choice(words) for _ in range(DOCUMENT_WORDS))
+
+
+def random_edit(rng, length):
+    offset = rng.randrange(length)
+    deleted = rng.randint(0, min(4, length - offset))
+    inserted = "".join(rng.choice("abc@.0123 ") for _ in range(rng.randint(0, 4)))
+    return offset, deleted, inserted
+
+
+def main():
+    rng = random.Random(42)
+    text = document(rng)
+    edits = []
+    length = len(text)
+    for _ in range(EDITS):
+        edit = random_edit(rng, length)
+        edits.append(edit)
+        length += len(edit[2]) - edit[1]
+    print(f"document: {len(text)} characters, {EDITS} edits")
+    print(f"{'pattern':<26} {'interval':>8} {'findall ms/edit':>16} {'edit ms':>9} {'rescanned':>10} {'speedup':>8}")
+    for pattern in PATTERNS:
+        regex = RegexLib()
+        regex.compile(pattern, shift_and=False)
+        current = text
+        start = time.perf_counter()
+        for offset, deleted, inserted in edits[:VERIFY_EVERY]:
+            current = current[:offset] + inserted + current[offset + deleted:]
+            regex.findall(current)
+        full_time = (time.perf_counter() - start) / VERIFY_EVERY
+        for interval in INTERVALS:
+            matcher = regex.incremental(text, interval)
+            current = text
+            rescanned = 0
+            elapsed = 0.0
+            for count, (offset, deleted, inserted) in enumerate(edits, 1):
+                start = time.perf_counter()
+                rescanned += matcher.edit(offset, deleted, inserted)
+                elapsed += time.perf_counter() - start
+                current = current[:offset] + inserted + current[offset + deleted:]
+                if count % VERIFY_EVERY == 0:
+                    assert matcher.findall() == regex.findall(current), pattern
+            edit_time = elapsed / EDITS
+            print(f"{pattern:<26} {interval:>8} {full_time * 1000:>16.1f} {edit_time * 1000:>9.3f} "
+                  f"{rescanned // EDITS:>10} {full_time / edit_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_recovery.py
+"""
+Times RegexRecovery.recover_regex on DFAs with tens to hundreds of states and
+reports the size of the recovered pattern. Run from the repository root:
+
+    python -m benchmarks.bench_recovery
+"""
+import random
+import string
+import time
+
+from lib.regex_lib import RegexLib
+from lib.regex_recovery import RegexRecovery
+
+
+def keyword_pattern(count, seed=7):
+    rng = random.Random(seed)
+    words = {"".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8))) for _ in range(count)}
+    return "|".join(sorted(words))
+
+
+# The suffix window family has no short regex reachable by state elimination
+# (output grows exponentially with k), so it is only run at small sizes.
+CASES = [
+    ("suffix window k=3", "(a|b)*a(a|b){3}"),
+    ("suffix window k=4", "(a|b)*a(a|b){4}"),
+    ("keywords x40", keyword_pattern(40)),
+    ("keywords x150", keyword_pattern(150)),
+    ("bounded counter", "(ab|c){0,150}d"),
+    ("date-like", "[0-9]{4}-[0-9]{2}-[0-9]{2}(T[0-9]{2}:[0-9]{2})?"),
+    ("csv row", "([a-z]+,){0,40}[a-z]*"),
+]
+
+
+def main():
+    print(f"{'case':<20} {'states':>7} {'seconds':>9} {'chars':>9}  round-trip")
+    for name, pattern in CASES:
+        regex = RegexLib()
+        regex.compile(pattern)
+        dfa = regex.dfa_min
+        start = time.perf_counter()
+        recovered = RegexRecovery().recover_regex(dfa)
+        elapsed = time.perf_counter() - start
+
+        # The recovered pattern must compile back to a DFA of the same size
+        check = RegexLib()
+        check.compile(recovered)
+        same_size = len(check.dfa_min.states) == len(dfa.states)
+        print(f"{name:<20} {len(dfa.states):>7} {elapsed:>9.4f} {len(recovered):>9}  {'ok' if same_size else 'size differs'}")
+
+
+if __name__ == "__main__":
+    main()
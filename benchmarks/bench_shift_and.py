@@ -0,0 +1,71 @@
+# benchmarks/bench_shift_and.py
+"""
+Finds the crossover between the Shift-And engine and the minimized DFA across
+pattern sizes (number of positions). Two families: literals, whose position
+automaton is linear so a step is a shift, and alternations of short words,
+whose steps go through follow tables (one table up to FULL_TABLE_BITS states,
+per-byte tables beyond). Compile time is compile() of each engine; match time is
+a findall over random text. Run from the repository root:
+
+    python -m benchmarks.bench_shift_and
+"""
+import random
+import time
+
+from lib.regex_lib import RegexLib
+
+SIZES = [2, 4, 8, 11, 16, 32, 64, 128, 256]
+ALPHABET = "abcdefgh "
+INPUT_LENGTH = 100_000
+REPEATS = 3
+
+
+def literal(rng, size):
+    return "".join(rng.choice("abcdefgh") for _ in range(size))
+
+
+def alternation(rng, size):
+    words = []
+    while sum(len(word) for word in words) < size:
+        words.append(literal(rng, min(4, size - sum(len(word) for word in words))))
+    return "(" + "|".join(words) + ")"
+
+
+def best_time(function, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def compile_with(pattern, shift_and):
+    regex = RegexLib()
+    regex.compile(pattern, shift_and=shift_and)
+    return regex
+
+
+def main():
+    rng = random.Random(42)
+    # Random text over the patterns' letters, so attempts run a few steps before failing
+    text = "".join(rng.choice(ALPHABET) for _ in range(INPUT_LENGTH))
+    print(f"{'family':<12} {'size':>5} {'compile ms':>18} {'findall ms':>18}  {'auto':<9}")
+    print(f"{'':<12} {'':>5} {'dfa':>9}{'shift':>9} {'dfa':>9}{'shift':>9}")
+    for family, make in (("literal", literal), ("alternation", alternation)):
+        for size in SIZES:
+            pattern = make(rng, size)
+            dfa, dfa_compile = best_time(compile_with, pattern, False)
+            shift, shift_compile = best_time(compile_with, pattern, True)
+            dfa_matches, dfa_findall = best_time(dfa.findall, text)
+            shift_matches, shift_findall = best_time(shift.findall, text)
+            assert dfa_matches == shift_matches, pattern
+            auto = RegexLib()
+            auto.compile(pattern)
+            print(f"{family:<12} {size:>5} {dfa_compile * 1000:>9.2f}{shift_compile * 1000:>9.2f} "
+                  f"{dfa_findall * 1000:>9.1f}{shift_findall * 1000:>9.1f}  {auto.engine:<9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_tokenizer.py
+"""
+Re-implements the rules of lib.lexer.Lexer as a Tokenizer and compares both on
+large generated patterns, after checking they produce the same token stream.
+Run from the repository root:
+
+    python -m benchmarks.bench_tokenizer
+"""
+import random
+import time
+
+from lib.lexer import Lexer
+from lib.token import TokenType
+from lib.tokenizer import Tokenizer
+
+# Same token types and precedence as Lexer.get_token. Escapes keep their backslash
+# in the token text, where Lexer strips it (except from assertions). Lexer treats
+# line breaks as literals, which '.' does not match, so the generated inputs avoid them.
+LEXER_RULES = [
+    ("BACKREFERENCE", r"\\[0-9]+"),
+    ("ASSERTION", r"\\[AzbB]|\^|\$"),
+    ("ESCAPED_CHAR", r"\\."),
+    ("OR", r"\|"),
+    ("ANY_CHAR", r"\."),
+    ("KLEENE_STAR", r"\*"),
+    ("PLUS", r"\+"),
+    ("QUESTION", r"\?"),
+    ("RANGE_START", r"\["),
+    ("RANGE_END", r"\]"),
+    ("NON_CAPTURING_GROUP_START", r"\(\?:|\(:"),
+    ("GROUP_START", r"\("),
+    ("GROUP_END", r"\)"),
+    ("REPEAT_START", r"\{"),
+    ("REPEAT_END", r"\}"),
+    ("COMMA", r","),
+    ("DIGIT", r"[0-9]+"),
+    ("LITERAL", r"."),
+]
+PIECES = ["abc", "(x|y)*", "(?:ab)+", "[a-z0-9]", "\\.", "\\12", "z{2,5}", "q?", "$", "^", "\\b", "(:k)", "7", "."]
+SIZES = [10_000, 100_000, 1_000_000]
+REPEATS = 3
+
+
+def make_pattern(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        piece = rng.choice(PIECES)
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)
+
+
+def lexer_tokens(pattern):
+    return Lexer(pattern).tokenize()[:-1]  # Without END
+
+
+def same_tokens(lexed, tokenized):
+    if len(lexed) != len(tokenized):
+        return False
+    for token, (name, value, _) in zip(lexed, tokenized):
+        if name in ("ESCAPED_CHAR", "BACKREFERENCE"):
+            value = value[1:]
+        if token.type is not TokenType[name] or token.value != value:
+            return False
+    return True
+
+
+def best_time(function, argument):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    start = time.perf_counter()
+    tokenizer = Tokenizer(LEXER_RULES)
+    print(f"Tokenizer built in {(time.perf_counter() - start) * 1000:.1f}ms, {len(tokenizer.table)} DFA states")
+    print(f"{'chars':>9} {'tokens':>8} {'Lexer':>9} {'Tokenizer':>10}  (Mchar/s)")
+    for size in SIZES:
+        pattern = make_pattern(rng, size)
+        tokens = tokenizer.tokenize(pattern)
+        assert same_tokens(lexer_tokens(pattern), tokens)
+        lexer_time = best_time(lexer_tokens, pattern)
+        tokenizer_time = best_time(tokenizer.tokenize, pattern)
+        print(f"{len(pattern):>9} {len(tokens):>8} {len(pattern) / lexer_time / 1e6:>9.2f} "
+              f"{len(pattern) / tokenizer_time / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# lib/aho_corasick.py
+
+from lib.ast_tree import CharNode, ConcatNode, GroupNode, OrNode
+
+
+def literal_alternatives(ast):
+    """
+    Returns the words of an alternation of literals such as 'foo|bar|(baz)', in
+    pattern order, or None when some branch is anything but a non-empty sequence
+    of characters. A single literal gives a list of one word. The tree is walked
+    iteratively, as keyword lists parse into very deep OrNode chains.
+    """
+    words = []
+    stack = [ast]
+    while stack:
+        node = _unwrap(stack.pop())
+        if isinstance(node, OrNode):
+            stack.append(node.get_right())
+            stack.append(node.get_left())
+            continue
+        word = _literal(node)
+        if not word:
+            return None
+        words.append(word)
+    return words
+
+
+def _unwrap(node):
+    # Groups only matter for backreferences, which make a branch non-literal anyway
+    while isinstance(node, GroupNode):
+        node = node.get_child()
+    return node
+
+
+def _literal(node):
+    chars = []
+    stack = [node]
+    while stack:
+        node = _unwrap(stack.pop())
+        if isinstance(node, ConcatNode):
+            stack.append(node.get_right())
+            stack.append(node.get_left())
+        elif isinstance(node, CharNode):
+            chars.append(node.get_value())
+        else:
+            return None
+    return "".join(chars)
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a set of words: a trie kept in lists indexed by
+    state, with the goto transitions of each state, its depth, its failure link (the
+    state of its longest proper suffix in the trie) and its output link (the state
+    of its longest proper suffix that ends a word). Building it is linear in the
+    total length of the words, and a scan takes one goto per character plus failure
+    links, whose cost is bounded by the characters scanned, however many words
+    there are, plus one output link per word occurrence reported.
+
+    Matches are reported like DFA.findall reports them for the alternation: every
+    occurrence of every word, ordered by start and then by end.
+    """
+    def __init__(self, words):
+        self.words = frozenset(words)
+        goto = [{}]
+        accepting = [False]
+        for word in self.words:
+            state = 0
+            for ch in word:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    accepting.append(False)
+                state = next_state
+            accepting[state] = True
+        self.goto = goto
+        self.accepting = accepting
+        self.fail = [0] * len(goto)
+        self.depth = [0] * len(goto)
+        self.output = [0] * len(goto)  # 0 when no proper suffix ends a word
+        self._link()
+
+    def _link(self):
+        # Breadth-first, so the failure link of a state is set before its children's
+        goto, fail, depth, output, accepting = self.goto, self.fail, self.depth, self.output, self.accepting
+        queue = list(goto[0].values())
+        for state in queue:
+            depth[state] = 1
+        for state in queue:  # Grows while iterating
+            for ch, child in goto[state].items():
+                link = fail[state]
+                while ch not in goto[link] and link:
+                    link = fail[link]
+                link = goto[link].get(ch, 0)
+                fail[child] = link
+                depth[child] = depth[state] + 1
+                output[child] = link if accepting[link] else output[link]
+                queue.append(child)
+
+    def __len__(self):
+        return len(self.goto)
+
+    def match(self, input_str) -> bool:
+        return input_str in self.words
+
+    def findall(self, input_str) -> list:
+        goto, fail, depth, output, accepting = self.goto, self.fail, self.depth, self.output, self.accepting
+        spans = []
+        state = 0
+        end = 0
+        for ch in input_str:
+            end += 1
+            next_state = goto[state].get(ch)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(ch)
+            state = next_state or 0
+            # The words ending here, longest first: the state's own, then along output links
+            found = state if accepting[state] else output[state]
+            while found:
+                spans.append((end - depth[found], end))
+                found = output[found]
+        # Spans come ordered by end; the sort is stable, so ends stay in order per start
+        spans.sort(key=lambda span: span[0])
+        return [input_str[start:end] for start, end in spans]
+
+    def longest_match(self, input_str, start=0):
+        goto, accepting = self.goto, self.accepting
+        state = 0
+        end = None
+        for j in range(start, len(input_str)):
+            state = goto[state].get(input_str[j])
+            if state is None:
+                break
+            if accepting[state]:
+                end = j + 1
+        return end
+
+    def search(self, input_str) -> bool:
+        goto, fail, output, accepting = self.goto, self.fail, self.output, self.accepting
+        state = 0
+        for ch in input_str:
+            next_state = goto[state].get(ch)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(ch)
+            state = next_state or 0
+            if accepting[state] or output[state]:
+                return True
+        return False
+
+    def __repr__(self):
+        return f"AhoCorasick(words={len(self.words)}, states={len(self)})"
@@ -0,0 +1,80 @@
+# lib/anchored_dfa.py
+
+from lib.dfa import DFA
+from lib.errors import RegexError
+from lib.assertions import EDGE, symbol_context
+
+class AnchoredDFA(DFA):
+    """
+    DFA of a pattern with assertions. Every state knows the context of the last
+    symbol read, and state.accepts[context] tells whether it accepts when the next
+    symbol has that context (EDGE at the end of the input); is_final is acceptance
+    at the end of the input. There is one start state per context of the symbol
+    before the match, None where no match can start, so findall skips those
+    positions without reading them.
+    """
+    has_assertions = True
+
+    def __init__(self, start_states, states):
+        super().__init__(start_states[EDGE], states)
+        self.start_states = start_states  # Indexed by context, None for dead starts
+
+    def match(self, input_str):
+        current_state = self.start_states[EDGE]
+        if current_state is None:
+            return False
+        for symbol in input_str:
+            current_state = current_state.get_transition(symbol)
+            if current_state is None:
+                return False
+        return current_state.is_final
+
+    def _spans(self, input_str):
+        # (start, end) of every non-empty match, ordered like DFA.findall
+        length = len(input_str)
+        contexts = [symbol_context(symbol) for symbol in input_str]
+        contexts.append(EDGE)
+        start_states = self.start_states
+        for i in range(length):
+            current_state = start_states[contexts[i - 1] if i else EDGE]
+            if current_state is None:
+                continue
+            for j in range(i, length):
+                current_state = current_state.transitions.get(input_str[j])
+                if current_state is None:
+                    break
+                if current_state.accepts[contexts[j + 1]]:
+                    yield i, j + 1
+
+    def findall(self, input_str):
+        return [input_str[start:end] for start, end in self._spans(input_str)]
+
+    def longest_match(self, input_str, start=0):
+        length = len(input_str)
+        current_state = self.start_states[symbol_context(input_str[start - 1]) if start else EDGE]
+        if current_state is None:
+            return None
+        end = None
+        for j in range(start, length):
+            current_state = current_state.transitions.get(input_str[j])
+            if current_state is None:
+                break
+            if current_state.accepts[symbol_context(input_str[j + 1]) if j + 1 < length else EDGE]:
+                end = j + 1
+        return end
+
+    def search(self, input_str):
+        return next(self._spans(input_str), None) is not None
+
+    def _rebuild(self, new_state_of):
+        start_states = tuple(new_state_of[state] if state is not None else None for state in self.start_states)
+        return AnchoredDFA(start_states, set(new_state_of.values()))
+
+    def complement(self, alphabet=None):
+        raise RegexError("Complement is not supported for patterns with assertions.")
+
+    def _product(self, other, accept, is_dead):
+        raise RegexError("Language operations are not supported for patterns with assertions.")
+
+    def _find_witness(self, other, accept):
+        raise RegexError("Language operations are not supported for patterns with assertions.")
@@ -0,0 +1,66 @@
+# lib/assertions.py
+"""
+Zero-width assertions: ^ and $ (start/end of line), \\A and \\z (start/end of
+input), \\b and \\B (word boundary and its negation).
+
+In the NFA an assertion is an edge labelled "\\0" + kind that is crossed without
+consuming input when it holds at the current position. Whether it holds depends on
+the context of the character before the position (lookbehind) and after it
+(lookahead), so DFA states of patterns with assertions also record the context of
+the last character read, and whether they accept depends on the next character.
+"""
+
+# Context of one side of a position. EDGE is the start of the input seen from the
+# right of the position, or its end seen from the left.
+EDGE = 0
+NEWLINE = 1
+WORD = 2
+OTHER = 3
+CONTEXTS = (EDGE, NEWLINE, WORD, OTHER)
+
+ASSERTION_KINDS = ("^", "$", "A", "z", "b", "B")
+
+
+def assertion_symbol(kind: str) -> str:
+    return "\0" + kind
+
+
+def is_assertion_symbol(symbol) -> bool:
+    return isinstance(symbol, str) and len(symbol) == 2 and symbol[0] == "\0"
+
+
+def holds(kind: str, before: int, after: int) -> bool:
+    if kind == "^":
+        return before == EDGE or before == NEWLINE
+    if kind == "$":
+        return after == EDGE or after == NEWLINE
+    if kind == "A":
+        return before == EDGE
+    if kind == "z":
+        return after == EDGE
+    if kind == "b":
+        return (before == WORD) != (after == WORD)
+    return (before == WORD) == (after == WORD)  # "B"
+
+
+def symbol_context(symbol) -> int:
+    """
+    Context of an input symbol: a character, or a byte value in byte mode. Word
+    characters are alphanumerics and '_'; in byte mode only ASCII ones, so the bytes
+    of a multi-byte character never count as word characters there.
+    """
+    if isinstance(symbol, int):
+        if symbol == 10:
+            return NEWLINE
+        if 48 <= symbol <= 57 or 65 <= symbol <= 90 or 97 <= symbol <= 122 or symbol == 95:
+            return WORD
+        return OTHER
+    if symbol == "\n":
+        return NEWLINE
+    if symbol.isalnum() or symbol == "_":
+        return WORD
+    return OTHER
+
+
+def has_assertions(nfa_states) -> bool:
+    return any(is_assertion_symbol(symbol) for state in nfa_states for symbol in state.get_transitions())
@@ -6,6 +6,28 @@ class ASTTree(ABC):
     def accept(self, visitor):
         pass
 
+    def children(self):
+        return ()
+
+    def set_children(self, children):
+        pass
+
+    def key(self):
+        # Node values that, with the node type and children, identify the subtree
+        return ()
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return type(self) is type(other) and self.key() == other.key() and self.children() == other.children()
+
+    def __hash__(self):
+        # Hashes are cached; NodeTable computes them bottom-up, so deep trees do not recurse
+        cached = self.__dict__.get("_hash")
+        if cached is None:
+            cached = self._hash = hash((type(self).__name__, self.key(), self.children()))
+        return cached
+
 class CharNode(ASTTree):
     def __init__(self, value):
         self.value = value
@@ -13,8 +35,11 @@ class CharNode(ASTTree):
     def get_value(self):
         return self.value
 
+    def key(self):
+        return (self.value,)
+
     def accept(self, visitor):
-        visitor.visit_char_node(self)
+        return visitor.visit_char_node(self)
 
 class ConcatNode(ASTTree):
     def __init__(self, left, right):
@@ -27,8 +52,14 @@ class ConcatNode(ASTTree):
     def get_right(self):
         return self.right
 
+    def children(self):
+        return (self.left, self.right)
+
+    def set_children(self, children):
+        self.left, self.right = children
+
     def accept(self, visitor):
-        visitor.visit_concat_node(self)
+        return visitor.visit_concat_node(self)
 
 class StarNode(ASTTree):
     def __init__(self, child):
@@ -37,8 +68,14 @@ class StarNode(ASTTree):
     def get_child(self):
         return self.child
 
+    def children(self):
+        return (self.child,)
+
+    def set_children(self, children):
+        (self.child,) = children
+
     def accept(self, visitor):
-        visitor.visit_star_node(self)
+        return visitor.visit_star_node(self)
 
 class OrNode(ASTTree):
     def __init__(self, left, right):
@@ -51,8 +88,14 @@ class OrNode(ASTTree):
     def get_right(self):
         return self.right
 
+    def children(self):
+        return (self.left, self.right)
+
+    def set_children(self, children):
+        self.left, self.right = children
+
     def accept(self, visitor):
-        visitor.visit_or_node(self)
+        return visitor.visit_or_node(self)
 
 class GroupNode(ASTTree):
     def __init__(self, child, group_num=None, capturing=True):
@@ -69,11 +112,20 @@ class GroupNode(ASTTree):
     def is_capturing(self):
         return self.capturing
 
+    def key(self):
+        return (self.group_num, self.capturing)
+
+    def children(self):
+        return (self.child,)
+
+    def set_children(self, children):
+        (self.child,) = children
+
     def accept(self, visitor):
         if self.capturing:
-            visitor.visit_capture_group_node(self)
+            return visitor.visit_capture_group_node(self)
         else:
-            visitor.visit_non_capturing_group_node(self)
+            return visitor.visit_non_capturing_group_node(self)
 
 class RepeatNode(ASTTree):
     def __init__(self, child, min_repeats, max_repeats=None):
@@ -90,8 +142,17 @@ class RepeatNode(ASTTree):
     def get_max(self):
         return self.max
 
+    def key(self):
+        return (self.min, self.max)
+
+    def children(self):
+        return (self.child,)
+
+    def set_children(self, children):
+        (self.child,) = children
+
     def accept(self, visitor):
-        visitor.visit_repeat_node(self)
+        return visitor.visit_repeat_node(self)
 
 class RangeNode(ASTTree):
     def __init__(self, ranges, negated=False):
@@ -104,8 +165,11 @@ class RangeNode(ASTTree):
     def is_negated(self):
         return self.negated
 
+    def key(self):
+        return (tuple(self.ranges), self.negated)
+
     def accept(self, visitor):
-        visitor.visit_range_node(self)
+        return visitor.visit_range_node(self)
 
 class BackreferenceNode(ASTTree):
     def __init__(self, group_num):
@@ -114,22 +178,46 @@ class BackreferenceNode(ASTTree):
     def get_group_num(self):
         return self.group_num
 
+    def key(self):
+        return (self.group_num,)
+
     def accept(self, visitor):
-        visitor.visit_backreference_node(self)
+        return visitor.visit_backreference_node(self)
 
 class EmptyNode(ASTTree):
     def accept(self, visitor):
-        visitor.visit_empty_node(self)
+        return visitor.visit_empty_node(self)
+
+class AssertionNode(ASTTree):
+    # Zero-width assertion, kind is one of '^', '$', 'A', 'z', 'b', 'B'
+    def __init__(self, kind):
+        self.kind = kind
+
+    def get_kind(self):
+        return self.kind
+
+    def key(self):
+        return (self.kind,)
+
+    def accept(self, visitor):
+        return visitor.visit_assertion_node(self)
 
 class CharacterSetNode(ASTTree):
-    def __init__(self, characters):
+    def __init__(self, characters, any_char=False):
         self.characters = characters  # Set of characters
+        self.any_char = any_char  # True for '.', whose set is only an ASCII approximation
 
     def get_characters(self):
         return self.characters
 
+    def is_any_char(self):
+        return self.any_char
+
+    def key(self):
+        return (frozenset(self.characters), self.any_char)
+
     def accept(self, visitor):
-        visitor.visit_character_set_node(self)
+        return visitor.visit_character_set_node(self)
 
 class RepeatExactNode(ASTTree):
     def __init__(self, child, exact_repeats):
@@ -142,5 +230,94 @@ class RepeatExactNode(ASTTree):
     def get_exact_repeats(self):
         return self.exact_repeats
 
+    def key(self):
+        return (self.exact_repeats,)
+
+    def children(self):
+        return (self.child,)
+
+    def set_children(self, children):
+        (self.child,) = children
+
+    def accept(self, visitor):
+        return visitor.visit_repeat_exact_node(self)
+
+
+class AndNode(ASTTree):
+    # Intersection 'left&right', only in the extended syntax
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def get_left(self):
+        return self.left
+
+    def get_right(self):
+        return self.right
+
+    def children(self):
+        return (self.left, self.right)
+
+    def set_children(self, children):
+        self.left, self.right = children
+
+    def accept(self, visitor):
+        return visitor.visit_and_node(self)
+
+
+class ComplementNode(ASTTree):
+    # Complement '~child', only in the extended syntax
+    def __init__(self, child):
+        self.child = child
+
+    def get_child(self):
+        return self.child
+
+    def children(self):
+        return (self.child,)
+
+    def set_children(self, children):
+        (self.child,) = children
+
     def accept(self, visitor):
-        visitor.visit_repeat_exact_node(self)
+        return visitor.visit_complement_node(self)
+
+
+class NodeTable:
+    """
+    Hash-consing table: interning a tree maps every subtree onto one shared node per
+    distinct structure, so equal subtrees (within and across patterns) are the same
+    object and can key caches by identity. Interned nodes also get their subtree
+    size in nodes as node.size.
+    """
+    def __init__(self):
+        self.nodes = {}  # (type, key, child ids) -> canonical node
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def clear(self):
+        self.nodes.clear()
+
+    def intern(self, root: ASTTree) -> ASTTree:
+        # Iterative post-order walk, so long concatenation chains do not recurse
+        canonical = {}  # id(node) -> canonical node
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in canonical:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children() if id(child) not in canonical)
+                continue
+            children = tuple(canonical[id(child)] for child in node.children())
+            table_key = (type(node), node.key(), tuple(id(child) for child in children))
+            shared = self.nodes.get(table_key)
+            if shared is None:
+                node.set_children(children)
+                node.size = 1 + sum(child.size for child in children)
+                hash(node)
+                shared = self.nodes[table_key] = node
+            canonical[id(node)] = shared
+        return canonical[id(root)]
@@ -43,6 +43,10 @@ class ASTVisitor(ABC):
     def visit_empty_node(self, node):
         pass
 
+    @abstractmethod
+    def visit_assertion_node(self, node):
+        pass
+
     @abstractmethod
     def visit_character_set_node(self, node):
         pass
@@ -50,3 +54,11 @@ class ASTVisitor(ABC):
     @abstractmethod
     def visit_repeat_exact_node(self, node):
         pass
+
+    @abstractmethod
+    def visit_and_node(self, node):
+        pass
+
+    @abstractmethod
+    def visit_complement_node(self, node):
+        pass
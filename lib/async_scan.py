@@ -0,0 +1,60 @@
+# lib/async_scan.py
+
+import asyncio
+import codecs
+
+from lib.regex_lib import RegexLib
+from lib.stream_scanner import StreamScanner
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_chunks(source, chunk_size):
+    if hasattr(source, "read"):
+        # asyncio.StreamReader, or anything else with an awaitable read(n)
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
+
+
+async def scan_stream(regex: RegexLib, source, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8",
+                      offload_threshold=None, executor=None):
+    """
+    Asynchronously yields (start, end, text) for every match of a compiled RegexLib
+    in a byte stream: an asyncio.StreamReader or any async iterator of bytes.
+
+    Patterns compiled with byte_mode run on the raw bytes (byte offsets, bytes text);
+    otherwise the stream is decoded incrementally with encoding (character offsets).
+    The next chunk is only read once the consumer has taken the matches of the
+    previous one, so a slow consumer leaves data in the reader and the transport
+    applies backpressure. Chunks of at least offload_threshold bytes are scanned in
+    executor (the loop's default executor when None) to keep the event loop free.
+    """
+    regex._require_dfa()
+    scanner = StreamScanner(regex.dfa_min)
+    decoder = None if regex.byte_mode else codecs.getincrementaldecoder(encoding)()
+    loop = asyncio.get_running_loop()
+
+    async def scan(data, size):
+        if offload_threshold is not None and size >= offload_threshold:
+            return await loop.run_in_executor(executor, scanner.feed, data)
+        matches = scanner.feed(data)
+        # Let other tasks run between chunks scanned on the loop itself
+        await asyncio.sleep(0)
+        return matches
+
+    async for chunk in _read_chunks(source, chunk_size):
+        data = decoder.decode(chunk) if decoder else chunk
+        for match in await scan(data, len(chunk)):
+            yield match
+
+    if decoder:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            for match in scanner.feed(tail):
+                yield match
@@ -0,0 +1,56 @@
+# lib/byte_matcher.py
+
+from lib.dfa import DFA
+from lib.errors import RegexError
+
+class ByteMatcher:
+    """
+    Runs a DFA compiled in byte mode over bytes-like buffers (bytes, bytearray,
+    mmap, memoryview) without decoding them. Offsets are byte offsets; UTF-8
+    character offsets can be reported alongside them.
+    """
+    def __init__(self, dfa: DFA):
+        if dfa.has_assertions:
+            raise RegexError("ByteMatcher does not support patterns with assertions.")
+        self.dfa = dfa
+
+    def match(self, buffer) -> bool:
+        current_state = self.dfa.start_state
+        for byte in memoryview(buffer).cast('B'):
+            current_state = current_state.get_transition(byte)
+            if current_state is None:
+                return False
+        return current_state.is_final
+
+    def finditer(self, buffer, char_offsets=False):
+        """
+        Yields (start, end) byte spans of every match, in the same order as DFA.findall.
+        With char_offsets, yields (start, end, char_start, char_end) instead.
+        """
+        view = memoryview(buffer).cast('B')
+        length = len(view)
+        start_state = self.dfa.start_state
+        char_index = 0
+        for i in range(length):
+            if i and view[i - 1] & 0xC0 != 0x80:
+                char_index += 1
+            current_state = start_state
+            chars = 0
+            j = i
+            while j < length:
+                byte = view[j]
+                current_state = current_state.get_transition(byte)
+                if current_state is None:
+                    break
+                if byte & 0xC0 != 0x80:
+                    chars += 1
+                if current_state.is_final:
+                    if char_offsets:
+                        yield i, j + 1, char_index, char_index + chars
+                    else:
+                        yield i, j + 1
+                j += 1
+
+    def findall(self, buffer) -> list:
+        view = memoryview(buffer).cast('B')
+        return [view[start:end].tobytes() for start, end in self.finditer(view)]
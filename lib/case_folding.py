@@ -0,0 +1,100 @@
+# lib/case_folding.py
+"""
+Case-insensitive matching by rewriting the AST: every character, set and range is
+replaced by its case closure (the characters equal to one of its members under
+simple case folding, such as k, K and the Kelvin sign), so the automata built from
+it match the original input with no per-character work.
+"""
+from lib.ast_tree import CharNode, CharacterSetNode, RangeNode
+
+MAX_CASED = 0x1E944  # Past the last code point with a case mapping (Adlam)
+
+_closures = None  # char -> frozenset of its case-equivalent characters, for cased characters only
+
+
+def _simple_fold(ch):
+    # Upper then lower case, ignoring mappings to several characters (as for 'ß' -> 'SS')
+    upper = ch.upper()
+    if len(upper) != 1:
+        upper = ch
+    lower = upper.lower()
+    return lower if len(lower) == 1 else upper
+
+
+def _table():
+    global _closures
+    if _closures is None:
+        classes = {}
+        for code_point in range(MAX_CASED):
+            ch = chr(code_point)
+            folded = _simple_fold(ch)
+            if folded != ch:
+                classes.setdefault(folded, {folded}).add(ch)
+        _closures = {}
+        for members in classes.values():
+            members = frozenset(members)
+            for ch in members:
+                _closures[ch] = members
+    return _closures
+
+
+def case_closure(ch) -> frozenset:
+    return _table().get(ch) or frozenset(ch)
+
+
+def fold_ranges(ranges) -> list:
+    # Adds to (first, last) ranges the case variants of the characters they hold,
+    # merged into ranges of consecutive code points
+    extra = set()
+    for ch, members in _table().items():
+        if ch not in extra and any(first <= ch <= last for first, last in ranges):
+            extra.update(members)
+    code_points = sorted(ord(ch) for ch in extra if not any(first <= ch <= last for first, last in ranges))
+    folded = list(ranges)
+    i = 0
+    while i < len(code_points):
+        j = i
+        while j + 1 < len(code_points) and code_points[j + 1] == code_points[j] + 1:
+            j += 1
+        folded.append((chr(code_points[i]), chr(code_points[j])))
+        i = j + 1
+    return folded
+
+
+def _fold_leaf(node):
+    if isinstance(node, CharNode):
+        members = case_closure(node.get_value())
+        return CharacterSetNode(set(members)) if len(members) > 1 else node
+    if isinstance(node, CharacterSetNode) and not node.is_any_char():
+        characters = set()
+        for ch in node.get_characters():
+            characters |= case_closure(ch)
+        return CharacterSetNode(characters)
+    if isinstance(node, RangeNode):
+        # Folded before negation, so [^a] excludes 'A' as well
+        return RangeNode(fold_ranges(node.get_ranges()), node.is_negated())
+    return node
+
+
+def fold_case(root):
+    """
+    Returns root with its character leaves replaced by their case closures. Inner
+    nodes are updated in place, in an iterative post-order walk so long chains of
+    concatenations or alternatives do not recurse.
+    """
+    folded = {}  # id(node) -> node replacing it
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in folded:
+            continue
+        children = node.children()
+        if not children:
+            folded[id(node)] = _fold_leaf(node)
+        elif not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children if id(child) not in folded)
+        else:
+            node.set_children(tuple(folded[id(child)] for child in children))
+            folded[id(node)] = node
+    return folded[id(root)]
@@ -0,0 +1,61 @@
+# lib/compile_budget.py
+
+import time
+
+from lib.errors import BudgetExceededError
+
+class CompileBudget:
+    """
+    Resource limits for compiling one pattern. A limit of None is unchecked.
+    max_compile_time is in seconds and covers the whole compile. The budget only
+    holds the limits; each compile checks them through the BudgetContext returned by
+    start(), so one budget can be shared by compiles running concurrently.
+    """
+    def __init__(self, max_nfa_states=None, max_dfa_states=None, max_compile_time=None):
+        self.max_nfa_states = max_nfa_states
+        self.max_dfa_states = max_dfa_states
+        self.max_compile_time = max_compile_time
+
+    def start(self) -> "BudgetContext":
+        return BudgetContext(self)
+
+    def __repr__(self):
+        return (f"CompileBudget(max_nfa_states={self.max_nfa_states}, max_dfa_states={self.max_dfa_states}, "
+                f"max_compile_time={self.max_compile_time})")
+
+class BudgetContext:
+    """
+    The limits of a CompileBudget applied to one compile: the clock starts when it
+    is created, and the NFA states counted are those the NFA builder allocates for
+    this compile.
+    """
+    def __init__(self, budget: CompileBudget):
+        self.budget = budget
+        self.started_at = time.perf_counter()
+        self.nfa_states = 0
+
+    def add_nfa_states(self, count):
+        self.nfa_states += count
+
+    def check_time(self, phase):
+        limit = self.budget.max_compile_time
+        if limit is None:
+            return
+        elapsed = time.perf_counter() - self.started_at
+        if elapsed > limit:
+            raise BudgetExceededError("max_compile_time", limit, round(elapsed, 3), phase)
+
+    def check_nfa_states(self, phase="nfa"):
+        limit = self.budget.max_nfa_states
+        if limit is not None and self.nfa_states > limit:
+            raise BudgetExceededError("max_nfa_states", limit, self.nfa_states, phase)
+        self.check_time(phase)
+
+    def check_dfa_states(self, count, phase="determinize"):
+        limit = self.budget.max_dfa_states
+        if limit is not None and count > limit:
+            raise BudgetExceededError("max_dfa_states", limit, count, phase)
+        self.check_time(phase)
+
+    def __repr__(self):
+        return f"BudgetContext(budget={self.budget!r}, nfa_states={self.nfa_states})"
@@ -0,0 +1,111 @@
+# lib/compile_options.py
+
+class CompileOptions:
+    """
+    The choices for compiling a pattern, checked against each other when the options
+    are created, so an invalid combination is reported before any compile starts.
+    Options are immutable and can be shared by any number of compiles.
+
+    engine names the engine to match with: "dfa", "shift_and", "aho_corasick", or
+    one of the simulations "lazy_dfa" and "nfa", which skip the subset construction.
+    With "auto" the Planner picks it from a ComplexityEstimate of the AST, kept with
+    the choice on the plan and stats.plan; when the estimate exceeds the budget's
+    max_nfa_states, BudgetExceededError is raised before any automaton is built.
+    See complexity.plan to check patterns without compiling them.
+
+    With None, the DFA is built, unless shift_and (None by default) picks the
+    ShiftAndMatcher, which runs the position automaton on int bit masks and needs
+    no subset construction, for small patterns it matches about as fast as the DFA
+    (see ShiftAndMatcher.suits). Alternations of literals ('foo|bar|...') are picked
+    up the same way by the AhoCorasick engine, whose build time is linear in the
+    length of the words. A budget, fallback, byte_mode, codegen, derivatives or a
+    fragment cache asks for the usual pipeline instead; shift_and=True always uses
+    the ShiftAndMatcher and False never picks either. The DFA-only methods build the
+    DFA on first use.
+
+    With byte_mode the pattern is lowered to UTF-8 byte sequences, giving a DFA over
+    byte values that matches encoded buffers directly (see finditer_bytes).
+
+    With ignorecase, characters, sets and ranges are replaced by their case closures
+    under Unicode simple case folding right after parsing (see case_folding), so
+    every engine matches the original input case-insensitively at no extra cost.
+    '.' keeps its meaning, and negated sets exclude all case variants.
+
+    Unless optimize is False, the NFA is shrunk by NFAOptimizer (epsilon removal,
+    pruning, merging) before determinization; stats keep the sizes before and after.
+
+    With codegen the minimized DFA is turned into generated Python functions
+    (see CompiledMatcher) used by match/findall.
+
+    With derivatives the pattern is matched by the DerivativeEngine, which builds
+    its states while matching. It also enables the extended syntax with '&'
+    (intersection) and '~' (complement); there is no DFA for the DFA-only methods.
+
+    A CompileBudget limits NFA size, DFA size and compile time. When it is exceeded
+    BudgetExceededError is raised, unless fallback names an engine from
+    FALLBACK_ENGINES to match with instead. NFA overruns always raise, as every
+    engine needs the NFA.
+
+    With trace_memory the peak memory of the compile is recorded in stats.peak_memory.
+
+    Assertions (^ and $ for line starts and ends, \\A and \\z for the input's, \\b and
+    \\B for word boundaries) are compiled into an AnchoredDFA. Such patterns cannot
+    use a fallback engine, derivatives, streaming or incremental matching,
+    finditer_bytes, complement or recover_regex.
+    """
+    __slots__ = ("engine", "byte_mode", "ignorecase", "optimize", "codegen", "derivatives", "shift_and",
+                 "budget", "fallback", "trace_memory")
+
+    ENGINES = ("auto", "dfa", "lazy_dfa", "nfa", "shift_and", "aho_corasick")
+    # Engines that can stand in for the minimized DFA when a compile budget runs out
+    FALLBACK_ENGINES = ("lazy_dfa", "nfa")
+
+    def __init__(self, engine: str = None, byte_mode: bool = False, ignorecase: bool = False,
+                 optimize: bool = True, codegen: bool = False, derivatives: bool = False,
+                 shift_and: bool = None, budget=None, fallback: str = None, trace_memory: bool = False):
+        if fallback is not None and fallback not in self.FALLBACK_ENGINES:
+            raise ValueError(f"Unknown fallback engine: {fallback}")
+        if derivatives and (byte_mode or codegen or fallback):
+            raise ValueError("The derivative engine cannot be combined with byte_mode, codegen or fallback.")
+        if shift_and and (byte_mode or codegen or fallback or derivatives):
+            raise ValueError("The shift_and engine cannot be combined with byte_mode, codegen, fallback or derivatives.")
+        if engine is not None:
+            if engine not in self.ENGINES:
+                raise ValueError(f"Unknown engine: {engine}")
+            if derivatives or shift_and is not None:
+                raise ValueError("engine cannot be combined with derivatives or shift_and.")
+            if engine in ("lazy_dfa", "nfa", "shift_and", "aho_corasick") and codegen:
+                raise ValueError(f"The {engine} engine cannot be combined with codegen.")
+            if engine in ("shift_and", "aho_corasick") and (byte_mode or fallback):
+                raise ValueError(f"The {engine} engine cannot be combined with byte_mode or fallback.")
+        for name, value in (("engine", engine), ("byte_mode", byte_mode), ("ignorecase", ignorecase),
+                            ("optimize", optimize), ("codegen", codegen), ("derivatives", derivatives),
+                            ("shift_and", shift_and), ("budget", budget), ("fallback", fallback),
+                            ("trace_memory", trace_memory)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompileOptions objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CompileOptions objects are immutable")
+
+    def __reduce__(self):
+        return CompileOptions, tuple(getattr(self, name) for name in self.__slots__)
+
+    def fast_paths(self, fragment_cache=None) -> tuple:
+        """
+        Returns (try_fast, forced): whether the Aho-Corasick and Shift-And engines are
+        tried before the DFA, and whether the Shift-And engine was asked for with
+        shift_and=True, so a pattern it cannot handle is an error rather than a DFA.
+        """
+        if self.engine is not None:
+            return False, False
+        if self.shift_and is None:
+            return not (self.budget or self.fallback or self.byte_mode or self.codegen or self.derivatives
+                        or fragment_cache is not None), False
+        return self.shift_and, self.shift_and
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"CompileOptions({fields})"
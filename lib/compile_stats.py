@@ -0,0 +1,105 @@
+# lib/compile_stats.py
+
+from types import MappingProxyType
+
+class CompileStats:
+    """
+    Timings and automaton sizes collected while compiling a single pattern.
+    Phase times are wall-clock seconds keyed by phase name. Stats are frozen once
+    the compile is done (see freeze), so the stats held by a Pattern stay as reported.
+    """
+    PHASES = ("lex", "parse", "plan", "derivatives", "trie", "positions", "nfa", "optimize", "determinize",
+              "minimize", "codegen")
+    _frozen = False
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.phase_times = {}
+        self.nfa_states = 0
+        self.nfa_edges = 0
+        # NFA size after NFAOptimizer, None when the optimize phase did not run
+        self.optimized_nfa_states = None
+        self.optimized_nfa_edges = None
+        self.dfa_states = 0
+        self.min_dfa_states = 0
+        self.alphabet_size = 0
+        self.positions = None  # Size of the position automaton, when one was built
+        self.trie_states = None  # Size of the Aho-Corasick trie, when one was built
+        self.peak_memory = None  # Bytes, only set when memory tracing is enabled
+        self.engine = None  # Engine chosen for matching, e.g. "dfa" or a budget fallback
+        self.fallback_reason = None
+        self.plan = None  # CompilePlan, only set when the engine was planned (engine="auto")
+        # Only set when compiling with a FragmentCache: AST nodes served from it
+        self.total_nodes = None
+        self.reused_nodes = None
+
+    def freeze(self):
+        # Makes the stats read-only, phase_times included; returns them for chaining
+        object.__setattr__(self, "phase_times", MappingProxyType(dict(self.phase_times)))
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("Frozen CompileStats objects are immutable")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise AttributeError("Frozen CompileStats objects are immutable")
+        object.__delattr__(self, name)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["phase_times"] = dict(self.phase_times)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if state.get("_frozen"):
+            object.__setattr__(self, "phase_times", MappingProxyType(state["phase_times"]))
+
+    def get_phase_time(self, phase):
+        return self.phase_times.get(phase, 0.0)
+
+    @property
+    def reuse_ratio(self):
+        if not self.total_nodes:
+            return None
+        return self.reused_nodes / self.total_nodes
+
+    @property
+    def total_time(self):
+        return sum(self.phase_times.values())
+
+    def as_dict(self):
+        return {
+            "pattern": self.pattern,
+            "phase_times": dict(self.phase_times),
+            "total_time": self.total_time,
+            "nfa_states": self.nfa_states,
+            "nfa_edges": self.nfa_edges,
+            "optimized_nfa_states": self.optimized_nfa_states,
+            "optimized_nfa_edges": self.optimized_nfa_edges,
+            "dfa_states": self.dfa_states,
+            "min_dfa_states": self.min_dfa_states,
+            "alphabet_size": self.alphabet_size,
+            "positions": self.positions,
+            "trie_states": self.trie_states,
+            "peak_memory": self.peak_memory,
+            "engine": self.engine,
+            "fallback_reason": self.fallback_reason,
+            "plan": self.plan.as_dict() if self.plan else None,
+            "total_nodes": self.total_nodes,
+            "reused_nodes": self.reused_nodes,
+            "reuse_ratio": self.reuse_ratio,
+        }
+
+    def __repr__(self):
+        times = ", ".join(f"{name}={self.get_phase_time(name) * 1000:.3f}ms" for name in self.PHASES)
+        return (f"CompileStats(pattern={self.pattern!r}, {times}, nfa_states={self.nfa_states}, "
+                f"nfa_edges={self.nfa_edges}, optimized_nfa_states={self.optimized_nfa_states}, "
+                f"optimized_nfa_edges={self.optimized_nfa_edges}, dfa_states={self.dfa_states}, "
+                f"min_dfa_states={self.min_dfa_states}, alphabet_size={self.alphabet_size}, "
+                f"positions={self.positions}, trie_states={self.trie_states}, "
+                f"peak_memory={self.peak_memory}, engine={self.engine!r})")
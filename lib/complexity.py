@@ -0,0 +1,413 @@
+# lib/complexity.py
+"""
+Static cost estimates for a parsed pattern, and the planner that picks a matching
+engine from them. Nothing here builds automata, except the optional probe, which
+runs the subset construction under a small state budget.
+"""
+import string
+
+from lib.ast_visitor import ASTVisitor
+from lib.ast_tree import (CharNode, ConcatNode, GroupNode, StarNode, RepeatNode, RepeatExactNode, OrNode,
+                          RangeNode, CharacterSetNode)
+from lib.aho_corasick import literal_alternatives
+from lib.case_folding import fold_case
+from lib.compile_budget import CompileBudget
+from lib.errors import BudgetExceededError
+from lib.lexer import Lexer
+from lib.parser import Parser
+from lib.nfa_builder_visitor import NFABuilderVisitor
+from lib.nfa_optimizer import NFAOptimizer
+from lib.nfa_to_dfa_converter import NFAtoDFAConverter
+from lib.shift_and import FULL_TABLE_BITS, MAX_LINEAR_POSITIONS
+
+PRINTABLE = frozenset(string.printable)
+MAX_EXPONENT = 64  # Blowup exponents are capped, estimates beyond 2**64 states mean the same
+DEFAULT_MAX_DFA_STATES = 10000  # DFA size the planner accepts when the budget sets none
+MAX_LAZY_NFA_STATES = 5000  # Larger NFAs make lazily built DFA states too slow to be worth caching
+
+
+class ComplexityEstimate:
+    """
+    Static estimates for one pattern:
+
+    nfa_states       states of the Thompson NFA (as built before optimization)
+    positions        character class occurrences once repeats are expanded, i.e. the
+                     size of the position automaton
+    alphabet_size    distinct characters the pattern can match
+    max_expansion    largest number of copies a counted repeat (nested ones multiplied)
+                     makes of a subpattern
+    blowup_exponent  log2 of the DFA states that may be needed to track an unbounded
+                     loop followed by a counted window of overlapping classes, as in
+                     (a|b)*a(a|b){n}; 0 when there is no such shape
+    dfa_states       rough DFA size: positions + 2 ** blowup_exponent
+    linear           the pattern is a plain sequence of classes (no alternation or loop)
+    literals         number of words when the pattern is an alternation of literals, else 0
+
+    probe_dfa_states is the DFA size found by the probe, or None when it did not run
+    or ran out of its budget (probe_exceeded).
+    """
+    def __init__(self, nfa_states, positions, alphabet_size, max_expansion, blowup_exponent, linear,
+                 has_assertions=False, has_backreferences=False, literals=0):
+        self.nfa_states = nfa_states
+        self.positions = positions
+        self.alphabet_size = alphabet_size
+        self.max_expansion = max_expansion
+        self.blowup_exponent = blowup_exponent
+        self.dfa_states = positions + 2 ** blowup_exponent
+        self.linear = linear
+        self.has_assertions = has_assertions
+        self.has_backreferences = has_backreferences
+        self.literals = literals
+        self.probe_dfa_states = None
+        self.probe_exceeded = False
+
+    def as_dict(self):
+        return {
+            "nfa_states": self.nfa_states,
+            "positions": self.positions,
+            "alphabet_size": self.alphabet_size,
+            "max_expansion": self.max_expansion,
+            "blowup_exponent": self.blowup_exponent,
+            "dfa_states": self.dfa_states,
+            "linear": self.linear,
+            "has_assertions": self.has_assertions,
+            "has_backreferences": self.has_backreferences,
+            "literals": self.literals,
+            "probe_dfa_states": self.probe_dfa_states,
+            "probe_exceeded": self.probe_exceeded,
+        }
+
+    def __repr__(self):
+        return (f"ComplexityEstimate(nfa_states={self.nfa_states}, positions={self.positions}, "
+                f"alphabet_size={self.alphabet_size}, max_expansion={self.max_expansion}, "
+                f"blowup_exponent={self.blowup_exponent}, dfa_states={self.dfa_states}, linear={self.linear})")
+
+
+class _NodeInfo:
+    # Estimates of one subtree, combined bottom-up by ComplexityAnalyzer
+    __slots__ = ("nfa_states", "positions", "alphabet", "expansion", "linear")
+
+    def __init__(self, nfa_states, positions, alphabet, expansion=1, linear=True):
+        self.nfa_states = nfa_states
+        self.positions = positions
+        self.alphabet = alphabet
+        self.expansion = expansion
+        self.linear = linear
+
+
+class ComplexityAnalyzer(ASTVisitor):
+    """
+    Computes a ComplexityEstimate from an AST in one pass. Sizes follow the Thompson
+    construction of NFABuilderVisitor; character classes follow it too, so '.' and
+    negated ranges are over printable ASCII.
+    """
+    def __init__(self, shared=None):
+        self.info = None
+        # Pattern-wide findings, shared with child visitors
+        self.shared = shared if shared is not None else {"exponent": 0, "assertions": False, "backreferences": False}
+
+    def analyze(self, ast) -> ComplexityEstimate:
+        info = self._build(ast)
+        shared = self.shared
+        words = literal_alternatives(ast)
+        return ComplexityEstimate(info.nfa_states, info.positions, len(info.alphabet), info.expansion,
+                                  min(shared["exponent"], MAX_EXPONENT), info.linear,
+                                  shared["assertions"], shared["backreferences"], len(words) if words else 0)
+
+    def _build(self, node):
+        visitor = ComplexityAnalyzer(self.shared)
+        node.accept(visitor)
+        return visitor.info
+
+    def _class(self, chars):
+        self.info = _NodeInfo(2, 1, frozenset(chars))
+
+    def _repeat(self, child, copies, looped):
+        # copies of child; looped adds a star around one more copy
+        if looped:
+            copies += 1
+        self.info = _NodeInfo(child.nfa_states * max(copies, 1) + 2, child.positions * copies, child.alphabet,
+                              child.expansion * max(copies, 1), child.linear and not looped)
+
+    def visit_char_node(self, node):
+        self._class(node.get_value())
+
+    def visit_concat_node(self, node):
+        parts = []
+        while isinstance(node, ConcatNode):
+            parts.append(node.get_right())
+            node = node.get_left()
+        parts.append(node)
+        parts.reverse()
+        infos = [self._build(part) for part in parts]
+        alphabet = frozenset().union(*(info.alphabet for info in infos))
+        self.info = _NodeInfo(sum(info.nfa_states for info in infos), sum(info.positions for info in infos),
+                              alphabet, max(info.expansion for info in infos),
+                              all(info.linear for info in infos))
+        # An unbounded loop followed by classes it could also match: the DFA has to
+        # remember which of the following symbols may have started the suffix
+        for index, part in enumerate(parts):
+            if _is_unbounded(part):
+                kinds, _ = _window(parts[index + 1:], infos[index].alphabet)
+                self.shared["exponent"] = max(self.shared["exponent"], _exponent(kinds))
+
+    def visit_star_node(self, node):
+        child = self._build(node.get_child())
+        self._repeat(child, 0, True)
+
+    def visit_or_node(self, node):
+        # Flattened like concatenations, keyword lists make deep OrNode chains
+        branches = []
+        while isinstance(node, OrNode):
+            branches.append(node.get_right())
+            node = node.get_left()
+        branches.append(node)
+        infos = [self._build(branch) for branch in branches]
+        self.info = _NodeInfo(sum(info.nfa_states for info in infos) + 2 * (len(infos) - 1),
+                              sum(info.positions for info in infos),
+                              frozenset().union(*(info.alphabet for info in infos)),
+                              max(info.expansion for info in infos), False)
+
+    def visit_capture_group_node(self, node):
+        child = self._build(node.get_child())
+        self.info = _NodeInfo(child.nfa_states + 2, child.positions, child.alphabet, child.expansion, child.linear)
+
+    def visit_non_capturing_group_node(self, node):
+        self.info = self._build(node.get_child())
+
+    def visit_repeat_node(self, node):
+        child = self._build(node.get_child())
+        max_repeats = node.get_max()
+        if max_repeats is None:
+            self._repeat(child, node.get_min(), True)
+        else:
+            self._repeat(child, max_repeats, False)
+            self.info.linear = child.linear and node.get_min() == max_repeats
+
+    def visit_repeat_exact_node(self, node):
+        child = self._build(node.get_child())
+        self._repeat(child, node.get_exact_repeats(), False)
+
+    def visit_range_node(self, node):
+        chars = set()
+        for first, last in node.get_ranges():
+            chars.update(chr(c) for c in range(ord(first), ord(last) + 1))
+        self._class(PRINTABLE - chars if node.is_negated() else chars)
+
+    def visit_backreference_node(self, node):
+        self.shared["backreferences"] = True
+        self.info = _NodeInfo(2, 0, frozenset())
+
+    def visit_empty_node(self, node):
+        self.info = _NodeInfo(2, 0, frozenset())
+
+    def visit_assertion_node(self, node):
+        self.shared["assertions"] = True
+        self.info = _NodeInfo(2, 0, frozenset())
+
+    def visit_character_set_node(self, node):
+        self._class(node.get_characters())
+
+    def visit_and_node(self, node):
+        left = self._build(node.get_left())
+        right = self._build(node.get_right())
+        self.info = _NodeInfo(left.nfa_states * right.nfa_states, left.positions + right.positions,
+                              left.alphabet & right.alphabet, max(left.expansion, right.expansion), False)
+
+    def visit_complement_node(self, node):
+        child = self._build(node.get_child())
+        self.info = _NodeInfo(child.nfa_states, child.positions, PRINTABLE, child.expansion, False)
+
+
+def _unwrap(node):
+    while isinstance(node, GroupNode):
+        node = node.get_child()
+    return node
+
+
+def _is_unbounded(node):
+    node = _unwrap(node)
+    return isinstance(node, StarNode) or (isinstance(node, RepeatNode) and node.get_max() is None)
+
+
+def _window(parts, loop_alphabet):
+    # Walks the fixed-length stretch after an unbounded loop, up to the first
+    # mandatory class the loop cannot match or the next unbounded loop. Returns
+    # (kinds, blocked), kinds being (narrow, wide) for each position the loop could
+    # also match: narrow when its class lacks some of the loop's characters, wide
+    # when it shares two or more with it. Truncated at MAX_EXPONENT positions
+    kinds = []
+    for part in parts:
+        part_kinds, blocked = _window_of(part, loop_alphabet)
+        kinds.extend(part_kinds)
+        if blocked or len(kinds) >= MAX_EXPONENT:
+            return kinds[:MAX_EXPONENT], True
+    return kinds, False
+
+
+def _window_of(node, loop_alphabet):
+    node = _unwrap(node)
+    alphabet = _single_class(node)
+    if alphabet is not None:
+        overlap = alphabet & loop_alphabet
+        if not overlap:
+            return [], True
+        return [(not loop_alphabet <= alphabet, len(overlap) > 1)], False
+    if _is_unbounded(node):
+        return [], True
+    if isinstance(node, ConcatNode):
+        return _window([node.get_left(), node.get_right()], loop_alphabet)
+    if isinstance(node, OrNode):
+        # Alternatives count as the one needing more states
+        left = _window_of(node.get_left(), loop_alphabet)
+        right = _window_of(node.get_right(), loop_alphabet)
+        widest = left if _exponent(left[0]) >= _exponent(right[0]) else right
+        return widest[0], left[1] and right[1]
+    if isinstance(node, (RepeatNode, RepeatExactNode)):
+        if isinstance(node, RepeatNode):
+            copies, required = node.get_max(), node.get_min() > 0
+        else:
+            copies, required = node.get_exact_repeats(), node.get_exact_repeats() > 0
+        kinds, blocked = _window_of(node.get_child(), loop_alphabet)
+        if blocked:
+            return kinds, required
+        return (kinds * min(copies, MAX_EXPONENT))[:MAX_EXPONENT], False
+    return [], False
+
+
+def _single_class(node):
+    # Characters of a node matching exactly one character, else None
+    node = _unwrap(node)
+    if isinstance(node, (CharNode, RangeNode, CharacterSetNode)):
+        analyzer = ComplexityAnalyzer()
+        return analyzer._build(node).alphabet
+    if isinstance(node, OrNode):
+        left = _single_class(node.get_left())
+        right = _single_class(node.get_right())
+        if left is not None and right is not None:
+            return left | right
+    return None
+
+
+def _exponent(kinds):
+    # Positions from the first narrow class to the last wide one after it: the DFA
+    # has to remember which of them matched the narrow class, as in (a|b)*a(a|b){n}
+    first_narrow = next((index for index, (narrow, _) in enumerate(kinds) if narrow), None)
+    if first_narrow is None:
+        return 0
+    for index in range(len(kinds) - 1, first_narrow - 1, -1):
+        if kinds[index][1]:
+            return index - first_narrow + 1
+    return 0
+
+
+class CompilePlan:
+    """
+    Engine chosen for a pattern, with the reason and the estimates behind it.
+    rejected is set (with the reason) when the estimates exceed the budget; such a
+    pattern is refused by RegexLib.compile(engine="auto") before any automaton is built.
+    """
+    def __init__(self, engine, reason, estimate, rejected=False):
+        self.engine = engine
+        self.reason = reason
+        self.estimate = estimate
+        self.rejected = rejected
+
+    def as_dict(self):
+        return {"engine": self.engine, "reason": self.reason, "rejected": self.rejected,
+                "estimate": self.estimate.as_dict()}
+
+    def __repr__(self):
+        state = "rejected" if self.rejected else self.engine
+        return f"CompilePlan({state!r}, reason={self.reason!r})"
+
+
+class Planner:
+    """
+    Picks an engine from a ComplexityEstimate:
+
+    - aho_corasick for alternations of literals, whatever their number, as it needs
+      no NFA (so the budget does not apply)
+    - shift_and (the literal fast path) for sequences of classes and small patterns,
+      which the position automaton matches as fast as a DFA without compiling one
+    - dfa when the expected DFA fits max_dfa_states, or the probe built it in budget
+    - lazy_dfa when it does not but the NFA is small enough for cached steps to pay
+    - nfa otherwise
+
+    Patterns with assertions or backreferences, and codegen, always get the dfa.
+    With a budget, its limits replace the defaults, and estimates over
+    max_nfa_states reject the pattern.
+    """
+    def __init__(self, budget: CompileBudget = None):
+        self.budget = budget
+
+    def plan(self, estimate: ComplexityEstimate, byte_mode: bool = False, codegen: bool = False) -> CompilePlan:
+        budget = self.budget
+        if estimate.literals > 1 and not (byte_mode or codegen):
+            return CompilePlan("aho_corasick", f"alternation of {estimate.literals} literals", estimate)
+        if budget and budget.max_nfa_states is not None and estimate.nfa_states > budget.max_nfa_states:
+            return CompilePlan(None, f"estimated {estimate.nfa_states} NFA states exceed max_nfa_states="
+                                     f"{budget.max_nfa_states}", estimate, rejected=True)
+        max_dfa_states = budget.max_dfa_states if budget and budget.max_dfa_states is not None \
+            else DEFAULT_MAX_DFA_STATES
+        if estimate.has_assertions or estimate.has_backreferences:
+            return CompilePlan("dfa", "only the DFA supports assertions and backreferences", estimate)
+        if codegen:
+            return CompilePlan("dfa", "codegen needs the DFA", estimate)
+        if not byte_mode:
+            if estimate.linear and estimate.positions <= MAX_LINEAR_POSITIONS:
+                return CompilePlan("shift_and", "literal fast path: sequence of classes", estimate)
+            if estimate.positions + 1 <= FULL_TABLE_BITS:
+                return CompilePlan("shift_and", f"{estimate.positions} positions fit one follow table", estimate)
+        if estimate.probe_dfa_states is not None:
+            return CompilePlan("dfa", f"probe built {estimate.probe_dfa_states} DFA states", estimate)
+        if not estimate.probe_exceeded and estimate.dfa_states <= max_dfa_states:
+            return CompilePlan("dfa", f"estimated {estimate.dfa_states} DFA states", estimate)
+        why = "probe ran out of DFA states" if estimate.probe_exceeded else \
+            f"estimated {estimate.dfa_states} DFA states exceed {max_dfa_states}"
+        if estimate.nfa_states <= MAX_LAZY_NFA_STATES:
+            return CompilePlan("lazy_dfa", why, estimate)
+        return CompilePlan("nfa", f"{why}, NFA of {estimate.nfa_states} states too large to cache", estimate)
+
+
+def probe_dfa(estimate: ComplexityEstimate, nfa, max_dfa_states: int):
+    """
+    Runs the subset construction on nfa with at most max_dfa_states states and
+    records the outcome on estimate (probe_dfa_states or probe_exceeded).
+    """
+    try:
+        dfa = NFAtoDFAConverter(CompileBudget(max_dfa_states=max_dfa_states).start()).convert(nfa)
+    except BudgetExceededError:
+        estimate.probe_exceeded = True
+        return None
+    estimate.probe_dfa_states = len(dfa.states)
+    return dfa
+
+
+def _parse(pattern, ignorecase):
+    ast_tree = Parser(Lexer(pattern).scan()).parse()
+    return fold_case(ast_tree) if ignorecase else ast_tree
+
+
+def analyze(pattern: str, ignorecase: bool = False) -> ComplexityEstimate:
+    return ComplexityAnalyzer().analyze(_parse(pattern, ignorecase))
+
+
+def plan(pattern: str, budget: CompileBudget = None, byte_mode: bool = False, codegen: bool = False,
+         probe: int = 0, ignorecase: bool = False) -> CompilePlan:
+    """
+    Plans the compile of pattern without compiling it, e.g. to reject expensive
+    patterns when a configuration is loaded. With probe, patterns the planner is
+    not sure about (a DFA or a simulation) are also determinized with at
+    most probe DFA states, which settles between the DFA and the simulations; the
+    NFA is built for that, so the probe is skipped when the budget rejects it.
+    """
+    ast_tree = _parse(pattern, ignorecase)
+    estimate = ComplexityAnalyzer().analyze(ast_tree)
+    planner = Planner(budget)
+    result = planner.plan(estimate, byte_mode, codegen)
+    if probe and not result.rejected and result.engine in ("dfa", "lazy_dfa", "nfa") and not estimate.has_assertions:
+        nfa = NFAOptimizer().optimize(NFABuilderVisitor(byte_mode=byte_mode).build(ast_tree))
+        probe_dfa(estimate, nfa, probe)
+        result = planner.plan(estimate, byte_mode, codegen)
+    return result
@@ -0,0 +1,411 @@
+# lib/derivative_engine.py
+
+import string
+
+from lib.ast_visitor import ASTVisitor
+from lib.ast_tree import ConcatNode
+from lib.errors import RegexError
+
+PRINTABLE = frozenset(string.printable)
+
+
+class Expr:
+    """
+    Regular expression in the normal form used for derivatives. Nodes are immutable,
+    compare structurally and compute their hash and nullability when created, from
+    children that already have theirs, so deep expressions never hash recursively.
+    Build them with the make_* constructors, which apply the simplifications that
+    keep the number of distinct derivatives finite.
+    """
+    nullable = False
+
+    def __init__(self):
+        self._hash = hash((type(self).__name__, self.key()))
+
+    def key(self):
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return self is other or (type(self) is type(other) and self._hash == other._hash and self.key() == other.key())
+
+    def __hash__(self):
+        return self._hash
+
+
+class Null(Expr):
+    # The empty language
+    def key(self):
+        return ()
+
+
+class Epsilon(Expr):
+    nullable = True
+
+    def key(self):
+        return ()
+
+
+class Chars(Expr):
+    def __init__(self, chars):
+        self.chars = frozenset(chars)
+        super().__init__()
+
+    def key(self):
+        return self.chars
+
+
+class Cat(Expr):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.nullable = left.nullable and right.nullable
+        super().__init__()
+
+    def key(self):
+        return (self.left, self.right)
+
+
+class Alt(Expr):
+    def __init__(self, items):
+        self.items = items  # frozenset
+        self.nullable = any(item.nullable for item in items)
+        super().__init__()
+
+    def key(self):
+        return self.items
+
+
+class And(Expr):
+    def __init__(self, items):
+        self.items = items  # frozenset
+        self.nullable = all(item.nullable for item in items)
+        super().__init__()
+
+    def key(self):
+        return self.items
+
+
+class Star(Expr):
+    nullable = True
+
+    def __init__(self, child):
+        self.child = child
+        super().__init__()
+
+    def key(self):
+        return self.child
+
+
+class Not(Expr):
+    def __init__(self, child):
+        self.child = child
+        self.nullable = not child.nullable
+        super().__init__()
+
+    def key(self):
+        return self.child
+
+
+NULL = Null()
+EPSILON = Epsilon()
+UNIVERSAL = Not(NULL)
+
+
+def make_cat(left, right):
+    if left is NULL or right is NULL:
+        return NULL
+    if left is EPSILON:
+        return right
+    if right is EPSILON:
+        return left
+    if isinstance(left, Cat):
+        # Keep concatenations right-nested: (ab)c -> a(bc)
+        return make_cat(left.left, make_cat(left.right, right))
+    return Cat(left, right)
+
+
+def make_alt(*exprs):
+    items = set()
+    chars = set()
+    for expr in exprs:
+        for item in (expr.items if isinstance(expr, Alt) else (expr,)):
+            if item is NULL:
+                continue
+            if item == UNIVERSAL:
+                return UNIVERSAL
+            if isinstance(item, Chars):
+                chars |= item.chars  # a|[bc] -> [abc]
+            else:
+                items.add(item)
+    if chars:
+        items.add(Chars(chars))
+    if not items:
+        return NULL
+    if len(items) == 1:
+        return next(iter(items))
+    return Alt(frozenset(items))
+
+
+def make_and(*exprs):
+    items = set()
+    for expr in exprs:
+        for item in (expr.items if isinstance(expr, And) else (expr,)):
+            if item is NULL:
+                return NULL
+            if item != UNIVERSAL:
+                items.add(item)
+    if not items:
+        return UNIVERSAL
+    if len(items) == 1:
+        return next(iter(items))
+    return And(frozenset(items))
+
+
+def make_star(expr):
+    if expr is NULL or expr is EPSILON:
+        return EPSILON
+    if isinstance(expr, Star):
+        return expr
+    return Star(expr)
+
+
+def make_not(expr):
+    if isinstance(expr, Not):
+        return expr.child
+    return Not(expr)
+
+
+def derivative(expr, ch):
+    """
+    Returns the expression for the strings w such that ch + w is in expr's language.
+    """
+    if isinstance(expr, Chars):
+        return EPSILON if ch in expr.chars else NULL
+    if isinstance(expr, Cat):
+        head = make_cat(derivative(expr.left, ch), expr.right)
+        if expr.left.nullable:
+            return make_alt(head, derivative(expr.right, ch))
+        return head
+    if isinstance(expr, Alt):
+        return make_alt(*(derivative(item, ch) for item in expr.items))
+    if isinstance(expr, And):
+        return make_and(*(derivative(item, ch) for item in expr.items))
+    if isinstance(expr, Star):
+        return make_cat(derivative(expr.child, ch), expr)
+    if isinstance(expr, Not):
+        return make_not(derivative(expr.child, ch))
+    return NULL  # Null and Epsilon
+
+
+def class_sets(expr):
+    """
+    Character sets that decide the derivative of expr (Owens, Reppy and Turon):
+    characters that fall into the same sets have the same derivative, so a
+    derivative computed for one character serves its whole class.
+    """
+    sets = []
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, Chars):
+            sets.append(expr.chars)
+        elif isinstance(expr, Cat):
+            stack.append(expr.left)
+            if expr.left.nullable:
+                stack.append(expr.right)
+        elif isinstance(expr, (Alt, And)):
+            stack.extend(expr.items)
+        elif isinstance(expr, (Star, Not)):
+            stack.append(expr.child)
+    return tuple(set(sets))
+
+
+class DerivativeState:
+    def __init__(self, expr):
+        self.expr = expr
+        self.is_final = expr.nullable
+        self.is_dead = expr is NULL
+        self.transitions = {}  # char -> DerivativeState
+        self.class_sets = None  # Computed on first use
+        self.class_transitions = {}  # class key -> DerivativeState
+
+
+class ExprBuilderVisitor(ASTVisitor):
+    """
+    Converts an AST into an Expr. Character classes follow the NFA builder: '.' and
+    negated ranges are taken over printable ASCII, while '~' complements over all
+    strings.
+    """
+    def __init__(self):
+        self.expr = None
+
+    def get_expr(self):
+        return self.expr
+
+    def _build(self, node):
+        visitor = ExprBuilderVisitor()
+        node.accept(visitor)
+        return visitor.get_expr()
+
+    def visit_char_node(self, node):
+        self.expr = Chars(node.get_value())
+
+    def visit_concat_node(self, node):
+        # Walk the left-nested chain and join it from the right, so make_cat does not
+        # re-nest the growing prefix for every element
+        parts = []
+        while isinstance(node, ConcatNode):
+            parts.append(node.get_right())
+            node = node.get_left()
+        parts.append(node)
+        expr = EPSILON
+        for part in parts:
+            expr = make_cat(self._build(part), expr)
+        self.expr = expr
+
+    def visit_star_node(self, node):
+        self.expr = make_star(self._build(node.get_child()))
+
+    def visit_or_node(self, node):
+        self.expr = make_alt(self._build(node.get_left()), self._build(node.get_right()))
+
+    def visit_capture_group_node(self, node):
+        self.expr = self._build(node.get_child())
+
+    def visit_non_capturing_group_node(self, node):
+        self.expr = self._build(node.get_child())
+
+    def visit_backreference_node(self, node):
+        raise RegexError("Backreferences are not supported by the derivative engine")
+
+    def visit_repeat_node(self, node):
+        min_repeats = node.get_min()
+        max_repeats = node.get_max()
+        if max_repeats is not None and min_repeats > max_repeats:
+            raise ValueError("Minimum repeats cannot exceed maximum repeats.")
+        child = self._build(node.get_child())
+        # r{m,n} -> r...r (r(r...)?)? and r{m,} -> r...r r*
+        if max_repeats is None:
+            tail = make_star(child)
+        else:
+            tail = EPSILON
+            for _ in range(max_repeats - min_repeats):
+                tail = make_alt(EPSILON, make_cat(child, tail))
+        for _ in range(min_repeats):
+            tail = make_cat(child, tail)
+        self.expr = tail
+
+    def visit_repeat_exact_node(self, node):
+        exact = node.get_exact_repeats()
+        if exact < 0:
+            raise ValueError("Exact repeats cannot be negative.")
+        child = self._build(node.get_child())
+        expr = EPSILON
+        for _ in range(exact):
+            expr = make_cat(child, expr)
+        self.expr = expr
+
+    def visit_range_node(self, node):
+        chars = set()
+        for first, last in node.get_ranges():
+            chars.update(chr(c) for c in range(ord(first), ord(last) + 1))
+        if node.is_negated():
+            chars = PRINTABLE - chars
+        self.expr = Chars(chars) if chars else NULL
+
+    def visit_empty_node(self, node):
+        self.expr = EPSILON
+
+    def visit_assertion_node(self, node):
+        raise RegexError("Assertions are not supported by the derivative engine")
+
+    def visit_character_set_node(self, node):
+        chars = node.get_characters()
+        self.expr = Chars(chars) if chars else NULL
+
+    def visit_and_node(self, node):
+        self.expr = make_and(self._build(node.get_left()), self._build(node.get_right()))
+
+    def visit_complement_node(self, node):
+        self.expr = make_not(self._build(node.get_child()))
+
+
+class DerivativeEngine:
+    """
+    Matches by taking Brzozowski derivatives of the pattern instead of determinizing
+    it up front. Every distinct derivative becomes a state, and transitions are
+    memoized per character class of the state, so the engine grows into the DFA of
+    the parts of the pattern the input actually exercises. Intersection and
+    complement need no product or subset construction. The state cache is flushed
+    once it holds max_states entries.
+    """
+    def __init__(self, ast, max_states=10000):
+        visitor = ExprBuilderVisitor()
+        ast.accept(visitor)
+        self.expr = visitor.get_expr()
+        self.max_states = max_states
+        self.states = {}  # Expr -> DerivativeState
+        self.start = self._state(self.expr)
+
+    def _state(self, expr):
+        state = self.states.get(expr)
+        if state is None:
+            if len(self.states) >= self.max_states:
+                self.states.clear()
+                self.start = DerivativeState(self.expr)
+                self.states[self.expr] = self.start
+                state = self.states.get(expr)
+                if state is not None:
+                    return state
+            state = self.states[expr] = DerivativeState(expr)
+        return state
+
+    def step(self, state, ch):
+        target = state.transitions.get(ch)
+        if target is not None:
+            return target
+        if state.class_sets is None:
+            state.class_sets = class_sets(state.expr)
+        class_key = tuple(ch in chars for chars in state.class_sets)
+        target = state.class_transitions.get(class_key)
+        if target is None:
+            target = state.class_transitions[class_key] = self._state(derivative(state.expr, ch))
+        state.transitions[ch] = target
+        return target
+
+    def match(self, input_str):
+        state = self.start
+        for ch in input_str:
+            state = state.transitions.get(ch) or self.step(state, ch)
+            if state.is_dead:
+                return False
+        return state.is_final
+
+    def longest_match(self, input_str, start=0):
+        state = self.start
+        end = None
+        for j in range(start, len(input_str)):
+            ch = input_str[j]
+            state = state.transitions.get(ch) or self.step(state, ch)
+            if state.is_dead:
+                break
+            if state.is_final:
+                end = j + 1
+        return end
+
+    def findall(self, input_str):
+        matches = []
+        length = len(input_str)
+        for i in range(length):
+            state = self.start
+            for j in range(i, length):
+                ch = input_str[j]
+                state = state.transitions.get(ch) or self.step(state, ch)
+                if state.is_dead:
+                    break
+                if state.is_final:
+                    matches.append(input_str[i:j+1])
+        return matches
+
+    def __len__(self):
+        return len(self.states)
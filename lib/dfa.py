@@ -2,8 +2,11 @@
 
 from collections import deque
 from lib.dfa_state import DFAState
+from lib.errors import RegexError
 
 class DFA:
+    has_assertions = False  # See AnchoredDFA
+
     def __init__(self, start_state, states):
         self.start_state = start_state  # DFAState
         self.states = states  # Set of DFAState
@@ -32,35 +35,153 @@ class DFA:
                 j += 1
         return matches
 
-    def complement(self):
-        # Complement DFA by toggling final states
-        new_final_states = set()
+    def longest_match(self, input_str, start=0):
+        # End offset of the longest non-empty match starting at start, or None
+        current_state = self.start_state
+        end = None
+        for j in range(start, len(input_str)):
+            current_state = current_state.get_transition(input_str[j])
+            if current_state is None:
+                break
+            if current_state.is_final:
+                end = j + 1
+        return end
+
+    def search(self, input_str):
+        """
+        Returns True if some non-empty substring of input_str is accepted. All match
+        attempts run side by side as a set of states, so the input is read once.
+        """
+        start_state = self.start_state
+        active = set()
+        for symbol in input_str:
+            active.add(start_state)
+            next_active = set()
+            for state in active:
+                target = state.get_transition(symbol)
+                if target is not None:
+                    if target.is_final:
+                        return True
+                    next_active.add(target)
+            active = next_active
+        return False
+
+    def complement(self, alphabet=None):
+        """
+        Returns a DFA for the strings over alphabet (this DFA's alphabet by default)
+        that this DFA rejects. Missing transitions are completed with a sink state
+        before the final states are toggled.
+        """
+        alphabet = set(alphabet) if alphabet is not None else self.get_alphabet()
+        state_map = {state: DFAState(state.id, not state.is_final) for state in self.states}
+        sink = DFAState(max((state.id for state in self.states), default=-1) + 1, True)
+        for state, new_state in state_map.items():
+            for symbol in alphabet:
+                target = state.get_transition(symbol)
+                new_state.add_transition(symbol, state_map[target] if target is not None else sink)
+        for symbol in alphabet:
+            sink.add_transition(symbol, sink)
+        return DFA(state_map[self.start_state], set(state_map.values()) | {sink})
+
+    # Product construction. Pairs (p, q) of states from self and other are explored
+    # breadth-first from the two start states, so only the reachable part of the
+    # product is built; None stands for the implicit dead state of a partial DFA.
+
+    def intersect(self, other):
+        return self._product(other, lambda a, b: a and b, lambda p, q: p is None or q is None)
+
+    def union(self, other):
+        return self._product(other, lambda a, b: a or b, lambda p, q: p is None and q is None)
+
+    def difference(self, other):
+        return self._product(other, lambda a, b: a and not b, lambda p, q: p is None)
+
+    def is_empty(self):
+        return self._find_witness(None, lambda a, b: a) is None
+
+    def is_subset(self, other):
+        return self._find_witness(other, lambda a, b: a and not b) is None
+
+    def is_equivalent(self, other):
+        return self.find_counterexample(other) is None
+
+    def find_counterexample(self, other):
+        """
+        Returns the shortest string accepted by exactly one of the two DFAs,
+        or None when they accept the same language.
+        """
+        return self._find_witness(other, lambda a, b: a != b)
+
+    def _product(self, other, accept, is_dead):
+        _require_plain(other)
+        start = (self.start_state, other.start_state)
+        states = {start: DFAState(0, accept(_is_final(start[0]), _is_final(start[1])))}
+        queue = deque([start])
+        while queue:
+            pair = queue.popleft()
+            new_state = states[pair]
+            for symbol in _pair_symbols(pair):
+                target = (_step(pair[0], symbol), _step(pair[1], symbol))
+                if is_dead(*target):
+                    continue
+                if target not in states:
+                    states[target] = DFAState(len(states), accept(_is_final(target[0]), _is_final(target[1])))
+                    queue.append(target)
+                new_state.add_transition(symbol, states[target])
+        return DFA(states[start], set(states.values()))
+
+    def _find_witness(self, other, accept):
+        # Breadth-first search stops at the first accepting pair, which is reached
+        # by a shortest string; parents are kept to spell that string out.
+        _require_plain(other)
+        start = (self.start_state, other.start_state if other is not None else None)
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            pair = queue.popleft()
+            if accept(_is_final(pair[0]), _is_final(pair[1])):
+                symbols = []
+                while parents[pair] is not None:
+                    pair, symbol = parents[pair]
+                    symbols.append(symbol)
+                symbols.reverse()
+                # Byte mode DFAs are labelled with byte values
+                return bytes(symbols) if symbols and isinstance(symbols[0], int) else "".join(symbols)
+            for symbol in _pair_symbols(pair):
+                target = (_step(pair[0], symbol), _step(pair[1], symbol))
+                if target == (None, None) or target in parents:
+                    continue
+                parents[target] = (pair, symbol)
+                queue.append(target)
+        return None
+
+    def minimize(self, budget=None):
+        # Hopcroft's algorithm for DFA minimization. Final states start out split by
+        # tag, so states accepting for different tokenizer rules are never merged
+        blocks = {}
         for state in self.states:
-            new_final_states.add(DFAState(state.id, not state.is_final))
-            new_final_states[-1].transitions = state.transitions.copy()
-        return DFA(new_final_states, {state for state in new_final_states if state.is_final})
+            blocks.setdefault((state.is_final, state.tag, state.accepts, state.accept_tags), set()).add(state)
+        partition = list(blocks.values())
 
-    def minimize(self):
-        # Hopcroft's algorithm for DFA minimization
-        partition = [set(), set()]
+        # Inverse transitions (symbol -> target -> source states), so predecessors
+        # of a block are looked up instead of scanning every state per symbol
+        inverse = {}
         for state in self.states:
-            if state.is_final:
-                partition[0].add(state)
-            else:
-                partition[1].add(state)
-        
-        alphabet = self.get_alphabet()
+            for symbol, target in state.get_transitions().items():
+                inverse.setdefault(symbol, {}).setdefault(target, set()).add(state)
         worklist = deque(partition.copy())
 
         while worklist:
             current = worklist.popleft()
-            for symbol in alphabet:
+            if budget:
+                budget.check_time("minimize")
+            for sources in inverse.values():
                 # Find states where transition on symbol leads to a state in current
                 predecessors = set()
-                for state in self.states:
-                    target = state.get_transition(symbol)
-                    if target and target in current:
-                        predecessors.add(state)
+                for target in current:
+                    predecessors.update(sources.get(target, ()))
+                if not predecessors:
+                    continue
                 for p in partition.copy():
                     intersection = p.intersection(predecessors)
                     difference = p.difference(predecessors)
@@ -77,34 +198,28 @@ class DFA:
                                 worklist.append(intersection)
                             else:
                                 worklist.append(difference)
-        # Create new states
-        state_map = {}
+        # Create new states, one per block
+        new_state_of = {}
         for idx, group in enumerate(partition):
-            is_final = any(state.is_final for state in group)
-            new_state = DFAState(idx, is_final)
-            state_map[frozenset(group)] = new_state
+            representative = next(iter(group))
+            new_state = DFAState(idx, representative.is_final, representative.tag)
+            new_state.accepts = representative.accepts
+            new_state.accept_tags = representative.accept_tags
+            for state in group:
+                new_state_of[state] = new_state
 
         # Assign transitions
         for group in partition:
             representative = next(iter(group))
-            new_state = state_map[frozenset(group)]
+            new_state = new_state_of[representative]
             for symbol, target in representative.get_transitions().items():
-                for g in partition:
-                    if target in g:
-                        new_target = state_map[frozenset(g)]
-                        new_state.add_transition(symbol, new_target)
-                        break
-
-        # Determine new start state
-        for group in partition:
-            if self.start_state in group:
-                new_start_state = state_map[frozenset(group)]
-                break
+                new_state.add_transition(symbol, new_state_of[target])
 
-        # Collect all new states
-        new_states = set(state_map.values())
+        return self._rebuild(new_state_of)
 
-        return DFA(new_start_state, new_states)
+    def _rebuild(self, new_state_of):
+        # Same kind of DFA over the merged states; new_state_of maps old states to new
+        return DFA(new_state_of[self.start_state], set(new_state_of.values()))
 
     def get_alphabet(self):
         alphabet = set()
@@ -114,3 +229,24 @@ class DFA:
 
     def __repr__(self):
         return f"DFA(start_state={self.start_state}, states={self.states})"
+
+
+def _require_plain(other):
+    if other is not None and other.has_assertions:
+        raise RegexError("Language operations are not supported for patterns with assertions.")
+
+
+def _is_final(state):
+    return state is not None and state.is_final
+
+
+def _step(state, symbol):
+    return state.get_transition(symbol) if state is not None else None
+
+
+def _pair_symbols(pair):
+    symbols = set()
+    for state in pair:
+        if state is not None:
+            symbols.update(state.get_transitions())
+    return sorted(symbols)
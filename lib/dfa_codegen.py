@@ -0,0 +1,118 @@
+# lib/dfa_codegen.py
+
+from lib.dfa_table import DFATable
+from lib.assertions import EDGE
+
+
+class CompiledMatcher:
+    """
+    Specialized match/findall functions generated for one DFA. The generated
+    source and its code object are kept so they can be cached and inspected.
+    """
+    def __init__(self, table: DFATable, name="pattern"):
+        self.table = table
+        self.source = generate_source(table)
+        self.code = compile(self.source, f"<dfa {name}>", "exec")
+        namespace = {}
+        exec(self.code, namespace)
+        self.match = namespace["match"]
+        self.findall = namespace["findall"]
+        self.longest_match = table.longest_match  # Rarely hot, so not generated
+
+    def __repr__(self):
+        return f"CompiledMatcher(states={len(self.table)})"
+
+
+def generate_source(table: DFATable) -> str:
+    """
+    Returns Python source defining match(s) and findall(s) for the table's DFA.
+
+    Each state becomes a plain dict mapping a symbol straight to the next state's
+    dict, so a step is a single (specialized) dict subscript; a missing symbol raises
+    KeyError, which ends the run. Accepting states carry the marker key None, which
+    no symbol can equal, so the accept check is an inlined membership test. The
+    start state is bound as a default argument so the loops only touch locals.
+
+    With assertions the marker maps to the state's acceptance per context of the
+    next symbol (see AnchoredDFA), and findall starts each attempt from the start
+    state for the context of the symbol before it.
+    """
+    lines = []
+    for state in range(len(table)):
+        lines.append(f"_s{state} = {{}}")
+    for state, row in enumerate(table.transitions):
+        items = [f"{symbol!r}: _s{target}" for symbol, target in sorted(row.items())]
+        if table.has_assertions:
+            if any(table.accepts[state]):
+                items.append(f"None: {table.accepts[state]!r}")
+        elif table.accepting[state]:
+            items.append("None: True")
+        if items:
+            lines.append(f"_s{state}.update({{{', '.join(items)}}})")
+    start = f"_s{table.start}"
+    if table.has_assertions:
+        return "\n".join(lines + _anchored_functions(table, start))
+    lines += [
+        "",
+        f"def match(s, _start={start}):",
+        "    state = _start",
+        "    try:",
+        "        for ch in s:",
+        "            state = state[ch]",
+        "    except KeyError:",
+        "        return False",
+        "    return None in state",
+        "",
+        f"def findall(s, _start={start}):",
+        "    matches = []",
+        "    append = matches.append",
+        "    length = len(s)",
+        "    for i in range(length):",
+        "        state = _start",
+        "        try:",
+        "            for j in range(i, length):",
+        "                state = state[s[j]]",
+        "                if None in state:",
+        "                    append(s[i:j+1])",
+        "        except KeyError:",
+        "            pass",
+        "    return matches",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def _anchored_functions(table: DFATable, start: str) -> list:
+    starts = ", ".join(f"_s{state}" if state is not None else "None" for state in table.start_states)
+    return [
+        "from lib.assertions import symbol_context",
+        "",
+        f"def match(s, _start={start}):",
+        "    state = _start",
+        "    try:",
+        "        for ch in s:",
+        "            state = state[ch]",
+        "    except KeyError:",
+        "        return False",
+        f"    return None in state and state[None][{EDGE}]",
+        "",
+        f"def findall(s, _starts=({starts},), _context=symbol_context):",
+        "    matches = []",
+        "    append = matches.append",
+        "    length = len(s)",
+        "    contexts = [_context(ch) for ch in s]",
+        f"    contexts.append({EDGE})",
+        "    for i in range(length):",
+        f"        state = _starts[contexts[i - 1] if i else {EDGE}]",
+        "        if state is None:",
+        "            continue",
+        "        try:",
+        "            for j in range(i, length):",
+        "                state = state[s[j]]",
+        "                if None in state and state[None][contexts[j + 1]]:",
+        "                    append(s[i:j+1])",
+        "        except KeyError:",
+        "            pass",
+        "    return matches",
+        "",
+    ]
@@ -1,9 +1,12 @@
 # lib/dfa_state.py
 
 class DFAState:
-    def __init__(self, state_id, is_final=False):
+    def __init__(self, state_id, is_final=False, tag=None):
         self.id = state_id
         self.is_final = is_final
+        self.tag = tag  # Lowest tag among the final NFA states this state stands for
+        self.accepts = None  # Acceptance per lookahead context, for patterns with assertions
+        self.accept_tags = None  # Tag accepted per lookahead context, likewise
         self.transitions = {}  # symbol -> DFAState
 
     def add_transition(self, symbol, state):
@@ -0,0 +1,190 @@
+# lib/dfa_table.py
+
+from collections import deque
+from types import MappingProxyType
+from lib.dfa import DFA
+from lib.anchored_dfa import AnchoredDFA
+from lib.dfa_state import DFAState
+from lib.assertions import EDGE, symbol_context
+
+class DFATable:
+    """
+    Index-based form of a DFA: states are numbered 0..n-1 in breadth-first order from
+    the start state (always 0), transitions[i] maps a symbol to the next state index
+    and accepting[i] tells whether state i is final. Missing symbols mean no match.
+    tags[i] is the state's tag, for DFAs built with tagged final states.
+
+    Tables of patterns with assertions (see AnchoredDFA) also hold start_states, the
+    start state index per context of the symbol before a match (None where no match
+    can start), and accepts[i], the acceptance of state i per context of the next
+    symbol; accepting[i] is then acceptance at the end of the input. With tags,
+    context_tags[i] holds the tag accepted per next context.
+
+    Tables are immutable: the rows are read-only mappings, so one table can be
+    shared by threads and patterns. steps[i] is the get method of row i, which the
+    matching loops call directly, as a lookup through the read-only view costs more.
+    """
+    __slots__ = ("transitions", "steps", "accepting", "start", "tags", "start_states", "accepts", "context_tags")
+
+    def __init__(self, transitions, accepting, start=0, tags=None, start_states=None, accepts=None,
+                 context_tags=None):
+        rows = [dict(row) for row in transitions]
+        # Tuple of read-only mappings: symbol -> state index
+        object.__setattr__(self, "transitions", tuple(MappingProxyType(row) for row in rows))
+        object.__setattr__(self, "steps", tuple(row.get for row in rows))
+        object.__setattr__(self, "accepting", tuple(accepting))  # Tuple of bools
+        object.__setattr__(self, "start", start)
+        object.__setattr__(self, "tags", tags)  # Tuple of tags or None
+        # Tuple indexed by context, or None without assertions
+        object.__setattr__(self, "start_states", start_states)
+        # Tuple of per-context bool tuples, or None without assertions
+        object.__setattr__(self, "accepts", accepts)
+        object.__setattr__(self, "context_tags", context_tags)  # Tuple of per-context tag tuples, or None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DFATable objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("DFATable objects are immutable")
+
+    def __reduce__(self):
+        return DFATable, (tuple(dict(row) for row in self.transitions), self.accepting, self.start, self.tags,
+                          self.start_states, self.accepts, self.context_tags)
+
+    @property
+    def has_assertions(self):
+        return self.start_states is not None
+
+    @classmethod
+    def from_dfa(cls, dfa: DFA):
+        # Every start state is numbered; the one after the start of the input is 0
+        order = [dfa.start_state]
+        index = {dfa.start_state: 0}
+        for state in getattr(dfa, "start_states", ()):
+            if state is not None and state not in index:
+                index[state] = len(order)
+                order.append(state)
+        queue = deque(order)
+        while queue:
+            state = queue.popleft()
+            for target in state.get_transitions().values():
+                if target not in index:
+                    index[target] = len(order)
+                    order.append(target)
+                    queue.append(target)
+        transitions = tuple(
+            {symbol: index[target] for symbol, target in state.get_transitions().items()} for state in order
+        )
+        accepting = tuple(state.is_final for state in order)
+        tags = tuple(state.tag for state in order)
+        tags = tags if any(tag is not None for tag in tags) else None
+        if not dfa.has_assertions:
+            return cls(transitions, accepting, tags=tags)
+        start_states = tuple(index[state] if state is not None else None for state in dfa.start_states)
+        accepts = tuple(state.accepts for state in order)
+        context_tags = tuple(state.accept_tags or (None,) * len(state.accepts) for state in order)
+        if not any(tag is not None for state_tags in context_tags for tag in state_tags):
+            context_tags = None
+        return cls(transitions, accepting, tags=tags, start_states=start_states, accepts=accepts,
+                   context_tags=context_tags)
+
+    def to_dfa(self) -> DFA:
+        tags = self.tags or (None,) * len(self.accepting)
+        states = [DFAState(i, accepting, tag) for i, (accepting, tag) in enumerate(zip(self.accepting, tags))]
+        for state, row in zip(states, self.transitions):
+            for symbol, target in row.items():
+                state.add_transition(symbol, states[target])
+        if not self.has_assertions:
+            return DFA(states[self.start], set(states))
+        for i, state in enumerate(states):
+            state.accepts = self.accepts[i]
+            if self.context_tags:
+                state.accept_tags = self.context_tags[i]
+        start_states = tuple(states[i] if i is not None else None for i in self.start_states)
+        return AnchoredDFA(start_states, set(states))
+
+    def __len__(self):
+        return len(self.accepting)
+
+    def get_alphabet(self):
+        alphabet = set()
+        for row in self.transitions:
+            alphabet.update(row)
+        return alphabet
+
+    def match(self, input_str):
+        steps = self.steps
+        state = self.start
+        for symbol in input_str:
+            state = steps[state](symbol)
+            if state is None:
+                return False
+        return self.accepting[state]
+
+    def findall(self, input_str):
+        if self.start_states is not None:
+            return [input_str[start:end] for start, end in self._anchored_spans(input_str)]
+        steps = self.steps
+        accepting = self.accepting
+        matches = []
+        length = len(input_str)
+        for i in range(length):
+            state = self.start
+            for j in range(i, length):
+                state = steps[state](input_str[j])
+                if state is None:
+                    break
+                if accepting[state]:
+                    matches.append(input_str[i:j+1])
+        return matches
+
+    def _anchored_spans(self, input_str):
+        # As AnchoredDFA._spans: the start state depends on the symbol before, and
+        # acceptance on the symbol after
+        steps = self.steps
+        accepts = self.accepts
+        start_states = self.start_states
+        length = len(input_str)
+        contexts = [symbol_context(symbol) for symbol in input_str]
+        contexts.append(EDGE)
+        for i in range(length):
+            state = start_states[contexts[i - 1] if i else EDGE]
+            if state is None:
+                continue
+            for j in range(i, length):
+                state = steps[state](input_str[j])
+                if state is None:
+                    break
+                if accepts[state][contexts[j + 1]]:
+                    yield i, j + 1
+
+    def longest_match(self, input_str, start=0):
+        # End offset of the longest non-empty match starting at start, or None
+        steps = self.steps
+        accepting = self.accepting
+        length = len(input_str)
+        if self.start_states is not None:
+            state = self.start_states[symbol_context(input_str[start - 1]) if start else EDGE]
+            if state is None:
+                return None
+            accepts = self.accepts
+            end = None
+            for j in range(start, length):
+                state = steps[state](input_str[j])
+                if state is None:
+                    break
+                if accepts[state][symbol_context(input_str[j + 1]) if j + 1 < length else EDGE]:
+                    end = j + 1
+            return end
+        state = self.start
+        end = None
+        for j in range(start, length):
+            state = steps[state](input_str[j])
+            if state is None:
+                break
+            if accepting[state]:
+                end = j + 1
+        return end
+
+    def __repr__(self):
+        return f"DFATable(states={len(self)}, start={self.start})"
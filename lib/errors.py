@@ -0,0 +1,28 @@
+# lib/errors.py
+
+class RegexError(Exception):
+    """Base class for errors raised by the regex library."""
+
+
+class NotCompiledError(RegexError):
+    """Raised when a RegexLib is used before a pattern has been compiled."""
+
+
+class BudgetExceededError(RegexError):
+    """Raised when compiling a pattern exceeds one of the limits of a CompileBudget."""
+
+    def __init__(self, limit_name, limit, actual, phase):
+        super().__init__(f"Compile budget exceeded during {phase}: {limit_name}={limit} (reached {actual})")
+        self.limit_name = limit_name
+        self.limit = limit
+        self.actual = actual
+        self.phase = phase
+
+
+class TokenizeError(RegexError):
+    """Raised when no tokenizer rule matches the input at some position."""
+
+    def __init__(self, position, text):
+        super().__init__(f"No rule matches at position {position}: {text!r}")
+        self.position = position
+        self.text = text
@@ -0,0 +1,108 @@
+# lib/fragment_cache.py
+
+from collections import OrderedDict
+from lib.ast_tree import NodeTable
+from lib.nfa import NFA, NFAState
+
+class FragmentCache:
+    """
+    Compile results memoized per AST subtree, shared across RegexLib.compile calls.
+    Patterns are interned into one NodeTable, so a subtree that occurs again (in the
+    same pattern or after an edit) is the same node and its NFA fragment can be
+    copied from a template instead of being rebuilt. Minimized DFAs of whole patterns
+    are kept as well: they are reused outright for an unchanged pattern, and as a
+    compact fragment when the old pattern is the left part of the new one, e.g.
+    after appending an alternative. Entries are evicted least recently used first.
+    """
+    def __init__(self, max_entries=10000, min_fragment_size=4, max_nodes=100000):
+        self.max_entries = max_entries
+        self.min_fragment_size = min_fragment_size  # Smaller subtrees are cheaper to rebuild than to copy
+        self.max_nodes = max_nodes
+        self.node_table = NodeTable()
+        self.fragments = OrderedDict()  # (byte_mode, node) -> NFA template
+        self.dfas = OrderedDict()  # (byte_mode, node) -> minimized DFATable
+
+    def __len__(self):
+        return len(self.fragments) + len(self.dfas)
+
+    def clear(self):
+        self.node_table.clear()
+        self.fragments.clear()
+        self.dfas.clear()
+
+    def intern(self, root):
+        # Keys compare structurally, so dropping the table only costs sharing, not hits
+        if len(self.node_table) > self.max_nodes:
+            self.node_table.clear()
+        return self.node_table.intern(root)
+
+    def should_store(self, node):
+        return getattr(node, "size", 0) >= self.min_fragment_size
+
+    def get_nfa(self, node, byte_mode=False):
+        """
+        Returns a fresh copy of the NFA fragment for node, or None. A cached DFA is
+        preferred, as its minimized states make the smaller fragment.
+        """
+        key = (byte_mode, node)
+        table = self._lookup(self.dfas, key)
+        if table is not None:
+            return self._instantiate_table(table)
+        template = self._lookup(self.fragments, key)
+        if template is not None:
+            return self._instantiate(template)
+        return None
+
+    def has_nfa(self, node, byte_mode=False):
+        key = (byte_mode, node)
+        return key in self.dfas or key in self.fragments
+
+    def put_nfa(self, node, byte_mode, nfa):
+        self._store(self.fragments, (byte_mode, node), self._snapshot(nfa))
+
+    def get_dfa(self, node, byte_mode=False):
+        return self._lookup(self.dfas, (byte_mode, node))
+
+    def put_dfa(self, node, byte_mode, table):
+        self._store(self.dfas, (byte_mode, node), table)
+
+    def _lookup(self, entries, key):
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+        return value
+
+    def _store(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def _snapshot(self, nfa):
+        # Template: (state count, start index, final indices, edges as (source, symbol, target))
+        states = nfa.get_all_states() | nfa.get_final_states()
+        index = {state: i for i, state in enumerate(states)}
+        edges = tuple(
+            (index[state], symbol, index[target])
+            for state in states
+            for symbol, targets in state.get_transitions().items()
+            for target in targets
+        )
+        finals = tuple(index[state] for state in nfa.get_final_states())
+        return len(states), index[nfa.get_start_state()], finals, edges
+
+    def _instantiate(self, template):
+        count, start, finals, edges = template
+        states = [NFAState(False) for _ in range(count)]
+        for source, symbol, target in edges:
+            states[source].add_transition(symbol, states[target])
+        for i in finals:
+            states[i].is_final = True
+        return NFA(states[start], {states[i] for i in finals})
+
+    def _instantiate_table(self, table):
+        states = [NFAState(accepting) for accepting in table.accepting]
+        for state, row in zip(states, table.transitions):
+            for symbol, target in row.items():
+                state.add_transition(symbol, states[target])
+        return NFA(states[table.start], {state for state in states if state.is_final})
@@ -0,0 +1,82 @@
+# lib/fuzzy_matcher.py
+
+from lib.glushkov import GlushkovAutomaton
+
+
+class FuzzyMatcher:
+    """
+    Approximate matching with up to max_errors edits (insertions, deletions and
+    substitutions of single characters), simulating the pattern's position
+    automaton bit-parallel with one state vector per error level (Wu-Manber). After
+    reading a character, level i holds the positions reachable with at most i edits:
+
+        R'[i] = reach(R[i]) & mask(c)       match
+              | R[i-1]                      insertion (c is extra text)
+              | reach(R[i-1] | R'[i-1])     substitution, deletion (pattern char skipped)
+              | R'[i-1]
+
+    Each step costs two reach() computations per level, whatever the pattern's
+    alternations and loops, instead of one DFA walk per edit variant.
+    """
+    def __init__(self, automaton: GlushkovAutomaton, max_errors: int = 1):
+        if max_errors < 0:
+            raise ValueError("max_errors cannot be negative.")
+        self.automaton = automaton
+        self.max_errors = max_errors
+        # Initial vectors: the initial state plus the positions reached by deleting
+        # up to i pattern characters before reading anything
+        initial = [1]
+        for _ in range(max_errors):
+            initial.append(initial[-1] | automaton.reach(initial[-1]))
+        self.initial = initial
+
+    def _step(self, levels, ch):
+        reach = self.automaton.reach
+        mask = self.automaton.masks.get(ch, 0)
+        new_levels = [reach(levels[0]) & mask]
+        for i in range(1, len(levels)):
+            below = new_levels[i - 1]
+            new_levels.append(
+                (reach(levels[i]) & mask) | levels[i - 1] | reach(levels[i - 1] | below) | below)
+        return new_levels
+
+    def _cost(self, levels):
+        final_mask = self.automaton.final_mask
+        for cost, states in enumerate(levels):
+            if states & final_mask:
+                return cost
+        return None
+
+    def match(self, input_str):
+        """
+        Returns the least number of edits that turn the whole input into a string of
+        the pattern's language, or None when more than max_errors are needed.
+        """
+        levels = self.initial
+        for ch in input_str:
+            levels = self._step(levels, ch)
+            if not levels[-1]:
+                return None
+        return self._cost(levels)
+
+    def search(self, input_str) -> list:
+        """
+        Returns (end, cost) for every end offset 1..len(input_str) at which some
+        non-empty substring ending there is within max_errors edits of the pattern,
+        cost being the least number of edits over those substrings. A new attempt
+        starts at every offset, so all levels are merged with the initial vectors
+        after each step.
+        """
+        initial = self.initial
+        levels = initial
+        results = []
+        for end, ch in enumerate(input_str, 1):
+            levels = self._step(levels, ch)
+            cost = self._cost(levels)
+            if cost is not None:
+                results.append((end, cost))
+            levels = [states | start for states, start in zip(levels, initial)]
+        return results
+
+    def __repr__(self):
+        return f"FuzzyMatcher({self.automaton!r}, max_errors={self.max_errors})"
@@ -0,0 +1,266 @@
+# lib/glushkov.py
+
+import string
+
+from lib.ast_visitor import ASTVisitor
+from lib.ast_tree import ConcatNode, OrNode
+from lib.lexer import Lexer
+from lib.parser import Parser
+from lib.errors import RegexError
+
+PRINTABLE = frozenset(string.printable)
+CHUNK_BITS = 8  # Width of the slices of a state vector looked up in the follow tables
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class GlushkovAutomaton:
+    """
+    Position automaton of a pattern: one state per character class occurrence in
+    the pattern plus the initial state 0, and no epsilon transitions. Every
+    transition into position p reads a character of p's class, so a set of states is
+    an int with bit p set per active position, and a step on character c is
+
+        reach(states) & char_mask(c)
+
+    which is the basis of the bit-parallel matchers (see FuzzyMatcher).
+    """
+    def __init__(self, classes, follow, last, nullable):
+        self.classes = classes  # Position -> frozenset of characters, None for the initial state
+        self.follow = follow  # Position -> mask of the positions that may follow it
+        self.nullable = nullable
+        self.final_mask = last | (1 if nullable else 0)
+        self.masks = {}  # char -> mask of the positions whose class contains it
+        for position in range(1, len(classes)):
+            bit = 1 << position
+            for ch in classes[position]:
+                self.masks[ch] = self.masks.get(ch, 0) | bit
+        self.tables = None  # Built on first reach(), see _build_tables
+
+    @classmethod
+    def from_pattern(cls, pattern: str):
+        return cls.from_ast(Parser(Lexer(pattern).scan()).parse())
+
+    @classmethod
+    def from_ast(cls, ast):
+        visitor = GlushkovBuilderVisitor()
+        visitor.build(ast)
+        return cls(visitor.classes, visitor.follow, visitor.last, visitor.nullable)
+
+    def __len__(self):
+        # Number of positions, without the initial state
+        return len(self.classes) - 1
+
+    def _build_tables(self):
+        # tables[k][v] is the union of the follow sets of the positions given by the
+        # bits of v in the k-th CHUNK_BITS wide slice of a state vector
+        self.tables = [self.follow_table(CHUNK_BITS, base) for base in range(0, len(self.classes), CHUNK_BITS)]
+        return self.tables
+
+    def follow_table(self, bits: int, base: int = 0) -> list:
+        """
+        Returns the table mapping each value v of a bits wide slice of a state
+        vector, starting at position base, to the union of the follow sets of the
+        positions set in v.
+        """
+        follow = self.follow
+        table = [0] * (1 << bits)
+        for value in range(1, len(table)):
+            low = value & -value
+            position = base + low.bit_length() - 1
+            table[value] = table[value ^ low] | (follow[position] if position < len(follow) else 0)
+        return table
+
+    def is_linear(self) -> bool:
+        # Every position is followed by exactly the next one, and the last by none
+        follow = self.follow
+        last = len(follow) - 1
+        return follow[last] == 0 and all(follow[position] == 1 << (position + 1) for position in range(last))
+
+    def reach(self, states: int) -> int:
+        # Union of the follow sets of all active positions
+        result = 0
+        tables = self.tables or self._build_tables()
+        k = 0
+        while states:
+            result |= tables[k][states & CHUNK_MASK]
+            states >>= CHUNK_BITS
+            k += 1
+        return result
+
+    def char_mask(self, ch) -> int:
+        return self.masks.get(ch, 0)
+
+    def alphabet(self) -> set:
+        return set(self.masks)
+
+    def match(self, input_str) -> bool:
+        states = 1
+        for ch in input_str:
+            states = self.reach(states) & self.masks.get(ch, 0)
+            if not states:
+                return False
+        return bool(states & self.final_mask)
+
+    def __repr__(self):
+        return f"GlushkovAutomaton(positions={len(self)}, nullable={self.nullable})"
+
+
+class GlushkovBuilderVisitor(ASTVisitor):
+    """
+    Computes the positions of an AST bottom-up. Each subtree yields (nullable, first,
+    last) as masks over the positions it created, while concatenation and star add
+    to the shared follow sets. Repeats are expanded into copies with their own
+    positions. Character classes follow the NFA builder: '.' and negated ranges are
+    taken over printable ASCII.
+    """
+    def __init__(self, classes=None, follow=None):
+        self.classes = classes if classes is not None else [None]  # Shared with child visitors
+        self.follow = follow if follow is not None else [0]
+        self.fragment = None  # (nullable, first, last) of the visited subtree
+
+    def build(self, node):
+        self.fragment = self._build(node)
+        self.nullable, first, self.last = self.fragment
+        self.follow[0] = first  # The initial state is followed by the first positions
+        return self.fragment
+
+    def _build(self, root):
+        # As in NFABuilderVisitor, composite visits are generators that yield the
+        # children they need, driven from an explicit stack instead of recursing
+        pending = []  # (visitor, generator) of visits waiting for a child's fragment
+        node = root
+        while True:
+            visitor = GlushkovBuilderVisitor(self.classes, self.follow)
+            steps = node.accept(visitor)
+            fragment = None
+            if steps is None:
+                fragment = visitor.fragment
+            else:
+                pending.append((visitor, steps))
+            while pending:
+                visitor, steps = pending[-1]
+                try:
+                    node = steps.send(fragment)
+                    break
+                except StopIteration:
+                    pending.pop()
+                    fragment = visitor.fragment
+            else:
+                return fragment
+
+    def _position(self, chars):
+        self.classes.append(frozenset(chars))
+        self.follow.append(0)
+        bit = 1 << (len(self.classes) - 1)
+        self.fragment = (False, bit, bit)
+
+    def _link(self, last, first):
+        # Every position in last may be followed by every position in first
+        follow = self.follow
+        while last:
+            low = last & -last
+            follow[low.bit_length() - 1] |= first
+            last ^= low
+
+    def _concat(self, left, right):
+        self._link(left[2], right[1])
+        return (
+            left[0] and right[0],
+            left[1] | right[1] if left[0] else left[1],
+            left[2] | right[2] if right[0] else right[2],
+        )
+
+    def _star(self, fragment):
+        self._link(fragment[2], fragment[1])
+        return (True, fragment[1], fragment[2])
+
+    def visit_char_node(self, node):
+        self._position(node.get_value())
+
+    def visit_concat_node(self, node):
+        # Walk the left-nested chain iteratively; positions are numbered left to right
+        parts = []
+        while isinstance(node, ConcatNode):
+            parts.append(node.get_right())
+            node = node.get_left()
+        parts.append(node)
+        fragment = (True, 0, 0)
+        for part in reversed(parts):
+            fragment = self._concat(fragment, (yield part))
+        self.fragment = fragment
+
+    def visit_star_node(self, node):
+        self.fragment = self._star((yield node.get_child()))
+
+    def visit_or_node(self, node):
+        # Left-nested like concatenations, so keyword lists are walked iteratively too
+        parts = []
+        while isinstance(node, OrNode):
+            parts.append(node.get_right())
+            node = node.get_left()
+        parts.append(node)
+        nullable, first, last = False, 0, 0
+        for part in reversed(parts):
+            fragment = yield part
+            nullable = nullable or fragment[0]
+            first |= fragment[1]
+            last |= fragment[2]
+        self.fragment = (nullable, first, last)
+
+    def visit_capture_group_node(self, node):
+        self.fragment = yield node.get_child()
+
+    def visit_non_capturing_group_node(self, node):
+        self.fragment = yield node.get_child()
+
+    def visit_repeat_node(self, node):
+        min_repeats = node.get_min()
+        max_repeats = node.get_max()
+        if max_repeats is not None and min_repeats > max_repeats:
+            raise ValueError("Minimum repeats cannot exceed maximum repeats.")
+        # r{m,n} -> r...r r?...r? and r{m,} -> r...r r*
+        fragment = (True, 0, 0)
+        for _ in range(min_repeats):
+            fragment = self._concat(fragment, (yield node.get_child()))
+        if max_repeats is None:
+            fragment = self._concat(fragment, self._star((yield node.get_child())))
+        else:
+            for _ in range(max_repeats - min_repeats):
+                _, first, last = yield node.get_child()
+                fragment = self._concat(fragment, (True, first, last))
+        self.fragment = fragment
+
+    def visit_repeat_exact_node(self, node):
+        exact = node.get_exact_repeats()
+        if exact < 0:
+            raise ValueError("Exact repeats cannot be negative.")
+        fragment = (True, 0, 0)
+        for _ in range(exact):
+            fragment = self._concat(fragment, (yield node.get_child()))
+        self.fragment = fragment
+
+    def visit_range_node(self, node):
+        chars = set()
+        for first, last in node.get_ranges():
+            chars.update(chr(c) for c in range(ord(first), ord(last) + 1))
+        if node.is_negated():
+            chars = PRINTABLE - chars
+        self._position(chars)
+
+    def visit_backreference_node(self, node):
+        raise RegexError("Backreferences are not supported by the position automaton")
+
+    def visit_empty_node(self, node):
+        self.fragment = (True, 0, 0)
+
+    def visit_assertion_node(self, node):
+        raise RegexError("Assertions are not supported by the position automaton")
+
+    def visit_character_set_node(self, node):
+        self._position(node.get_characters())
+
+    def visit_and_node(self, node):
+        raise RegexError("Intersection is only supported by the derivative engine")
+
+    def visit_complement_node(self, node):
+        raise RegexError("Complement is only supported by the derivative engine")
@@ -0,0 +1,219 @@
+# lib/grep.py
+"""
+Recursive grep built on the regex library:
+
+    python -m lib.grep [options] PATTERN PATH...
+
+The pattern is compiled once in UTF-8 byte mode and files are searched through
+mmap without decoding, in batches spread over a process pool where each worker
+compiles the pattern once. Matching is pure Python, so a thread pool (--threads)
+holds the GIL while it searches and does not search files in parallel; it only
+saves the start-up of the processes on small trees. Only a few batches are in
+flight at a time and results are printed in file order as they complete, so
+memory does not grow with the size of the tree.
+"""
+import argparse
+import mmap
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
+
+from lib.regex_lib import RegexLib
+from lib.line_matcher import LineMatcher
+from lib.errors import RegexError
+
+BATCH_SIZE = 16  # Files per task, so that small files do not each cost a round trip to a worker
+_worker_regex = None  # Per-process compiled pattern when running in a process pool
+_local = threading.local()  # Per-thread LineMatcher, as its lazily built tables are not shared
+
+
+class FileResult:
+    def __init__(self, path):
+        self.path = path
+        self.lines = []  # (line number, line bytes) of matching lines
+        self.count = 0
+        self.bytes_scanned = 0
+        self.error = None
+
+
+def line_matcher_for(regex: RegexLib) -> LineMatcher:
+    matcher = getattr(_local, "matcher", None)
+    if matcher is None or matcher.dfa is not regex.dfa_min:
+        matcher = _local.matcher = LineMatcher(regex.dfa_min)
+    return matcher
+
+
+def search_buffer(matcher: LineMatcher, buffer, result: FileResult, max_count=None, keep_lines=True):
+    scanned = len(buffer)
+    for line_number, start, end in matcher.iter_lines(buffer):
+        result.count += 1
+        if keep_lines:
+            result.lines.append((line_number, buffer[start:end]))
+        if max_count is not None and result.count >= max_count:
+            scanned = end
+            break
+    result.bytes_scanned = scanned
+
+
+def search_file(regex: RegexLib, path, max_count=None, keep_lines=True) -> FileResult:
+    result = FileResult(path)
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return result  # Empty files cannot be mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                search_buffer(line_matcher_for(regex), buffer, result, max_count, keep_lines)
+    except OSError as e:
+        result.error = str(e)
+    return result
+
+
+def _init_worker(pattern, ignorecase):
+    global _worker_regex
+    _worker_regex = RegexLib()
+    _worker_regex.compile(pattern, byte_mode=True, ignorecase=ignorecase)
+
+
+def search_batch(regex: RegexLib, paths, max_count=None, keep_lines=True) -> list:
+    return [search_file(regex, path, max_count, keep_lines) for path in paths]
+
+
+def _search_in_worker(args):
+    paths, max_count, keep_lines = args
+    return search_batch(_worker_regex, paths, max_count, keep_lines)
+
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def iter_batches(files, size=BATCH_SIZE):
+    batch = []
+    for path in files:
+        batch.append(path)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ordered_results(submit, batches, window):
+    """
+    Yields the FileResults of each batch in file order, submitting a batch (submit
+    returns its future) only while fewer than window are in flight.
+    """
+    pending = deque()
+    for batch in batches:
+        if len(pending) >= window:
+            yield from pending.popleft().result()
+        pending.append(submit(batch))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="python -m lib.grep", description="Search files for lines matching a pattern.")
+    parser.add_argument("pattern")
+    parser.add_argument("paths", nargs="+", metavar="PATH")
+    parser.add_argument("-i", "--ignore-case", action="store_true", help="ignore case distinctions")
+    parser.add_argument("-c", "--count", action="store_true", help="print only a count of matching lines per file")
+    parser.add_argument("-l", "--files-with-matches", action="store_true", help="print only names of files with matches")
+    parser.add_argument("-n", "--line-number", action="store_true", help="prefix each line with its line number")
+    parser.add_argument("-m", "--max-count", type=int, default=None, help="stop after NUM matching lines per file")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="number of workers")
+    parser.add_argument("--threads", action="store_true",
+                        help="use a thread pool instead of processes (no parallel search, see above)")
+    parser.add_argument("--processes", action="store_true", help="use a process pool (the default)")
+    parser.add_argument("--stats", action="store_true", help="print throughput statistics to stderr")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    started = time.perf_counter()
+    regex = RegexLib()
+    try:
+        compile_stats = regex.compile(args.pattern, byte_mode=True, ignorecase=args.ignore_case)
+    except (SyntaxError, ValueError, RegexError) as e:
+        print(f"grep: invalid pattern: {e}", file=sys.stderr)
+        return 2
+
+    files = iter_files(args.paths)
+    max_count = 1 if args.files_with_matches else args.max_count
+    keep_lines = not (args.count or args.files_with_matches)
+    show_names = len(args.paths) > 1 or any(os.path.isdir(path) for path in args.paths)
+    out = sys.stdout.buffer
+
+    jobs = max(1, args.jobs)
+    window = 2 * jobs  # Batches in flight
+    if jobs == 1:
+        executor = None
+        results = (search_file(regex, path, max_count, keep_lines) for path in files)
+    elif args.threads:
+        executor = ThreadPoolExecutor(jobs)
+        results = ordered_results(
+            lambda batch: executor.submit(search_batch, regex, batch, max_count, keep_lines),
+            iter_batches(files), window)
+    else:
+        executor = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(args.pattern, args.ignore_case))
+        results = ordered_results(
+            lambda batch: executor.submit(_search_in_worker, (batch, max_count, keep_lines)),
+            iter_batches(files), window)
+
+    searched_files = matched_files = total_lines = total_bytes = 0
+    errors = False
+    with executor or nullcontext():
+        try:
+            for result in results:
+                searched_files += 1
+                total_bytes += result.bytes_scanned
+                if result.error:
+                    print(f"grep: {result.path}: {result.error}", file=sys.stderr)
+                    errors = True
+                    continue
+                total_lines += result.count
+                if result.count:
+                    matched_files += 1
+                prefix = f"{result.path}:".encode() if show_names else b""
+                if args.files_with_matches:
+                    if result.count:
+                        out.write(result.path.encode() + b"\n")
+                elif args.count:
+                    out.write(prefix + f"{result.count}\n".encode())
+                else:
+                    for line_number, line in result.lines:
+                        number = f"{line_number}:".encode() if args.line_number else b""
+                        out.write(prefix + number + line + b"\n")
+            out.flush()
+        except BrokenPipeError:
+            # The reader went away (e.g. output piped into head): stop quietly like grep.
+            # Python flushes stdout again at exit, so it is pointed at devnull first.
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0 if total_lines else 1
+
+    if args.stats:
+        elapsed = time.perf_counter() - started
+        print(f"files={searched_files} matched_files={matched_files} matched_lines={total_lines} "
+              f"bytes={total_bytes} compile={compile_stats.total_time:.4f}s elapsed={elapsed:.4f}s "
+              f"throughput={total_bytes / elapsed / 1e6 if elapsed else 0:.2f}MB/s", file=sys.stderr)
+    if errors:
+        return 2
+    return 0 if total_lines else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
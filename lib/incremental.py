@@ -0,0 +1,137 @@
+# lib/incremental.py
+
+from bisect import bisect_left, bisect_right
+
+from lib.dfa_table import DFATable
+from lib.errors import RegexError
+
+DEFAULT_INTERVAL = 1024  # Characters between checkpoints
+
+
+class IncrementalMatcher:
+    """
+    Keeps the matches of a DFA over a document that is edited in place, the same
+    matches findall reports for the whole text. While scanning, the match attempts
+    still running (grouped by DFA state, as in StreamScanner) are saved every
+    interval characters as a checkpoint: per state, the distances back to the
+    attempts' starts.
+
+    An edit resumes from the last checkpoint at or before it and rescans until, past
+    the edited text, the running attempts equal those of an old checkpoint. From
+    there on the old run repeats shifted by the change in length, so its matches
+    and later checkpoints are reused instead of rescanned. Matches are kept per
+    checkpoint, relative to its offset, so reusing them only moves the checkpoint
+    offsets and an edit costs the rescan plus one step per checkpoint, however many
+    matches follow it. Patterns whose attempts never end (such as 'a.*') keep every
+    start running and so never re-converge; edits then rescan up to the end of the
+    text.
+    """
+    def __init__(self, table: DFATable, text, interval: int = DEFAULT_INTERVAL):
+        if interval < 1:
+            raise ValueError("The checkpoint interval must be positive.")
+        if table.has_assertions:
+            raise RegexError("Incremental matching does not support patterns with assertions.")
+        self.table = table
+        self.interval = interval
+        self.text = text
+        self.positions = [0]  # Offsets of the checkpoints, ascending
+        self.checkpoints = [{}]  # Per checkpoint: state -> frozenset of distances back to the starts
+        # Per checkpoint: (start, end) of the matches ending after it and up to the
+        # next one, relative to its offset
+        self.segments = [[]]
+        self._scan(0, {}, {}, [])
+
+    def edit(self, offset: int, deleted: int, inserted) -> int:
+        """
+        Replaces deleted characters at offset with inserted and updates the matches.
+        Returns the number of characters rescanned.
+        """
+        text = self.text
+        if offset < 0 or deleted < 0 or offset + deleted > len(text):
+            raise ValueError(f"Edit of {deleted} characters at {offset} is outside the text of length {len(text)}.")
+        self.text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+
+        index = bisect_right(self.positions, offset) - 1
+        resume = self.positions[index]
+        # Old checkpoints after the deleted text are where the new run may rejoin the old one
+        first_old = bisect_left(self.positions, offset + deleted, index + 1)
+        old_positions = self.positions[first_old:]
+        old_checkpoints = self.checkpoints[first_old:]
+        old_segments = self.segments[first_old:]
+        del self.positions[index + 1:]
+        del self.checkpoints[index + 1:]
+        del self.segments[index:]
+        self.segments.append([])
+
+        runs = {state: [resume - distance for distance in distances]
+                for state, distances in self.checkpoints[index].items()}
+        targets = {position + delta: i for i, position in enumerate(old_positions)}
+        stop, matched = self._scan(resume, runs, targets, old_checkpoints)
+        if matched is not None:
+            self.positions.extend(position + delta for position in old_positions[matched + 1:])
+            self.checkpoints.extend(old_checkpoints[matched + 1:])
+            self.segments.extend(old_segments[matched:])
+        return stop - resume
+
+    def _scan(self, position, runs, targets, old_checkpoints):
+        # Scans from position, the last checkpoint, with the attempts in runs (state ->
+        # start offsets), adding matches and checkpoints. Stops at a target offset whose
+        # checkpoint equals the old one there, adding the checkpoint but not its
+        # segment; returns (offset reached, index of that old checkpoint or None)
+        transitions = self.table.transitions
+        steps = self.table.steps
+        accepting = self.table.accepting
+        start_state = self.table.start
+        segment = self.segments[-1]
+        base = position
+        text = self.text
+        next_checkpoint = position + self.interval
+        for i in range(position, len(text)):
+            if i == next_checkpoint or i in targets:
+                checkpoint = {state: frozenset(i - start for start in starts) for state, starts in runs.items()}
+                if i in targets and checkpoint == old_checkpoints[targets[i]]:
+                    self.positions.append(i)
+                    self.checkpoints.append(checkpoint)
+                    return i, targets[i]
+                if i == next_checkpoint:
+                    self.positions.append(i)
+                    self.checkpoints.append(checkpoint)
+                    segment = []
+                    self.segments.append(segment)
+                    base = i
+                    next_checkpoint = i + self.interval
+            if start_state in runs:
+                runs[start_state].append(i)
+            else:
+                runs[start_state] = [i]
+            symbol = text[i]
+            stepped = {}
+            for state, starts in runs.items():
+                target = steps[state](symbol)
+                if target is None:
+                    continue
+                if target in stepped:
+                    stepped[target].extend(starts)
+                else:
+                    stepped[target] = starts
+            end = i + 1 - base
+            for state, starts in stepped.items():
+                if accepting[state]:
+                    for start in starts:
+                        segment.append((start - base, end))
+            # Attempts in states without transitions cannot match anything more
+            runs = {state: starts for state, starts in stepped.items() if transitions[state]}
+        return len(text), None
+
+    def spans(self):
+        # (start, end) of every match, ordered by end
+        for position, segment in zip(self.positions, self.segments):
+            for start, end in segment:
+                yield position + start, position + end
+
+    def findall(self) -> list:
+        return [self.text[start:end] for start, end in sorted(self.spans())]
+
+    def __repr__(self):
+        return f"IncrementalMatcher(length={len(self.text)}, checkpoints={len(self.positions)})"
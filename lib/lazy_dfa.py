@@ -0,0 +1,34 @@
+# lib/lazy_dfa.py
+
+from lib.nfa import NFA
+from lib.nfa_simulator import NFASimulator
+
+class LazyDFA(NFASimulator):
+    """
+    Determinizes the NFA on demand: each set of NFA states reached while matching
+    becomes a cached DFA state. The cache is flushed once it holds max_states
+    entries, so memory stays bounded even for patterns with huge DFAs.
+    """
+    def __init__(self, nfa: NFA, max_states=10000):
+        super().__init__(nfa)
+        self.max_states = max_states
+        self.cache = {}  # frozenset of NFA states -> {symbol: frozenset of NFA states}
+        self.final_cache = {}  # frozenset of NFA states -> bool
+
+    def step(self, states, symbol):
+        transitions = self.cache.get(states)
+        if transitions is None:
+            if len(self.cache) >= self.max_states:
+                self.cache.clear()
+                self.final_cache.clear()
+            transitions = self.cache[states] = {}
+        target = transitions.get(symbol)
+        if target is None:
+            target = transitions[symbol] = super().step(states, symbol)
+        return target
+
+    def is_final(self, states):
+        final = self.final_cache.get(states)
+        if final is None:
+            final = self.final_cache[states] = super().is_final(states)
+        return final
@@ -2,11 +2,32 @@
 
 from lib.token import Token, TokenType
 
+# Characters that always make a token of their own, with the character as its value
+SINGLE_CHAR_TOKENS = {
+    '$': TokenType.ASSERTION,
+    '^': TokenType.ASSERTION,
+    '|': TokenType.OR,
+    '.': TokenType.ANY_CHAR,
+    '*': TokenType.KLEENE_STAR,
+    '+': TokenType.PLUS,
+    '?': TokenType.QUESTION,
+    '[': TokenType.RANGE_START,
+    ']': TokenType.RANGE_END,
+    ')': TokenType.GROUP_END,
+    '{': TokenType.REPEAT_START,
+    '}': TokenType.REPEAT_END,
+    ',': TokenType.COMMA,
+}
+EXTENDED_SINGLE_CHAR_TOKENS = dict(SINGLE_CHAR_TOKENS, **{'&': TokenType.AND, '~': TokenType.COMPLEMENT})
+ESCAPED_ASSERTIONS = frozenset('AzbB')
+
 class Lexer:
-    def __init__(self, pattern: str):
+    def __init__(self, pattern: str, extended: bool = False):
         self.pattern = pattern
         self.position = 0
         self.length = len(pattern)
+        # The extended syntax adds '&' (intersection) and '~' (complement) operators
+        self.extended = extended
 
     def get_current_char(self) -> str:
         if self.position < self.length:
@@ -22,96 +43,127 @@ class Lexer:
         return '\0'
 
     def get_token(self) -> Token:
-        while self.position < self.length:
-            ch = self.get_current_char()
-
-            if ch == '\\':
-                self.advance()
-                next_char = self.get_current_char()
-                if next_char.isdigit():
-                    # Backreference
-                    num_str = ''
-                    while self.get_current_char().isdigit():
-                        num_str += self.get_current_char()
-                        self.advance()
-                    return Token(TokenType.BACKREFERENCE, num_str)
-                elif next_char in {'\\', '|', '[', ']', '(', ')', '{', '}', '.', '*', '+', '?', '$', ','}:
-                    # Escaped special character
-                    self.advance()
-                    return Token(TokenType.ESCAPED_CHAR, next_char)
-                else:
-                    # Any other escaped character
-                    self.advance()
-                    return Token(TokenType.ESCAPED_CHAR, next_char)
-
-            elif ch == '$':
-                self.advance()
-                return Token(TokenType.EMPTY_STRING, "$")
-
-            elif ch == '|':
-                self.advance()
-                return Token(TokenType.OR, "|")
-
-            elif ch == '.':
-                # Treat '.' as a wildcard (any character)
-                self.advance()
-                return Token(TokenType.ANY_CHAR, ".")
-
-            elif ch == '*':
-                self.advance()
-                return Token(TokenType.KLEENE_STAR, "*")
-
-            elif ch == '+':
-                self.advance()
-                return Token(TokenType.PLUS, "+")
-
-            elif ch == '?':
-                self.advance()
-                return Token(TokenType.QUESTION, "?")
-
-            elif ch == '[':
-                self.advance()
-                return Token(TokenType.RANGE_START, "[")
-
-            elif ch == ']':
-                self.advance()
-                return Token(TokenType.RANGE_END, "]")
-
-            elif ch == '(':
-                self.advance()
-                if self.get_current_char() == ':':
-                    self.advance()
-                    return Token(TokenType.NON_CAPTURING_GROUP_START, "(:")
-                else:
-                    return Token(TokenType.GROUP_START, "(")
-
-            elif ch == ')':
-                self.advance()
-                return Token(TokenType.GROUP_END, ")")
-
-            elif ch == '{':
-                self.advance()
-                return Token(TokenType.REPEAT_START, "{")
-
-            elif ch == '}':
-                self.advance()
-                return Token(TokenType.REPEAT_END, "}")
-
-            elif ch == ',':
-                self.advance()
-                return Token(TokenType.COMMA, ",")
-
-            elif ch.isdigit():
-                # Numbers outside backreferences (if any)
-                num_str = ''
-                while self.get_current_char().isdigit():
-                    num_str += self.get_current_char()
-                    self.advance()
-                return Token(TokenType.DIGIT, num_str)
-
+        position = self.position
+        if position >= self.length:
+            return Token(TokenType.END, "", self.length)
+        token_type, value, self.position = self._token_at(position)
+        return Token(token_type, value, position)
+
+    def _token_at(self, i: int) -> tuple:
+        # (type, value, offset after the token) of the token starting at offset i;
+        # the lexing rules used by both get_token and scan
+        pattern = self.pattern
+        length = self.length
+        ch = pattern[i]
+        token_type = (EXTENDED_SINGLE_CHAR_TOKENS if self.extended else SINGLE_CHAR_TOKENS).get(ch)
+        if token_type is not None:
+            return token_type, ch, i + 1
+        if ch == '\\':
+            next_char = pattern[i + 1] if i + 1 < length else '\0'
+            if next_char.isdigit():
+                # Backreference
+                end = i + 2
+                while end < length and pattern[end].isdigit():
+                    end += 1
+                return TokenType.BACKREFERENCE, pattern[i + 1:end], end
+            if next_char in ESCAPED_ASSERTIONS:
+                # Start/end of input and word boundary assertions
+                return TokenType.ASSERTION, '\\' + next_char, i + 2
+            # Escaped special or any other character
+            return TokenType.ESCAPED_CHAR, next_char, i + 2
+        if ch == '(':
+            if pattern.startswith('?:', i + 1):
+                return TokenType.NON_CAPTURING_GROUP_START, "(?:", i + 3
+            if pattern.startswith(':', i + 1):
+                return TokenType.NON_CAPTURING_GROUP_START, "(:", i + 2
+            return TokenType.GROUP_START, "(", i + 1
+        if ch.isdigit():
+            # Numbers outside backreferences (if any)
+            end = i + 1
+            while end < length and pattern[end].isdigit():
+                end += 1
+            return TokenType.DIGIT, pattern[i:end], end
+        # Literal characters
+        return TokenType.LITERAL, ch, i + 1
+
+    def tokenize(self) -> list:
+        """
+        Lexes the whole pattern up front, including the trailing END token.
+        """
+        return self.scan().tokens()
+
+    def scan(self) -> "TokenBuffer":
+        """
+        Lexes the whole pattern in one pass into a TokenBuffer, producing the same
+        tokens as get_token. Most characters are looked up in the single character
+        table; escapes, group openings and digit runs go through _token_at.
+        """
+        pattern = self.pattern
+        length = self.length
+        table = EXTENDED_SINGLE_CHAR_TOKENS if self.extended else SINGLE_CHAR_TOKENS
+        token_at = self._token_at
+        types = []
+        values = []
+        positions = []
+        i = self.position
+        while i < length:
+            ch = pattern[i]
+            token_type = table.get(ch)
+            start = i
+            if token_type is not None:
+                value = ch
+                i += 1
             else:
-                # Literal characters
-                self.advance()
-                return Token(TokenType.LITERAL, ch)
+                token_type, value, i = token_at(i)
+            types.append(token_type)
+            values.append(value)
+            positions.append(start)
+        self.position = length
+        types.append(TokenType.END)
+        values.append("")
+        positions.append(length)
+        return TokenBuffer(types, values, positions)
+
+class TokenBuffer:
+    """
+    Token stream of a whole pattern held as parallel lists of token types, values
+    and offsets in the pattern (for error messages), ending with END. get_token
+    hands the tokens out one at a time, so the Parser reads it like a Lexer.
+    """
+    __slots__ = ("types", "values", "positions", "index", "last")
+
+    def __init__(self, types: list, values: list, positions: list):
+        self.types = types
+        self.values = values
+        self.positions = positions
+        self.index = 0
+        self.last = len(types) - 1  # Index of END
+
+    def __len__(self):
+        return len(self.types)
 
+    def get_token(self) -> Token:
+        index = self.index
+        if index < self.last:
+            self.index = index + 1
+        # Past the end, END is repeated
+        return Token(self.types[index], self.values[index], self.positions[index])
+
+    def tokens(self) -> list:
+        return [Token(token_type, value, position)
+                for token_type, value, position in zip(self.types, self.values, self.positions)]
+
+class TokenStream:
+    """
+    Replays an already lexed token list through the Lexer interface used by the Parser.
+    """
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.index = 0
+
+    def get_token(self) -> Token:
+        if self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            self.index += 1
+            return token
         return Token(TokenType.END, "")
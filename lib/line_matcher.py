@@ -0,0 +1,153 @@
+# lib/line_matcher.py
+
+from lib.dfa import DFA
+from lib.assertions import EDGE, NEWLINE, symbol_context
+
+MATCH = -1  # Pseudo state: the current line has matched
+DEAD = -2  # Pseudo state: the current line can no longer match
+
+
+class LineMatcher:
+    """
+    Finds the lines of a buffer that contain a match of a DFA, in one pass and without
+    splitting the buffer. Match attempts from every position of a line run together
+    as a set of DFA states; these sets are determinized lazily into a search DFA
+    that resets to its initial state at each newline. As soon as a line has matched
+    (or, with full_line, can no longer match) the scan jumps to the next newline.
+
+    Patterns with assertions run on their AnchoredDFA. A line starts from the start
+    state for the context before it (a newline, or the start of the input), and an
+    attempt accepts on seeing the context of the next symbol, or of the newline or
+    end of input closing the line, so '^' and '$' match at line starts and ends.
+
+    Works on str with a char mode DFA, and on bytes or mmap with a byte mode DFA.
+    The lazily built tables are mutated while scanning, so use one LineMatcher per
+    thread.
+    """
+    def __init__(self, dfa: DFA, full_line=False, max_states=10000):
+        self.dfa = dfa
+        self.full_line = full_line  # Whole line must match, like grep -x
+        self.max_states = max_states  # Cache size; it is flushed between lines when exceeded
+        self._reset()
+
+    def _reset(self):
+        self.sets = []  # Search state index -> frozenset of DFA states, or key of an anchored search state
+        self.line_end = []  # Search state index -> (accepts before a newline, accepts at the end of the input)
+        self.index = {}  # Set or key -> search state index
+        self.rows = []  # Search state index -> {symbol: next index, MATCH or DEAD}
+        if self.dfa.has_assertions:
+            # Anchored search states are (DFA states reached by at least one symbol,
+            # start state of the attempt beginning at the next symbol or None)
+            starts = self.dfa.start_states
+            self.initials = (self._anchored_index((frozenset(), starts[EDGE])),
+                             self._anchored_index((frozenset(), starts[NEWLINE])))
+        else:
+            initial = self._state_index(frozenset([self.dfa.start_state]))
+            self.initials = (initial, initial)  # For the first line, and for the others
+
+    def _state_index(self, states):
+        index = self.index.get(states)
+        if index is None:
+            index = self.index[states] = len(self.sets)
+            self.sets.append(states)
+            accepting = self.full_line and any(state.is_final for state in states)
+            self.line_end.append((accepting, accepting))
+            self.rows.append({})
+        return index
+
+    def _anchored_index(self, key):
+        index = self.index.get(key)
+        if index is None:
+            index = self.index[key] = len(self.sets)
+            self.sets.append(key)
+            reached, start = key
+            # Only full lines may be empty; searches report non-empty matches
+            if not self.full_line:
+                start = None
+            self.line_end.append(tuple(
+                any(state.accepts[context] for state in reached) or (start is not None and start.accepts[context])
+                for context in (NEWLINE, EDGE)
+            ))
+            self.rows.append({})
+        return index
+
+    def _step(self, index, symbol):
+        if self.dfa.has_assertions:
+            return self._anchored_step(index, symbol)
+        targets = set()
+        for state in self.sets[index]:
+            target = state.get_transition(symbol)
+            if target is not None:
+                targets.add(target)
+        if self.full_line:
+            result = self._state_index(frozenset(targets)) if targets else DEAD
+        elif any(state.is_final for state in targets):
+            result = MATCH
+        else:
+            # A new match attempt can start at the next position
+            targets.add(self.dfa.start_state)
+            result = self._state_index(frozenset(targets))
+        self.rows[index][symbol] = result
+        return result
+
+    def _anchored_step(self, index, symbol):
+        reached, start = self.sets[index]
+        context = symbol_context(symbol)
+        if not self.full_line and any(state.accepts[context] for state in reached):
+            # An attempt ended before this symbol, which gives the context it needed
+            result = MATCH
+        else:
+            targets = set()
+            for state in reached if start is None else (*reached, start):
+                target = state.get_transition(symbol)
+                if target is not None:
+                    targets.add(target)
+            if self.full_line:
+                result = self._anchored_index((frozenset(targets), None)) if targets else DEAD
+            else:
+                result = self._anchored_index((frozenset(targets), self.dfa.start_states[context]))
+        self.rows[index][symbol] = result
+        return result
+
+    def iter_lines(self, buffer):
+        """
+        Yields (line_number, start, end) for every matching line, numbered from 1;
+        end is the offset of the line's newline (or of the end of the buffer).
+        """
+        is_text = isinstance(buffer, str)
+        newline = "\n" if is_text else b"\n"
+        newline_symbol = "\n" if is_text else 10
+        length = len(buffer)
+        position = 0
+        line_number = 0
+        while position < length:
+            if len(self.sets) > self.max_states:
+                self._reset()
+            rows = self.rows
+            line_number += 1
+            state = self.initials[position > 0]
+            matched = None
+            i = position
+            while i < length:
+                symbol = buffer[i]
+                if symbol == newline_symbol:
+                    break
+                next_state = rows[state].get(symbol)
+                if next_state is None:
+                    next_state = self._step(state, symbol)
+                if next_state < 0:
+                    matched = next_state == MATCH
+                    i = buffer.find(newline, i)
+                    if i == -1:
+                        i = length
+                    break
+                state = next_state
+                i += 1
+            if matched is None:
+                matched = self.line_end[state][i >= length]
+            if matched:
+                yield line_number, position, i
+            position = i + 1
+
+    def count(self, buffer):
+        return sum(1 for _ in self.iter_lines(buffer))
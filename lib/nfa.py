@@ -10,6 +10,7 @@ class NFAState:
         NFAState.id_counter += 1
         self.transitions = {}  # symbol -> set of NFAState
         self.is_final = is_final
+        self.tag = None  # Optional label of a final state, e.g. the tokenizer rule it accepts
 
     def add_transition(self, symbol, state):
         if symbol not in self.transitions:
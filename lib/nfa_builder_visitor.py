@@ -2,49 +2,153 @@
 
 from lib.ast_visitor import ASTVisitor
 from lib.nfa import NFA, NFAState
+from lib.utf8_ranges import merge_ranges, complement_ranges, utf8_sequences
 from lib.ast_tree import (
     CharNode, ConcatNode, StarNode, OrNode, GroupNode,
     BackreferenceNode, RangeNode, RepeatNode, EmptyNode,
     CharacterSetNode, RepeatExactNode
 )
+from lib.errors import RegexError
+from lib.assertions import assertion_symbol
 
 class NFABuilderVisitor(ASTVisitor):
-    def __init__(self):
+    def __init__(self, budget=None, byte_mode=False, fragment_cache=None):
         self.group_map = {}  # Maps group numbers to (start_state, end_state)
         self.nfa = None
         self.current_group = None
+        self.budget = budget  # Optional BudgetContext, counts the states allocated and is checked per sub-NFA
+        # In byte mode characters are lowered to UTF-8 byte sequences and
+        # transitions are labelled with byte values (0-255) instead of str
+        self.byte_mode = byte_mode
+        # Optional FragmentCache: fragments of interned subtrees are copied from it
+        # and stored into it. Both collections below are shared with child visitors.
+        self.fragment_cache = fragment_cache
+        self.reused = {}  # id -> node served from entries that predate this build
+        self.stored = set()  # ids of nodes stored during this build
 
     def get_nfa(self):
         return self.nfa
 
+    def build(self, node):
+        self.nfa = self._build(node)
+        return self.nfa
+
+    def _new_visitor(self):
+        if self.budget:
+            self.budget.check_nfa_states()
+        visitor = NFABuilderVisitor(self.budget, self.byte_mode, self.fragment_cache)
+        visitor.reused = self.reused
+        visitor.stored = self.stored
+        return visitor
+
+    def _new_state(self, is_final):
+        if self.budget:
+            self.budget.add_nfa_states(1)
+        return NFAState(is_final)
+
+    def _build(self, root):
+        # Visit methods of composite nodes are generators: they yield each child whose
+        # NFA they need and are sent it back. Driving them from an explicit stack keeps
+        # deeply nested patterns off the Python call stack.
+        pending = []  # (node, visitor, generator) of visits waiting for a child's NFA
+        node = root
+        while True:
+            nfa = self._cached(node)
+            if nfa is None:
+                visitor = self._new_visitor()
+                steps = node.accept(visitor)
+                if steps is None:
+                    nfa = self._store(node, visitor.get_nfa())
+                else:
+                    pending.append((node, visitor, steps))
+            # Resume the waiting visits (a new one is started with None) until one asks for a child
+            while pending:
+                parent, visitor, steps = pending[-1]
+                try:
+                    node = steps.send(nfa)
+                    break
+                except StopIteration:
+                    pending.pop()
+                    nfa = self._store(parent, visitor.get_nfa())
+            else:
+                return nfa
+
+    def _cached(self, node):
+        cache = self.fragment_cache
+        if cache is None:
+            return None
+        nfa = cache.get_nfa(node, self.byte_mode)
+        if nfa is not None:
+            if id(node) not in self.stored:
+                self.reused[id(node)] = node
+            if self.budget:
+                self.budget.add_nfa_states(len(nfa.get_all_states()))
+                self.budget.check_nfa_states()
+        return nfa
+
+    def _store(self, node, nfa):
+        cache = self.fragment_cache
+        if cache is not None and cache.should_store(node):
+            cache.put_nfa(node, self.byte_mode, nfa)
+            self.stored.add(id(node))
+        return nfa
+
+    def _build_byte_class(self, code_point_ranges):
+        # One chain of states per UTF-8 byte-range sequence, all sharing start and end
+        start = self._new_state(False)
+        end = self._new_state(True)
+        for first, last in merge_ranges(code_point_ranges):
+            for sequence in utf8_sequences(first, last):
+                current = start
+                for index, (low, high) in enumerate(sequence):
+                    target = end if index == len(sequence) - 1 else self._new_state(False)
+                    for byte in range(low, high + 1):
+                        current.add_transition(byte, target)
+                    current = target
+        self.nfa = NFA(start, {end})
+
     def visit_char_node(self, node):
-        start = NFAState(False)
-        end = NFAState(True)
+        if self.byte_mode:
+            code_point = ord(node.get_value())
+            self._build_byte_class([(code_point, code_point)])
+            return
+        start = self._new_state(False)
+        end = self._new_state(True)
         start.add_transition(node.get_value(), end)
         self.nfa = NFA(start, {end})
 
-    def visit_concat_node(self, node):
-        left_visitor = NFABuilderVisitor()
-        node.get_left().accept(left_visitor)
-        left_nfa = left_visitor.get_nfa()
-
-        right_visitor = NFABuilderVisitor()
-        node.get_right().accept(right_visitor)
-        right_nfa = right_visitor.get_nfa()
+    def _chain(self, node, chain_type):
+        # Operands of a left-nested chain of chain_type nodes, left to right. The chain
+        # is walked iteratively, so long literals and keyword lists do not recurse, and
+        # stops at a cached prefix, which is reused whole. Other prefixes are not built
+        # as nodes of their own, so only the whole chain is stored.
+        cache = self.fragment_cache
+        parts = [node.get_right()]
+        node = node.get_left()
+        while isinstance(node, chain_type) and not (cache is not None and cache.has_nfa(node, self.byte_mode)):
+            parts.append(node.get_right())
+            node = node.get_left()
+        parts.append(node)
+        parts.reverse()
+        return parts
 
-        for state in left_nfa.get_final_states():
-            state.is_final = False
-            state.add_epsilon_transition(right_nfa.get_start_state())
+    def visit_concat_node(self, node):
+        parts = self._chain(node, ConcatNode)
+        nfa = yield parts[0]
+        for part in parts[1:]:
+            right_nfa = yield part
+            for state in nfa.get_final_states():
+                state.is_final = False
+                state.add_epsilon_transition(right_nfa.get_start_state())
+            nfa = NFA(nfa.get_start_state(), right_nfa.get_final_states())
 
-        self.nfa = NFA(left_nfa.get_start_state(), right_nfa.get_final_states())
+        self.nfa = nfa
 
     def visit_star_node(self, node):
-        inner_visitor = NFABuilderVisitor()
-        node.get_child().accept(inner_visitor)
-        inner_nfa = inner_visitor.get_nfa()
+        inner_nfa = yield node.get_child()
 
-        start = NFAState(False)
-        end = NFAState(True)
+        start = self._new_state(False)
+        end = self._new_state(True)
 
         start.add_epsilon_transition(inner_nfa.get_start_state())
         start.add_epsilon_transition(end)
@@ -57,38 +161,25 @@ class NFABuilderVisitor(ASTVisitor):
         self.nfa = NFA(start, {end})
 
     def visit_or_node(self, node):
-        left_visitor = NFABuilderVisitor()
-        node.get_left().accept(left_visitor)
-        left_nfa = left_visitor.get_nfa()
-
-        right_visitor = NFABuilderVisitor()
-        node.get_right().accept(right_visitor)
-        right_nfa = right_visitor.get_nfa()
-
-        start = NFAState(False)
-        end = NFAState(True)
+        # One start and end state for the whole chain of alternatives
+        start = self._new_state(False)
+        end = self._new_state(True)
 
-        start.add_epsilon_transition(left_nfa.get_start_state())
-        start.add_epsilon_transition(right_nfa.get_start_state())
-
-        for state in left_nfa.get_final_states():
-            state.is_final = False
-            state.add_epsilon_transition(end)
-
-        for state in right_nfa.get_final_states():
-            state.is_final = False
-            state.add_epsilon_transition(end)
+        for part in self._chain(node, OrNode):
+            part_nfa = yield part
+            start.add_epsilon_transition(part_nfa.get_start_state())
+            for state in part_nfa.get_final_states():
+                state.is_final = False
+                state.add_epsilon_transition(end)
 
         self.nfa = NFA(start, {end})
 
     def visit_capture_group_node(self, node):
         group_num = node.get_group_num()
-        inner_visitor = NFABuilderVisitor()
-        node.get_child().accept(inner_visitor)
-        inner_nfa = inner_visitor.get_nfa()
+        inner_nfa = yield node.get_child()
 
-        start = NFAState(False)
-        end = NFAState(True)
+        start = self._new_state(False)
+        end = self._new_state(True)
 
         start.add_epsilon_transition(inner_nfa.get_start_state())
         for state in inner_nfa.get_final_states():
@@ -99,9 +190,7 @@ class NFABuilderVisitor(ASTVisitor):
         self.nfa = NFA(start, {end})
 
     def visit_non_capturing_group_node(self, node):
-        inner_visitor = NFABuilderVisitor()
-        node.get_child().accept(inner_visitor)
-        self.nfa = inner_visitor.get_nfa()
+        self.nfa = yield node.get_child()
 
     def visit_backreference_node(self, node):
         group_num = node.get_group_num()
@@ -119,15 +208,10 @@ class NFABuilderVisitor(ASTVisitor):
         if max_repeats is not None and min_repeats > max_repeats:
             raise ValueError("Minimum repeats cannot exceed maximum repeats.")
 
-        # Build NFA for child
-        child_visitor = NFABuilderVisitor()
-        child.accept(child_visitor)
-        child_nfa = child_visitor.get_nfa()
-
         if min_repeats == 0 and max_repeats == 0:
             # Equivalent to empty string
-            start = NFAState(False)
-            end = NFAState(True)
+            start = self._new_state(False)
+            end = self._new_state(True)
             start.add_epsilon_transition(end)
             self.nfa = NFA(start, {end})
             return
@@ -136,6 +220,9 @@ class NFABuilderVisitor(ASTVisitor):
         previous_end_states = set()
 
         for _ in range(min_repeats):
+            # Every copy needs its own states, so the child is rebuilt each time
+            child_nfa = yield child
+
             if nfa is None:
                 nfa = child_nfa
             else:
@@ -147,10 +234,11 @@ class NFABuilderVisitor(ASTVisitor):
 
         if max_repeats is None:
             # Unlimited repetitions after min_repeats
-            star_visitor = NFABuilderVisitor()
-            star_node = StarNode(child)
-            star_node.accept(star_visitor)
-            star_nfa = star_visitor.get_nfa()
+            star = StarNode(child)
+            if self.fragment_cache is not None:
+                # Interned like the pattern's nodes, so the cache keys it and knows its size
+                star = self.fragment_cache.intern(star)
+            star_nfa = yield star
 
             if nfa is None:
                 nfa = star_nfa
@@ -163,11 +251,10 @@ class NFABuilderVisitor(ASTVisitor):
             # Limited repetitions
             optional_part = max_repeats - min_repeats
             for _ in range(optional_part):
-                optional_visitor = NFABuilderVisitor()
-                optional_nfa = child.accept(optional_visitor) or child_visitor.get_nfa()
+                optional_nfa = yield child
 
-                start = NFAState(False)
-                end = NFAState(True)
+                start = self._new_state(False)
+                end = self._new_state(True)
                 start.add_epsilon_transition(optional_nfa.get_start_state())
                 start.add_epsilon_transition(end)
 
@@ -182,14 +269,22 @@ class NFABuilderVisitor(ASTVisitor):
                         state.is_final = False
                         state.add_epsilon_transition(start)
                     nfa = NFA(nfa.get_start_state(), {end})
+                previous_end_states = {end}
 
         self.nfa = nfa
 
     def visit_range_node(self, node):
         ranges = node.get_ranges()
         negated = node.is_negated()
-        start = NFAState(False)
-        end = NFAState(True)
+        if self.byte_mode:
+            # Negation is over all of Unicode here, not just printable ASCII
+            code_point_ranges = [(ord(r[0]), ord(r[-1])) for r in ranges]
+            if negated:
+                code_point_ranges = complement_ranges(code_point_ranges)
+            self._build_byte_class(code_point_ranges)
+            return
+        start = self._new_state(False)
+        end = self._new_state(True)
 
         if negated:
             # Assuming printable ASCII for negation
@@ -215,16 +310,30 @@ class NFABuilderVisitor(ASTVisitor):
         self.nfa = NFA(start, {end})
 
     def visit_empty_node(self, node):
-        start = NFAState(False)
-        end = NFAState(True)
+        start = self._new_state(False)
+        end = self._new_state(True)
         start.add_epsilon_transition(end)
         self.nfa = NFA(start, {end})
 
+    def visit_assertion_node(self, node):
+        # Crossed without consuming input, where the assertion holds (see NFAtoDFAConverter)
+        start = self._new_state(False)
+        end = self._new_state(True)
+        start.add_transition(assertion_symbol(node.get_kind()), end)
+        self.nfa = NFA(start, {end})
+
     def visit_character_set_node(self, node):
         # Similar to RangeNode but with explicit characters
         characters = node.get_characters()
-        start = NFAState(False)
-        end = NFAState(True)
+        if self.byte_mode:
+            if node.is_any_char():
+                # '.' is any code point except line breaks
+                self._build_byte_class(complement_ranges([(ord('\n'), ord('\n')), (ord('\r'), ord('\r'))]))
+            else:
+                self._build_byte_class([(ord(ch), ord(ch)) for ch in characters])
+            return
+        start = self._new_state(False)
+        end = self._new_state(True)
         for ch in characters:
             start.add_transition(ch, end)
         self.nfa = NFA(start, {end})
@@ -238,8 +347,8 @@ class NFABuilderVisitor(ASTVisitor):
 
         if exact == 0:
             # Equivalent to empty string
-            start = NFAState(False)
-            end = NFAState(True)
+            start = self._new_state(False)
+            end = self._new_state(True)
             start.add_epsilon_transition(end)
             self.nfa = NFA(start, {end})
             return
@@ -248,9 +357,7 @@ class NFABuilderVisitor(ASTVisitor):
         previous_end_states = set()
 
         for _ in range(exact):
-            child_visitor = NFABuilderVisitor()
-            child.accept(child_visitor)
-            child_nfa = child_visitor.get_nfa()
+            child_nfa = yield child
 
             if nfa is None:
                 nfa = child_nfa
@@ -263,3 +370,9 @@ class NFABuilderVisitor(ASTVisitor):
             previous_end_states = child_nfa.get_final_states()
 
         self.nfa = nfa
+
+    def visit_and_node(self, node):
+        raise RegexError("Intersection is only supported by the derivative engine")
+
+    def visit_complement_node(self, node):
+        raise RegexError("Complement is only supported by the derivative engine")
@@ -0,0 +1,154 @@
+# lib/nfa_optimizer.py
+
+from collections import deque
+from lib.nfa import NFA, NFAState
+
+EPSILON = '\0'
+
+
+class NFAOptimizer:
+    """
+    Shrinks a Thompson NFA before determinization without changing its language:
+
+    1. Epsilon elimination: only the start state and targets of symbol edges are
+       kept, each taking over the symbol edges and finality of its epsilon closure.
+    2. Pruning: states that are unreachable or cannot reach a final state go.
+    3. Merging: states with the same finality, tag and outgoing edges are merged,
+       repeated until no more merge (merges can make predecessors equal).
+
+    The result has no epsilon edges, so every epsilon_closure is trivial. State
+    tags (see Tokenizer) are kept like the subset construction does: lowest wins.
+    """
+    def __init__(self, budget=None):
+        self.budget = budget  # Optional BudgetContext, its time limit is checked per pass
+
+    def optimize(self, nfa: NFA) -> NFA:
+        start, finals, tags, edges = self._remove_epsilons(nfa)
+        self._check_time()
+        start, finals, tags, edges = self._prune(start, finals, tags, edges)
+        self._check_time()
+        start, finals, tags, edges = self._merge(start, finals, tags, edges)
+        return self._build(start, finals, tags, edges)
+
+    def _check_time(self):
+        if self.budget:
+            self.budget.check_time("optimize")
+
+    def _remove_epsilons(self, nfa):
+        # States become indices; edges[i] maps a symbol to a set of target indices
+        states = list(nfa.get_all_states())
+        index = {state: i for i, state in enumerate(states)}
+        start = index[nfa.get_start_state()]
+        important = {start}
+        for state in states:
+            for symbol, targets in state.get_transitions().items():
+                if symbol != EPSILON:
+                    important.update(index[target] for target in targets)
+
+        # A non-final state whose only edge is one epsilon edge adds nothing to a
+        # closure but its target, so chains of them (e.g. the ends of nested
+        # alternations) are skipped, with the resolved target memoized
+        forward = {}
+
+        def resolve(j):
+            path = []
+            on_path = set()
+            while j not in forward:
+                transitions = states[j].get_transitions()
+                targets = transitions.get(EPSILON)
+                if states[j].is_final or len(transitions) != 1 or targets is None or len(targets) != 1:
+                    forward[j] = j
+                    break
+                path.append(j)
+                on_path.add(j)
+                j = index[next(iter(targets))]
+                if j in on_path:
+                    break  # An epsilon-only cycle: stop at a state already on the path
+            resolved = forward.get(j, j)
+            for k in path:
+                forward[k] = resolved
+            return resolved
+
+        finals, tags, edges = set(), {}, {}
+        for i in important:
+            closure = {i}
+            stack = [i]
+            while stack:
+                for target in states[stack.pop()].get_transitions().get(EPSILON, ()):
+                    j = resolve(index[target])
+                    if j not in closure:
+                        closure.add(j)
+                        stack.append(j)
+            moves = {}
+            for j in closure:
+                state = states[j]
+                if state.is_final:
+                    finals.add(i)
+                    if state.tag is not None and (tags.get(i) is None or state.tag < tags[i]):
+                        tags[i] = state.tag
+                for symbol, targets in state.get_transitions().items():
+                    if symbol != EPSILON:
+                        moves.setdefault(symbol, set()).update(index[target] for target in targets)
+            edges[i] = moves
+        return start, finals, tags, edges
+
+    def _prune(self, start, finals, tags, edges):
+        predecessors = {i: set() for i in edges}
+        for source, moves in edges.items():
+            for targets in moves.values():
+                for target in targets:
+                    predecessors[target].add(source)
+        live = set(finals)
+        queue = deque(live)
+        while queue:
+            for source in predecessors[queue.popleft()]:
+                if source not in live:
+                    live.add(source)
+                    queue.append(source)
+
+        kept = {start}
+        queue = deque(kept)
+        while queue:
+            for targets in edges[queue.popleft()].values():
+                for target in targets:
+                    if target in live and target not in kept:
+                        kept.add(target)
+                        queue.append(target)
+        pruned = {}
+        for i in kept:
+            moves = {}
+            for symbol, targets in edges[i].items():
+                targets = targets & live
+                if targets:
+                    moves[symbol] = targets
+            pruned[i] = moves
+        return start, finals & kept, {i: tag for i, tag in tags.items() if i in kept}, pruned
+
+    def _merge(self, start, finals, tags, edges):
+        while True:
+            representative = {}
+            by_signature = {}
+            for i, moves in edges.items():
+                signature = (i in finals, tags.get(i),
+                             frozenset((symbol, frozenset(targets)) for symbol, targets in moves.items()))
+                representative[i] = by_signature.setdefault(signature, i)
+            if len(by_signature) == len(edges):
+                return start, finals, tags, edges
+            self._check_time()
+            edges = {
+                i: {symbol: {representative[target] for target in targets} for symbol, targets in moves.items()}
+                for i, moves in edges.items() if representative[i] == i
+            }
+            finals = {i for i in finals if i in edges}
+            tags = {i: tag for i, tag in tags.items() if i in edges}
+            start = representative[start]
+
+    def _build(self, start, finals, tags, edges):
+        states = {i: NFAState(i in finals) for i in edges}
+        for i, moves in edges.items():
+            state = states[i]
+            state.tag = tags.get(i)
+            for symbol, targets in moves.items():
+                for target in targets:
+                    state.add_transition(symbol, states[target])
+        return NFA(states[start], {states[i] for i in finals})
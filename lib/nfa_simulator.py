@@ -0,0 +1,59 @@
+# lib/nfa_simulator.py
+
+from lib.nfa import NFA
+from lib.nfa_to_dfa_converter import NFAtoDFAConverter
+
+class NFASimulator:
+    """
+    Matches directly on the NFA by tracking the set of active states.
+    Nothing is determinized, so compile cost stays linear in the NFA size.
+    """
+    def __init__(self, nfa: NFA):
+        self.nfa = nfa
+        self.converter = NFAtoDFAConverter()
+        self.start_closure = frozenset(self.converter.epsilon_closure({nfa.get_start_state()}))
+
+    def step(self, states, symbol):
+        targets = set()
+        for state in states:
+            targets.update(state.transitions.get(symbol, ()))
+        if not targets:
+            return frozenset()
+        return frozenset(self.converter.epsilon_closure(targets))
+
+    def is_final(self, states):
+        return any(state.is_final for state in states)
+
+    def match(self, input_str):
+        current = self.start_closure
+        for symbol in input_str:
+            current = self.step(current, symbol)
+            if not current:
+                return False
+        return self.is_final(current)
+
+    def longest_match(self, input_str, start=0):
+        current = self.start_closure
+        end = None
+        for j in range(start, len(input_str)):
+            current = self.step(current, input_str[j])
+            if not current:
+                break
+            if self.is_final(current):
+                end = j + 1
+        return end
+
+    def findall(self, input_str):
+        matches = []
+        length = len(input_str)
+        for i in range(length):
+            current = self.start_closure
+            j = i
+            while j < length:
+                current = self.step(current, input_str[j])
+                if not current:
+                    break
+                if self.is_final(current):
+                    matches.append(input_str[i:j+1])
+                j += 1
+        return matches
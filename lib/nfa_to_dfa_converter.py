@@ -4,16 +4,26 @@ from collections import deque
 from lib.dfa import DFA
 from lib.dfa_state import DFAState
 from lib.nfa import NFA, NFAState
+from lib.anchored_dfa import AnchoredDFA
+from lib.assertions import (
+    EDGE, NEWLINE, WORD, OTHER, CONTEXTS, holds, symbol_context, is_assertion_symbol, has_assertions
+)
 
 class NFAtoDFAConverter:
+    def __init__(self, budget=None):
+        self.budget = budget  # Optional BudgetContext (see CompileBudget.start), checked for every new DFA state
+
     def convert(self, nfa: NFA) -> DFA:
+        if has_assertions(nfa.get_all_states()):
+            return self._convert_with_context(nfa)
         start_closure = self.epsilon_closure({nfa.get_start_state()})
         state_mappings = {}
         dfa_states = set()
         queue = deque()
 
         # Create start state for DFA
-        start_state = DFAState(state_id=0, is_final=any(state.is_final for state in start_closure))
+        start_state = DFAState(state_id=0, is_final=any(state.is_final for state in start_closure),
+                               tag=self.final_tag(start_closure))
         state_mappings[frozenset(start_closure)] = start_state
         dfa_states.add(start_state)
         queue.append(frozenset(start_closure))
@@ -37,17 +47,108 @@ class NFAtoDFAConverter:
                 closure_frozen = frozenset(closure)
                 if closure_frozen not in state_mappings:
                     is_final = any(state.is_final for state in closure)
-                    new_dfa_state = DFAState(state_id=state_id_counter, is_final=is_final)
+                    new_dfa_state = DFAState(state_id=state_id_counter, is_final=is_final, tag=self.final_tag(closure))
                     state_mappings[closure_frozen] = new_dfa_state
                     dfa_states.add(new_dfa_state)
                     queue.append(closure_frozen)
                     state_id_counter += 1
+                    if self.budget:
+                        self.budget.check_dfa_states(state_id_counter)
                 else:
                     new_dfa_state = state_mappings[closure_frozen]
                 current_dfa_state.add_transition(symbol, new_dfa_state)
 
         return DFA(start_state=start_state, states=dfa_states)
 
+    def _convert_with_context(self, nfa: NFA) -> AnchoredDFA:
+        # Subset construction for patterns with assertions. A DFA state is a set of
+        # NFA states reached by a symbol edge, plus the context of that symbol
+        # (EDGE for the start of the input). Which assertion edges its closure may
+        # cross also depends on the context of the next symbol, so acceptance is
+        # recorded per next context, and the moves on a symbol are taken from the
+        # closure for that symbol's context.
+        state_mappings = {}
+        queue = deque()
+
+        def state_for(key):
+            dfa_state = state_mappings.get(key)
+            if dfa_state is None:
+                core, before = key
+                closures = [self.context_closure(core, before, after) for after in CONTEXTS]
+                accepts = tuple(any(state.is_final for state in closure) for closure in closures)
+                accept_tags = tuple(self.final_tag(closure) for closure in closures)
+                dfa_state = DFAState(state_id=len(state_mappings), is_final=accepts[EDGE], tag=accept_tags[EDGE])
+                dfa_state.accepts = accepts
+                dfa_state.accept_tags = accept_tags
+                state_mappings[key] = dfa_state
+                queue.append(key)
+                if self.budget:
+                    self.budget.check_dfa_states(len(state_mappings))
+            return dfa_state
+
+        start_core = frozenset({nfa.get_start_state()})
+        start_states = [state_for((start_core, before)) for before in CONTEXTS]
+
+        while queue:
+            key = queue.popleft()
+            core, before = key
+            current_dfa_state = state_mappings[key]
+            for after in (NEWLINE, WORD, OTHER):
+                transitions = {}
+                for nfa_state in self.context_closure(core, before, after):
+                    for symbol, target_states in nfa_state.transitions.items():
+                        if symbol == '\0' or is_assertion_symbol(symbol) or symbol_context(symbol) != after:
+                            continue
+                        transitions.setdefault(symbol, set()).update(target_states)
+                for symbol, target_nfa_states in transitions.items():
+                    current_dfa_state.add_transition(symbol, state_for((frozenset(target_nfa_states), after)))
+
+        # States that can never accept are dropped, so matching stops on them right
+        # away; a start state that cannot lead to a match becomes None
+        predecessors = {dfa_state: set() for dfa_state in state_mappings.values()}
+        for dfa_state in state_mappings.values():
+            for target in dfa_state.get_transitions().values():
+                predecessors[target].add(dfa_state)
+        live = {dfa_state for dfa_state in state_mappings.values() if any(dfa_state.accepts)}
+        pending = deque(live)
+        while pending:
+            for source in predecessors[pending.popleft()]:
+                if source not in live:
+                    live.add(source)
+                    pending.append(source)
+        # The EDGE start state is kept regardless, as the DFA's start_state
+        start_states = tuple(
+            dfa_state if dfa_state in live or context == EDGE else None
+            for context, dfa_state in zip(CONTEXTS, start_states)
+        )
+        states = live | {start_states[EDGE]}
+        for dfa_state in states:
+            dfa_state.transitions = {
+                symbol: target for symbol, target in dfa_state.get_transitions().items() if target in live
+            }
+        return AnchoredDFA(start_states, states)
+
+    def context_closure(self, states, before: int, after: int) -> set:
+        # Epsilon closure that also crosses the assertion edges holding between a
+        # symbol of context before and one of context after
+        stack = list(states)
+        closure = set(states)
+        while stack:
+            state = stack.pop()
+            for symbol, targets in state.transitions.items():
+                if symbol != '\0' and not (is_assertion_symbol(symbol) and holds(symbol[1], before, after)):
+                    continue
+                for next_state in targets:
+                    if next_state not in closure:
+                        closure.add(next_state)
+                        stack.append(next_state)
+        return closure
+
+    def final_tag(self, states) -> int:
+        # Tags order rules by priority, so the lowest tag wins
+        tags = [state.tag for state in states if state.is_final and state.tag is not None]
+        return min(tags) if tags else None
+
     def epsilon_closure(self, states: set) -> set:
         stack = list(states)
         closure = set(states)
@@ -1,12 +1,30 @@
 # lib/parser.py
+import string
 
 from lib.ast_tree import (
     ASTTree, CharNode, ConcatNode, OrNode, StarNode, GroupNode,
-    RepeatNode, RangeNode, BackreferenceNode, EmptyNode, CharacterSetNode, RepeatExactNode
+    RepeatNode, RangeNode, BackreferenceNode, EmptyNode, CharacterSetNode, RepeatExactNode,
+    AndNode, ComplementNode, AssertionNode
 )
 from lib.lexer import Lexer
 from lib.token import TokenType, Token
 
+# Token types that can start an atom (or '~' factor), and those that quantify one;
+# sets rather than tuples, as term() and factor() test every token against them
+ATOM_TOKENS = frozenset({
+    TokenType.LITERAL, TokenType.ESCAPED_CHAR, TokenType.GROUP_START,
+    TokenType.NON_CAPTURING_GROUP_START, TokenType.RANGE_START, TokenType.ANY_CHAR, TokenType.ASSERTION,
+    TokenType.BACKREFERENCE, TokenType.DIGIT, TokenType.COMMA, TokenType.COMPLEMENT
+})
+QUANTIFIER_TOKENS = frozenset({TokenType.KLEENE_STAR, TokenType.PLUS, TokenType.QUESTION, TokenType.REPEAT_START})
+# '.' is every printable character except line breaks
+ANY_CHARACTERS = frozenset(string.printable) - {'\n', '\r'}
+
+
+def _at(token: Token) -> str:
+    return f" at offset {token.position}" if token.position is not None else ""
+
+
 class Parser:
     def __init__(self, lexer: Lexer):
         self.lexer = lexer
@@ -14,34 +32,45 @@ class Parser:
         self.group_num = 1  # Start numbering groups from 1
 
     def parse(self) -> ASTTree:
-        return self.regex()
+        node = self.regex()
+        if self.current_token.type != TokenType.END:
+            raise SyntaxError(f"Unexpected token: {self.current_token.type}{_at(self.current_token)}")
+        return node
 
     def consume(self, token_type: TokenType):
         if self.current_token.type == token_type:
             self.current_token = self.lexer.get_token()
         else:
-            raise SyntaxError(f"Expected token {token_type}, got {self.current_token.type}")
+            raise SyntaxError(f"Expected token {token_type}, got {self.current_token.type}{_at(self.current_token)}")
 
     def regex(self) -> ASTTree:
         """
-        regex := term ('|' term)*
+        regex := conjunction ('|' conjunction)*
         """
-        node = self.term()
+        node = self.conjunction()
         while self.current_token.type == TokenType.OR:
             self.consume(TokenType.OR)
-            right = self.term()
+            right = self.conjunction()
             node = OrNode(node, right)
         return node
 
+    def conjunction(self) -> ASTTree:
+        """
+        conjunction := term ('&' term)*
+        """
+        node = self.term()
+        while self.current_token.type == TokenType.AND:
+            self.consume(TokenType.AND)
+            right = self.term()
+            node = AndNode(node, right)
+        return node
+
     def term(self) -> ASTTree:
         """
         term := factor+
         """
         nodes = []
-        while self.current_token.type in (
-            TokenType.LETTER , TokenType.ESCAPED_CHAR, TokenType.GROUP_START,
-            TokenType.NON_CAPTURING_GROUP_START, TokenType.RANGE_START, TokenType.NOT_SPECIAL_SYMBOL, TokenType.EMPTY_STRING
-        ):
+        while self.current_token.type in ATOM_TOKENS:
             nodes.append(self.factor())
         if not nodes:
             return EmptyNode()
@@ -52,12 +81,13 @@ class Parser:
 
     def factor(self) -> ASTTree:
         """
-        factor := atom ('*' | '+' | '?' | '{' number [',' number] '}')*
+        factor := '~' factor | atom ('*' | '+' | '?' | '{' number [',' number] '}')*
         """
+        if self.current_token.type == TokenType.COMPLEMENT:
+            self.consume(TokenType.COMPLEMENT)
+            return ComplementNode(self.factor())
         node = self.atom()
-        while self.current_token.type in (
-            TokenType.KLEENE_STAR, TokenType.PLUS, TokenType.QUESTION, TokenType.REPEAT_START
-        ):
+        while self.current_token.type in QUANTIFIER_TOKENS:
             if self.current_token.type == TokenType.KLEENE_STAR:
                 self.consume(TokenType.KLEENE_STAR)
                 node = StarNode(node)
@@ -73,21 +103,27 @@ class Parser:
 
     def atom(self) -> ASTTree:
         """
-        atom := LETTER | ESCAPED_CHAR | '.' | '(' regex ')' | '(?:' regex ')' | '[' range ']' | '$' | '\\' number
+        atom := LITERAL | ESCAPED_CHAR | DIGIT | ',' | '.' | '(' regex ')' | '(?:' regex ')' | '[' range ']' | ASSERTION | '\\' number
         """
         token = self.current_token
-        if token.type == TokenType.LETTER:
-            self.consume(TokenType.LETTER)
+        if token.type in (TokenType.LITERAL, TokenType.COMMA):
+            self.consume(token.type)
             return CharNode(token.value)
+        elif token.type == TokenType.DIGIT:
+            # Digits outside a repeat are literals; hand out one digit at a time
+            # so that a following quantifier only binds to the last one.
+            if len(token.value) > 1:
+                position = token.position + 1 if token.position is not None else None
+                self.current_token = Token(TokenType.DIGIT, token.value[1:], position)
+            else:
+                self.consume(TokenType.DIGIT)
+            return CharNode(token.value[0])
         elif token.type == TokenType.ESCAPED_CHAR:
             self.consume(TokenType.ESCAPED_CHAR)
             return CharNode(token.value)
-        elif token.type == TokenType.NOT_SPECIAL_SYMBOL:
-            self.consume(TokenType.NOT_SPECIAL_SYMBOL)
-            # Represent '.' as a character set of all printable characters except newline
-            import string
-            characters = set(string.printable) - {'\n', '\r'}
-            return CharacterSetNode(characters)
+        elif token.type == TokenType.ANY_CHAR:
+            self.consume(TokenType.ANY_CHAR)
+            return CharacterSetNode(set(ANY_CHARACTERS), any_char=True)
         elif token.type == TokenType.GROUP_START:
             self.consume(TokenType.GROUP_START)
             node = self.regex()
@@ -102,44 +138,52 @@ class Parser:
             return GroupNode(child=node, capturing=False)
         elif token.type == TokenType.RANGE_START:
             return self.character_set()
-        elif token.type == TokenType.EMPTY_STRING:
-            self.consume(TokenType.EMPTY_STRING)
-            return EmptyNode()
+        elif token.type == TokenType.ASSERTION:
+            # '^', '$', '\\A', '\\z', '\\b' or '\\B'; the kind is the last character
+            self.consume(TokenType.ASSERTION)
+            return AssertionNode(token.value[-1])
         elif token.type == TokenType.BACKREFERENCE:
             self.consume(TokenType.BACKREFERENCE)
             group_num = int(token.value)
             return BackreferenceNode(group_num=group_num)
         else:
-            raise SyntaxError(f"Unexpected token: {token.type}")
+            raise SyntaxError(f"Unexpected token: {token.type}{_at(token)}")
 
     def character_set(self) -> ASTTree:
         """
-        character_set := '[' '^'? range ']'
-        range := ... (to be implemented)
+        character_set := '[' '^'? (char | char '-' char)* ']'
         """
         self.consume(TokenType.RANGE_START)
         negated = False
-        if self.current_token.type == TokenType.ESCAPED_CHAR and self.current_token.value == '^':
+        if self.current_token.type == TokenType.ASSERTION and self.current_token.value == '^':
             negated = True
-            self.consume(TokenType.ESCAPED_CHAR)
-        ranges = []
+            self.consume(TokenType.ASSERTION)
+        # Inside a set every token is literal text; only an unescaped '-' builds a range
+        items = []  # (char, is_range_dash)
         while self.current_token.type != TokenType.RANGE_END:
-            if self.current_token.type == TokenType.LETTER or self.current_token.type == TokenType.ESCAPED_CHAR:
-                first_char = self.current_token.value
-                self.consume(self.current_token.type)
-                if self.current_token.type == TokenType.ESCAPED_CHAR and self.current_token.value == '-':
-                    self.consume(TokenType.ESCAPED_CHAR)
-                    if self.current_token.type in (TokenType.LETTER, TokenType.ESCAPED_CHAR):
-                        second_char = self.current_token.value
-                        self.consume(self.current_token.type)
-                        ranges.append((first_char, second_char))
-                    else:
-                        raise SyntaxError("Invalid range in character set")
-                else:
-                    ranges.append((first_char, first_char))
-            else:
-                raise SyntaxError("Invalid character in character set")
+            token = self.current_token
+            if token.type == TokenType.END:
+                raise SyntaxError(f"Unterminated character set{_at(token)}")
+            # Assertions are literal here: '\\b' is 'b', like any other escape
+            value = token.value[-1] if token.type == TokenType.ASSERTION else token.value
+            for ch in value:
+                items.append((ch, token.type == TokenType.LITERAL and ch == '-'))
+            self.consume(token.type)
         self.consume(TokenType.RANGE_END)
+
+        ranges = []
+        i = 0
+        while i < len(items):
+            first_char = items[i][0]
+            if i + 2 < len(items) and items[i + 1][1]:
+                second_char = items[i + 2][0]
+                if ord(second_char) < ord(first_char):
+                    raise SyntaxError(f"Invalid range {first_char}-{second_char} in character set")
+                ranges.append((first_char, second_char))
+                i += 3
+            else:
+                ranges.append((first_char, first_char))
+                i += 1
         return RangeNode(ranges=ranges, negated=negated)
 
     def repeat(self, node: ASTTree) -> ASTTree:
@@ -168,4 +212,4 @@ class Parser:
             self.consume(TokenType.DIGIT)
             return num
         else:
-            raise SyntaxError(f"Expected number, got {token.type}")
+            raise SyntaxError(f"Expected number, got {token.type}{_at(token)}")
@@ -0,0 +1,514 @@
+# lib/pattern.py
+
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice, repeat
+
+from lib.lexer import Lexer
+from lib.parser import Parser
+from lib.nfa_builder_visitor import NFABuilderVisitor
+from lib.nfa_to_dfa_converter import NFAtoDFAConverter
+from lib.nfa_optimizer import NFAOptimizer
+from lib.compile_stats import CompileStats
+from lib.compile_options import CompileOptions
+from lib.nfa_simulator import NFASimulator
+from lib.lazy_dfa import LazyDFA
+from lib.dfa_table import DFATable
+from lib.dfa_codegen import CompiledMatcher
+from lib.derivative_engine import DerivativeEngine
+from lib.glushkov import GlushkovAutomaton
+from lib.shift_and import ShiftAndMatcher
+from lib.aho_corasick import AhoCorasick, literal_alternatives
+from lib.complexity import ComplexityAnalyzer, Planner
+from lib import substitution
+from lib.incremental import IncrementalMatcher, DEFAULT_INTERVAL
+from lib.case_folding import fold_case
+from lib.errors import RegexError, BudgetExceededError
+from lib.assertions import has_assertions
+from lib.dfa import DFA
+from lib.nfa import NFA
+
+_worker_pattern = None  # Per-process Pattern when map_match runs in a process pool
+
+
+class Pattern:
+    """
+    Compiled pattern that is immutable after construction, as returned by compile
+    and held by RegexLib. It keeps the options, the engine that matches, its frozen
+    CompileStats and the AST. The DFA engines match on a DFATable, whose rows are
+    read-only, and the shift_and and aho_corasick engines on tables built once, all
+    keeping the matching state in local variables, so one Pattern can be shared by
+    any number of threads (including free-threaded builds). The lazy_dfa and
+    derivative engines add states to their caches while matching; concurrent
+    matches may build an entry twice, which costs time but gives the same results.
+
+    Patterns of the dfa, shift_and and aho_corasick engines are pickled with their
+    matcher, so processes need not recompile; the others are compiled again when
+    they are loaded.
+    """
+    __slots__ = ("pattern", "options", "engine", "matcher", "stats", "ast", "plan", "_table")
+
+    def __init__(self, pattern: str, options: CompileOptions, engine: str, matcher, stats: CompileStats,
+                 ast=None, plan=None, table: DFATable = None):
+        object.__setattr__(self, "pattern", pattern)
+        object.__setattr__(self, "options", options)
+        object.__setattr__(self, "engine", engine)
+        object.__setattr__(self, "matcher", matcher)  # Object used by match/findall/sub/split
+        object.__setattr__(self, "stats", stats)
+        object.__setattr__(self, "ast", ast)  # None after unpickling
+        object.__setattr__(self, "plan", plan)  # Only set when compiled with engine="auto"
+        object.__setattr__(self, "_table", table)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pattern objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Pattern objects are immutable")
+
+    def __reduce__(self):
+        if self.engine == "dfa_codegen":
+            # Generated functions do not pickle; they are generated again from the table
+            return _codegen_pattern, (self.pattern, self.options, self._table, self.stats, self.plan)
+        if self.engine in ("dfa", "shift_and", "aho_corasick"):
+            return Pattern, (self.pattern, self.options, self.engine, self.matcher, self.stats, None, self.plan,
+                             self._table)
+        return compile, (self.pattern, self.options)
+
+    @property
+    def byte_mode(self) -> bool:
+        return self.options.byte_mode
+
+    @property
+    def table(self) -> DFATable:
+        """
+        The minimized DFA as a DFATable. The shift_and and aho_corasick engines skip
+        the DFA at compile time, so it is built on first use (threads racing to build
+        it get equal tables); the simulations and the derivative engine have none.
+        """
+        if self._table is None:
+            if self.engine not in ("shift_and", "aho_corasick"):
+                raise RegexError(
+                    f"Operation needs a DFA, but the pattern was compiled with the '{self.engine}' engine.")
+            dfa = Compiler().build_dfa(self.pattern, self.options, self.ast)
+            object.__setattr__(self, "_table", DFATable.from_dfa(dfa))
+        return self._table
+
+    def _prepare_input(self, string):
+        # Byte mode accepts str (encoded here) or any bytes-like buffer such as mmap,
+        # viewed as a sequence of byte values without copying
+        if self.options.byte_mode:
+            if isinstance(string, str):
+                return string.encode("utf-8")
+            if not isinstance(string, bytes):
+                return memoryview(string).cast('B')
+        return string
+
+    def match(self, string) -> bool:
+        return self.matcher.match(self._prepare_input(string))
+
+    def findall(self, string) -> list:
+        matches = self.matcher.findall(self._prepare_input(string))
+        if self.options.byte_mode:
+            return [bytes(match) for match in matches]
+        return matches
+
+    def _prepare_repl(self, repl):
+        # In byte mode a str replacement is encoded like str input is
+        if self.options.byte_mode and isinstance(repl, str):
+            return repl.encode("utf-8")
+        return repl
+
+    def sub(self, repl, string, count: int = 0, writer=None):
+        """
+        Replaces the leftmost-longest non-overlapping matches with repl, a literal or
+        a callable given the matched text; see substitution.subn.
+        """
+        return self.subn(repl, string, count, writer)[0]
+
+    def subn(self, repl, string, count: int = 0, writer=None):
+        return substitution.subn(self.matcher, self._prepare_repl(repl), self._prepare_input(string), count, writer)
+
+    def split(self, string, maxsplit: int = 0) -> list:
+        return substitution.split(self.matcher, self._prepare_input(string), maxsplit)
+
+    def _stream_table(self):
+        table = self.table
+        if table.has_assertions:
+            raise RegexError("Streaming and incremental matching do not support patterns with assertions.")
+        return table
+
+    def sub_stream(self, repl, chunks, count: int = 0, max_held: int = None):
+        """
+        Yields the output of sub() over an iterable of chunks (str, or bytes in byte
+        mode) piece by piece, for inputs that do not fit in memory. max_held caps the
+        text a single match attempt may hold (see substitution.iter_segments).
+        """
+        return substitution.sub_stream(self._stream_table(), self._prepare_repl(repl), chunks, count, max_held)
+
+    def split_stream(self, chunks, maxsplit: int = 0, max_held: int = None):
+        return substitution.split_stream(self._stream_table(), chunks, maxsplit, max_held)
+
+    def incremental(self, text, interval: int = DEFAULT_INTERVAL) -> IncrementalMatcher:
+        """
+        Returns an IncrementalMatcher holding the matches in text, kept up to date
+        through its edit() as the text changes (in byte mode, text is bytes).
+        """
+        if self.options.byte_mode and isinstance(text, str):
+            text = text.encode("utf-8")
+        return IncrementalMatcher(self._stream_table(), text, interval)
+
+    def __repr__(self):
+        return f"Pattern({self.pattern!r}, engine={self.engine!r}, byte_mode={self.options.byte_mode})"
+
+
+def _codegen_pattern(pattern, options, table, stats, plan):
+    return Pattern(pattern, options, "dfa_codegen", CompiledMatcher(table, pattern), stats, plan=plan, table=table)
+
+
+class Compiler:
+    """
+    The compile pipeline behind compile() and RegexLib.compile: lexes and parses
+    the pattern and builds the engine the CompileOptions ask for, timing each phase
+    into the CompileStats and calling the hooks as hook(phase, seconds, stats) after
+    it. With a fragment_cache, NFA fragments of subtrees seen in earlier compiles are
+    reused, and an unchanged pattern skips straight to its cached minimized DFA.
+    """
+    # Engines that can stand in for the minimized DFA when a compile budget runs out
+    FALLBACK_ENGINES = {"lazy_dfa": LazyDFA, "nfa": NFASimulator}
+
+    def __init__(self, hooks=(), fragment_cache=None):
+        self.hooks = hooks
+        self.fragment_cache = fragment_cache
+
+    @contextmanager
+    def _phase(self, name: str, stats: CompileStats, notify: bool = True):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        stats.phase_times[name] = elapsed
+        for hook in self.hooks if notify else ():
+            hook(name, elapsed, stats)
+
+    def compile(self, pattern: str, options: CompileOptions) -> tuple:
+        """
+        Returns (Pattern, minimized DFA), the DFA being None for the engines that
+        skip it. RegexLib keeps the DFA for its DFA-only methods; the Pattern holds
+        it as a table.
+        """
+        budget = options.budget
+        byte_mode = options.byte_mode
+        engine = options.engine
+        shift_and, forced_shift_and = options.fast_paths(self.fragment_cache)
+        stats = CompileStats(pattern)
+        # Per-compile clock and state count, so a budget can be shared across compiles
+        context = budget.start() if budget else None
+
+        started_tracing = options.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif options.trace_memory:
+            tracemalloc.reset_peak()
+        try:
+            ast_tree = self._parse(pattern, options, stats)
+
+            compile_plan = None
+            if engine == "auto":
+                with self._phase("plan", stats):
+                    compile_plan = Planner(budget).plan(
+                        ComplexityAnalyzer().analyze(ast_tree), byte_mode, options.codegen)
+                stats.plan = compile_plan
+                if compile_plan.rejected:
+                    raise BudgetExceededError("max_nfa_states", budget.max_nfa_states,
+                                              compile_plan.estimate.nfa_states, "plan")
+                engine = compile_plan.engine
+
+            minimized_dfa = table = None
+            if options.derivatives:
+                with self._phase("derivatives", stats):
+                    matcher = DerivativeEngine(ast_tree)
+                engine = "derivative"
+            elif engine == "shift_and":
+                matcher = self._compile_shift_and(ast_tree, stats, True)
+            elif engine == "aho_corasick":
+                matcher = self._compile_literals(ast_tree, stats, True)
+            elif engine in self.FALLBACK_ENGINES:
+                matcher = self._compile_simulation(ast_tree, stats, context, byte_mode, options.optimize, engine)
+            else:
+                matcher = None
+                if shift_and and not forced_shift_and:
+                    matcher = self._compile_literals(ast_tree, stats, False)
+                    engine = "aho_corasick"
+                if matcher is None and shift_and:
+                    matcher = self._compile_shift_and(ast_tree, stats, forced_shift_and)
+                    engine = "shift_and"
+                if matcher is None:
+                    minimized_dfa, table, matcher, engine = self._compile_automaton(
+                        pattern, ast_tree, stats, context, options.fallback, byte_mode, options.codegen,
+                        options.optimize)
+            stats.engine = engine
+
+            if options.trace_memory:
+                stats.peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        compiled = Pattern(pattern, options, engine, matcher, stats.freeze(), ast_tree, compile_plan, table)
+        return compiled, minimized_dfa
+
+    def build_dfa(self, pattern: str, options: CompileOptions, ast_tree=None) -> DFA:
+        """
+        Builds the minimized DFA that the shift_and and aho_corasick engines skip,
+        into stats of its own without firing the hooks, so the stats of the compile
+        stay as reported. Without the AST, the pattern is parsed again.
+        """
+        stats = CompileStats(pattern)
+        if ast_tree is None:
+            ast_tree = self._parse(pattern, options, stats, notify=False)
+        return self._compile_automaton(pattern, ast_tree, stats, None, None, False, False, True, notify=False)[0]
+
+    def _parse(self, pattern, options, stats, notify=True):
+        with self._phase("lex", stats, notify):
+            tokens = Lexer(pattern, extended=options.derivatives).scan()
+        with self._phase("parse", stats, notify):
+            ast_tree = Parser(tokens).parse()
+            if options.ignorecase:
+                ast_tree = fold_case(ast_tree)
+            if self.fragment_cache is not None:
+                ast_tree = self.fragment_cache.intern(ast_tree)
+        return ast_tree
+
+    def _compile_literals(self, ast_tree, stats, forced):
+        # Returns an AhoCorasick, or None to go on with the other engines when not
+        # forced and the pattern is not an alternation of at least two literals
+        with self._phase("trie", stats):
+            words = literal_alternatives(ast_tree)
+            if words is None or (len(words) < 2 and not forced):
+                if forced:
+                    raise RegexError("The aho_corasick engine needs an alternation of literals.")
+                return None
+            matcher = AhoCorasick(words)
+        stats.trie_states = len(matcher)
+        return matcher
+
+    def _compile_shift_and(self, ast_tree, stats, forced):
+        # Returns a ShiftAndMatcher, or None to go on with the DFA when not forced and
+        # the pattern is too large or has constructs the position automaton lacks
+        with self._phase("positions", stats):
+            try:
+                automaton = GlushkovAutomaton.from_ast(ast_tree)
+            except RegexError:
+                if forced:
+                    raise
+                return None
+        stats.positions = len(automaton)
+        if not forced and not ShiftAndMatcher.suits(automaton):
+            return None
+        return ShiftAndMatcher(automaton)
+
+    def _compile_simulation(self, ast_tree, stats, context, byte_mode, optimize, engine):
+        # NFA and optimize phases only; the matcher simulates the NFA
+        with self._phase("nfa", stats):
+            nfa: NFA = NFABuilderVisitor(context, byte_mode).build(ast_tree)
+            if context:
+                context.check_nfa_states()
+        nfa_states = nfa.get_all_states()
+        stats.nfa_states = len(nfa_states)
+        stats.nfa_edges = sum(len(targets) for state in nfa_states for targets in state.get_transitions().values())
+        if has_assertions(nfa_states):
+            raise RegexError(f"Patterns with assertions cannot be matched by the {engine} engine.")
+        if optimize:
+            with self._phase("optimize", stats):
+                nfa = NFAOptimizer(context).optimize(nfa)
+            nfa_states = nfa.get_all_states()
+            stats.optimized_nfa_states = len(nfa_states)
+            stats.optimized_nfa_edges = sum(
+                len(targets) for state in nfa_states for targets in state.get_transitions().values())
+        return self.FALLBACK_ENGINES[engine](nfa)
+
+    def _compile_automaton(self, pattern, ast_tree, stats, context, fallback, byte_mode, codegen, optimize,
+                           notify=True):
+        # NFA, optimize, determinize and minimize phases; returns (minimized DFA, its
+        # table, matcher, engine), the DFA and table being None after a fallback
+        cache = self.fragment_cache
+        cached_table = cache.get_dfa(ast_tree, byte_mode) if cache is not None else None
+        if cached_table is None:
+            with self._phase("nfa", stats, notify):
+                nfa_builder = NFABuilderVisitor(context, byte_mode, cache)
+                nfa: NFA = nfa_builder.build(ast_tree)
+                if context:
+                    context.check_nfa_states()
+            nfa_states = nfa.get_all_states()
+            stats.nfa_states = len(nfa_states)
+            stats.nfa_edges = sum(len(targets) for state in nfa_states for targets in state.get_transitions().values())
+            reused = nfa_builder.reused.values()
+            anchored = has_assertions(nfa_states)
+        else:
+            reused = [ast_tree]
+            anchored = False  # Only DFAs without assertions are cached
+        if cache is not None:
+            stats.total_nodes = ast_tree.size
+            stats.reused_nodes = min(stats.total_nodes, sum(node.size for node in reused))
+
+        try:
+            if cached_table is None:
+                if optimize:
+                    with self._phase("optimize", stats, notify):
+                        nfa = NFAOptimizer(context).optimize(nfa)
+                    nfa_states = nfa.get_all_states()
+                    stats.optimized_nfa_states = len(nfa_states)
+                    stats.optimized_nfa_edges = sum(
+                        len(targets) for state in nfa_states for targets in state.get_transitions().values())
+
+                with self._phase("determinize", stats, notify):
+                    dfa: DFA = NFAtoDFAConverter(context).convert(nfa)
+                stats.dfa_states = len(dfa.states)
+                stats.alphabet_size = len(dfa.get_alphabet())
+
+                with self._phase("minimize", stats, notify):
+                    minimized_dfa = dfa.minimize(context)
+                table = DFATable.from_dfa(minimized_dfa)
+                if cache is not None and not anchored:
+                    cache.put_dfa(ast_tree, byte_mode, table)
+            else:
+                minimized_dfa = cached_table.to_dfa()
+                table = cached_table
+                stats.dfa_states = len(minimized_dfa.states)
+                stats.alphabet_size = len(cached_table.get_alphabet())
+            stats.min_dfa_states = len(minimized_dfa.states)
+            matcher = table
+            engine = "dfa"
+            if codegen:
+                with self._phase("codegen", stats, notify):
+                    matcher = CompiledMatcher(table, pattern)
+                engine = "dfa_codegen"
+        except BudgetExceededError as e:
+            # The fallback engines read assertion edges as symbols, so they cannot stand in
+            if fallback is None or anchored:
+                raise
+            minimized_dfa = table = None
+            matcher = self.FALLBACK_ENGINES[fallback](nfa)
+            engine = fallback
+            stats.fallback_reason = str(e)
+        return minimized_dfa, table, matcher, engine
+
+
+def compile(pattern: str, options: CompileOptions = None, hooks=(), fragment_cache=None, **keywords) -> Pattern:
+    """
+    Compiles the pattern as options say into an immutable Pattern. The options are a
+    CompileOptions, or its arguments given as keywords; see CompileOptions for the
+    engines and modes and which of them combine. Syntax errors and invalid
+    constructs are raised. hooks and fragment_cache are those of Compiler.
+    """
+    if options is None:
+        options = CompileOptions(**keywords)
+    elif keywords:
+        raise ValueError("Pass either a CompileOptions or its arguments as keywords, not both.")
+    return Compiler(hooks, fragment_cache).compile(pattern, options)[0]
+
+
+class CompileResult:
+    """
+    Outcome of compiling one pattern in compile_many: either a Pattern (with its
+    CompileStats) or the error message, plus the wall-clock compile time.
+    """
+    def __init__(self, pattern, compiled=None, error=None, seconds=0.0):
+        self.pattern = pattern
+        self.compiled = compiled  # Pattern, None if compiling failed
+        self.error = error  # "ExceptionType: message", None on success
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        outcome = repr(self.compiled) if self.ok else f"error={self.error!r}"
+        return f"CompileResult({self.pattern!r}, {outcome}, seconds={self.seconds:.6f})"
+
+
+def _compile_one(pattern, options):
+    start = time.perf_counter()
+    try:
+        compiled = compile(pattern, options)
+    except Exception as e:
+        return CompileResult(pattern, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - start)
+    return CompileResult(pattern, compiled, seconds=time.perf_counter() - start)
+
+
+def _compile_batch(args):
+    batch, options = args
+    return [_compile_one(pattern, options) for pattern in batch]
+
+
+def compile_many(patterns, workers: int = None, batch_size: int = None, options: CompileOptions = None,
+                 **keywords) -> list:
+    """
+    Compiles a catalog of patterns on a process pool and returns one CompileResult per
+    pattern, in input order. The options are given as for compile. A pattern that
+    fails to compile (syntax error, budget overrun, ...) is reported in its result
+    and does not stop the others. Compiled Patterns come back pickled with their
+    matchers (see Pattern); those of the simulations and the derivative engine are
+    compiled again on arrival. With workers=1 everything runs in this process.
+    """
+    if options is None:
+        options = CompileOptions(**keywords)
+    elif keywords:
+        raise ValueError("Pass either a CompileOptions or its arguments as keywords, not both.")
+    patterns = list(patterns)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return _compile_batch((patterns, options))
+    # Several batches per worker even out patterns of very different cost
+    batch_size = batch_size or max(1, len(patterns) // (workers * 8))
+    tasks = [(batch, options) for batch in _batches(patterns, batch_size)]
+    with ProcessPoolExecutor(workers) as executor:
+        return [result for batch in executor.map(_compile_batch, tasks) for result in batch]
+
+
+def _batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _run_batch(pattern, method, batch):
+    function = getattr(pattern, method)
+    return [function(item) for item in batch]
+
+
+def _init_worker(pattern):
+    global _worker_pattern
+    _worker_pattern = pattern
+
+
+def _run_in_worker(args):
+    method, batch = args
+    return _run_batch(_worker_pattern, method, batch)
+
+
+def map_match(pattern: Pattern, iterable, workers: int = None, batch_size: int = 256,
+              processes: bool = False, method: str = "match") -> list:
+    """
+    Applies pattern.match (or pattern.findall with method="findall") to every item
+    and returns the results in input order. Items are sent to a thread pool, or with
+    processes to a process pool that receives the pattern once per worker, in batches
+    of batch_size to keep the per-task overhead low.
+    """
+    if method not in ("match", "findall"):
+        raise ValueError(f"Unknown method: {method}")
+    batches = _batches(iterable, batch_size)
+    if processes:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pattern,))
+        results = executor.map(_run_in_worker, zip(repeat(method), batches))
+    else:
+        executor = ThreadPoolExecutor(workers)
+        results = executor.map(_run_batch, repeat(pattern), repeat(method), batches)
+    with executor:
+        return [result for batch in results for result in batch]
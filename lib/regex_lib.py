@@ -1,62 +1,206 @@
-from lib.lexer import Lexer
-from lib.parser import Parser
-from lib.nfa_builder_visitor import NFABuilderVisitor
-from lib.nfa_to_dfa_converter import NFAtoDFAConverter
 from lib.regex_recovery import RegexRecovery
+from lib.compile_stats import CompileStats
+from lib.compile_options import CompileOptions
+from lib.byte_matcher import ByteMatcher
+from lib.dfa_codegen import CompiledMatcher
+from lib.line_matcher import LineMatcher
+from lib.glushkov import GlushkovAutomaton
+from lib.fuzzy_matcher import FuzzyMatcher
+from lib.shift_and import ShiftAndMatcher
+from lib.complexity import CompilePlan
+from lib.pattern import Pattern, Compiler
+from lib.incremental import IncrementalMatcher, DEFAULT_INTERVAL
+from lib.errors import RegexError, NotCompiledError
 from lib.dfa import DFA
-from lib.nfa import NFA
 
 class RegexLib:
-    def __init__(self):
-        self.dfa_min: DFA = None
+    # Engines that can stand in for the minimized DFA when a compile budget runs out
+    FALLBACK_ENGINES = Compiler.FALLBACK_ENGINES
+    # Values of the engine option
+    ENGINES = CompileOptions.ENGINES
 
-    def compile(self, pattern: str):
+    def __init__(self, hooks=None, fragment_cache=None):
+        self.compiled: Pattern = None  # Pattern of the last compile
+        self._dfa_min: DFA = None
+        self.glushkov: GlushkovAutomaton = None  # Built on first fuzzy match
+        # Callables invoked as hook(phase, seconds, stats) after each compile phase
+        self.hooks = list(hooks) if hooks else []
+        # Optional FragmentCache, may be shared by several instances compiling related patterns
+        self.fragment_cache = fragment_cache
 
-        try:
-            lexer = Lexer(pattern)
-            parser = Parser(lexer)
-            ast_tree = parser.parse()
+    @property
+    def matcher(self):
+        # Object used by match/findall: the DFA's table or the engine the options chose
+        return self.compiled.matcher if self.compiled is not None else None
 
-            nfa_builder = NFABuilderVisitor()
-            ast_tree.accept(nfa_builder)
-            nfa: NFA = nfa_builder.get_nfa()
+    @property
+    def engine(self) -> str:
+        return self.compiled.engine if self.compiled is not None else None
 
-            converter = NFAtoDFAConverter()
-            dfa: DFA = converter.convert(nfa)
+    @property
+    def byte_mode(self) -> bool:
+        return self.compiled.byte_mode if self.compiled is not None else False
 
-            minimized_dfa = dfa.minimize()
-            self.dfa_min = minimized_dfa
+    @property
+    def compiled_matcher(self) -> CompiledMatcher:
+        return self.matcher if isinstance(self.matcher, CompiledMatcher) else None
 
-            print(f"Compilation successful. Minimized DFA has {len(self.dfa_min.states)} states.")
+    @property
+    def stats(self) -> CompileStats:
+        return self.compiled.stats if self.compiled is not None else None
 
-        except Exception as e:
-            print(f"Error during compilation: {e}")
-            self.dfa_min = None
+    @property
+    def ast(self):
+        # AST of the compiled pattern
+        return self.compiled.ast if self.compiled is not None else None
 
-    def match(self, string: str) -> bool:
+    @property
+    def plan(self) -> CompilePlan:
+        # Only set when compiling with engine="auto"
+        return self.compiled.plan if self.compiled is not None else None
+
+    @property
+    def dfa_min(self) -> DFA:
+        # The shift_and and aho_corasick engines skip the DFA at compile time; it is built on first use
+        if self._dfa_min is None and self.engine in ("shift_and", "aho_corasick"):
+            self._dfa_min = Compiler().build_dfa(self.compiled.pattern, self.compiled.options, self.ast)
+        return self._dfa_min
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def compile(self, pattern: str, options: CompileOptions = None, **keywords) -> CompileStats:
+        """
+        Compiles the pattern as options say, like pattern.compile, keeps the Pattern
+        as self.compiled and returns its CompileStats. The options are a
+        CompileOptions, or its arguments given as keywords; see CompileOptions for the
+        engines and modes and which of them combine. Syntax errors and invalid
+        constructs are raised, and leave the instance uncompiled.
+
+        With a fragment_cache, NFA fragments of subtrees seen in earlier compiles are
+        reused, and an unchanged pattern skips straight to its cached minimized DFA.
+        The share of AST nodes reused is reported as stats.reuse_ratio.
+        """
+        if options is None:
+            options = CompileOptions(**keywords)
+        elif keywords:
+            raise ValueError("Pass either a CompileOptions or its arguments as keywords, not both.")
+        self.compiled = None
+        self._dfa_min = None
+        self.glushkov = None
+        self.compiled, self._dfa_min = Compiler(self.hooks, self.fragment_cache).compile(pattern, options)
+        if isinstance(self.matcher, ShiftAndMatcher):
+            self.glushkov = self.matcher.automaton
+        return self.compiled.stats
+
+    def _require_compiled(self):
+        if self.compiled is None:
+            raise NotCompiledError("No compiled regex. Please compile a pattern first.")
+
+    def _require_dfa(self):
+        self._require_compiled()
         if not self.dfa_min:
-            print("Error: No compiled regex. Please compile a pattern first.")
-            return False
-        return self.dfa_min.match(string)
+            raise RegexError(f"Operation needs a DFA, but the pattern was compiled with the '{self.engine}' engine.")
+
+    def match(self, string: str) -> bool:
+        self._require_compiled()
+        return self.compiled.match(string)
 
     def findall(self, string: str) -> list:
-        if not self.dfa_min:
-            print("Error: No compiled regex. Please compile a pattern first.")
-            return []
-        return self.dfa_min.findall(string)
+        self._require_compiled()
+        return self.compiled.findall(string)
 
-    def complement(self) -> DFA:
+    def sub(self, repl, string, count: int = 0, writer=None):
+        """
+        Replaces the leftmost-longest non-overlapping matches with repl, a literal or
+        a callable given the matched text; see substitution.subn.
+        """
+        return self.subn(repl, string, count, writer)[0]
 
-        if not self.dfa_min:
-            print("Error: No compiled regex. Please compile a pattern first.")
-            return None
+    def subn(self, repl, string, count: int = 0, writer=None):
+        self._require_compiled()
+        return self.compiled.subn(repl, string, count, writer)
+
+    def split(self, string, maxsplit: int = 0) -> list:
+        self._require_compiled()
+        return self.compiled.split(string, maxsplit)
+
+    def sub_stream(self, repl, chunks, count: int = 0, max_held: int = None):
+        """
+        Yields the output of sub() over an iterable of chunks (str, or bytes in byte
+        mode) piece by piece, for inputs that do not fit in memory. max_held caps the
+        text a single match attempt may hold (see substitution.iter_segments).
+        """
+        self._require_compiled()
+        return self.compiled.sub_stream(repl, chunks, count, max_held)
+
+    def split_stream(self, chunks, maxsplit: int = 0, max_held: int = None):
+        self._require_compiled()
+        return self.compiled.split_stream(chunks, maxsplit, max_held)
+
+    def incremental(self, text, interval: int = DEFAULT_INTERVAL) -> IncrementalMatcher:
+        """
+        Returns an IncrementalMatcher holding the matches in text, kept up to date
+        through its edit() as the text changes (in byte mode, text is bytes).
+        """
+        self._require_compiled()
+        return self.compiled.incremental(text, interval)
+
+    def match_lines(self, buffer, full_line: bool = False):
+        """
+        Yields (line_number, start, end) for the lines of buffer (str, or bytes/mmap in
+        byte mode) that contain a match, or that match entirely with full_line.
+        """
+        self._require_dfa()
+        return LineMatcher(self.dfa_min, full_line).iter_lines(self._prepare_lines(buffer))
+
+    def _prepare_lines(self, buffer):
+        if self.byte_mode and isinstance(buffer, str):
+            return buffer.encode("utf-8")
+        return buffer
+
+    def finditer_bytes(self, buffer, char_offsets: bool = False):
+        """
+        Yields byte spans of matches in a bytes-like buffer (bytes, mmap, ...) for a
+        pattern compiled with byte_mode; see ByteMatcher.finditer.
+        """
+        self._require_dfa()
+        if not self.byte_mode:
+            raise RegexError("finditer_bytes needs a pattern compiled with byte_mode=True.")
+        return ByteMatcher(self.dfa_min).finditer(buffer, char_offsets)
+
+    def fuzzy_match(self, string: str, max_errors: int = 1):
+        """
+        Returns the least number of edits that make the whole string match, or None
+        when more than max_errors are needed; see FuzzyMatcher.
+        """
+        return self._fuzzy_matcher(max_errors).match(string)
+
+    def fuzzy_search(self, string: str, max_errors: int = 1) -> list:
+        """
+        Returns (end, cost) for every end offset of an approximate match with at most
+        max_errors edits; see FuzzyMatcher.search.
+        """
+        return self._fuzzy_matcher(max_errors).search(string)
+
+    def _fuzzy_matcher(self, max_errors):
+        self._require_compiled()
+        if self.byte_mode:
+            raise RegexError("Fuzzy matching is not supported for byte mode patterns.")
+        if self.glushkov is None:
+            self.glushkov = GlushkovAutomaton.from_ast(self.ast)
+        return FuzzyMatcher(self.glushkov, max_errors)
+
+    def complement(self) -> DFA:
+        self._require_dfa()
         return self.dfa_min.complement()
 
     def recover_regex(self) -> str:
-
-        if not self.dfa_min:
-            print("Error: No compiled DFA to recover regex from.")
-            return None
+        self._require_dfa()
+        if self.byte_mode:
+            raise RegexError("Regex recovery is not supported for byte mode DFAs.")
+        if self.dfa_min.has_assertions:
+            raise RegexError("Regex recovery is not supported for patterns with assertions.")
         recovery = RegexRecovery()
         regex = recovery.recover_regex(self.dfa_min)
         return regex
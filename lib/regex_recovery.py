@@ -1,102 +1,367 @@
+import heapq
+from collections import deque
+
 from lib.dfa import DFA
 from lib.dfa_state import DFAState
-from collections import deque
+
+# Rendering precedence of recovered expressions, lowest binds loosest
+UNION_PREC, CONCAT_PREC, POSTFIX_PREC, ATOM_PREC = 0, 1, 2, 3
+SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+CLASS_SPECIAL_CHARS = set("\\]-^[")
+
+
+class RegexExpr:
+    """
+    Node of a recovered expression. Nodes are immutable and compare structurally,
+    so the smart constructors below can recognise and merge equal subexpressions.
+    """
+    precedence = ATOM_PREC
+    size = 1  # Rough rendered length, used to weigh elimination choices
+
+    def key(self):
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.key()))
+
+
+class Epsilon(RegexExpr):
+    def key(self):
+        return ()
+
+    def render(self):
+        return "(?:)"
+
+
+EPSILON = Epsilon()
+
+
+class Symbol(RegexExpr):
+    def __init__(self, chars):
+        self.chars = frozenset(chars)
+
+    def key(self):
+        return self.chars
+
+    def render(self):
+        if len(self.chars) == 1:
+            return escape_symbol(next(iter(self.chars)))
+        # Collapse runs of consecutive code points into ranges
+        parts = []
+        codes = sorted(ord(ch) for ch in self.chars)
+        i = 0
+        while i < len(codes):
+            j = i
+            while j + 1 < len(codes) and codes[j + 1] == codes[j] + 1:
+                j += 1
+            first, last = escape_class_char(chr(codes[i])), escape_class_char(chr(codes[j]))
+            if j - i >= 2:
+                parts.append(f"{first}-{last}")
+            else:
+                parts.extend(escape_class_char(chr(c)) for c in codes[i:j + 1])
+            i = j + 1
+        return "[" + "".join(parts) + "]"
+
+
+class Union(RegexExpr):
+    def __init__(self, items):
+        self.items = frozenset(items)
+        self.size = sum(item.size for item in self.items) + len(self.items)
+
+    def key(self):
+        return self.items
+
+    @property
+    def precedence(self):
+        # 'x?' renders as a postfix operator rather than an alternation
+        return POSTFIX_PREC if EPSILON in self.items and len(self.items) == 2 else UNION_PREC
+
+    def render(self):
+        rest = self.items - {EPSILON}
+        if EPSILON in self.items:
+            if len(rest) == 1:
+                return wrap(next(iter(rest)), ATOM_PREC) + "?"
+            return "(?:" + "|".join(sorted(item.render() for item in rest)) + ")?"
+        return "|".join(sorted(item.render() for item in rest))
+
+
+class Concat(RegexExpr):
+    precedence = CONCAT_PREC
+
+    def __init__(self, items):
+        self.items = tuple(items)
+        self.size = sum(item.size for item in self.items)
+
+    def key(self):
+        return self.items
+
+    def render(self):
+        return "".join(wrap(item, CONCAT_PREC) for item in self.items)
+
+
+class Star(RegexExpr):
+    precedence = POSTFIX_PREC
+
+    def __init__(self, child):
+        self.child = child
+        self.size = child.size + 1
+
+    def key(self):
+        return self.child
+
+    def render(self):
+        return wrap(self.child, ATOM_PREC) + "*"
+
+
+class Plus(Star):
+    def render(self):
+        return wrap(self.child, ATOM_PREC) + "+"
+
+
+def wrap(expr, min_precedence):
+    rendered = expr.render()
+    if expr.precedence < min_precedence:
+        return f"(?:{rendered})"
+    return rendered
+
+
+def escape_symbol(symbol):
+    return f"\\{symbol}" if symbol in SPECIAL_CHARS else symbol
+
+
+def escape_class_char(symbol):
+    return f"\\{symbol}" if symbol in CLASS_SPECIAL_CHARS else symbol
+
+
+def make_union(left, right):
+    items = set()
+    for expr in (left, right):
+        items.update(expr.items if isinstance(expr, Union) else (expr,))
+    items = factor_alternatives(items, 0)
+    items = factor_alternatives(items, -1)
+    symbols = [item for item in items if isinstance(item, Symbol)]
+    if len(symbols) > 1:
+        # a|b|[cd] -> [a-d]
+        items.difference_update(symbols)
+        items.add(Symbol(frozenset().union(*(symbol.chars for symbol in symbols))))
+    if EPSILON in items:
+        for item in list(items):
+            if type(item) is Star:
+                items.discard(EPSILON)  # x*|ε -> x*
+                break
+            if type(item) is Plus:
+                items.discard(EPSILON)  # x+|ε -> x*
+                items.discard(item)
+                items.add(Star(item.child))
+                break
+    if len(items) == 1:
+        return next(iter(items))
+    return Union(items)
+
+
+def factor_alternatives(items, end):
+    """
+    Pulls a shared first (end=0) or last (end=-1) element out of alternatives:
+    ax|ay -> a(?:x|y) and xa|ya -> (?:x|y)a.
+    """
+    groups = {}
+    for item in items:
+        parts = item.items if isinstance(item, Concat) else (item,)
+        groups.setdefault(parts[end], []).append(parts)
+    if all(len(members) == 1 for members in groups.values()):
+        return items
+    factored = set()
+    for shared, members in groups.items():
+        if len(members) == 1:
+            parts = members[0]
+            factored.add(parts[0] if len(parts) == 1 else Concat(parts))
+            continue
+        rest = None
+        for parts in members:
+            remainder = parts[1:] if end == 0 else parts[:-1]
+            tail = EPSILON if not remainder else remainder[0] if len(remainder) == 1 else Concat(remainder)
+            rest = tail if rest is None else make_union(rest, tail)
+        factored.add(make_concat(shared, rest) if end == 0 else make_concat(rest, shared))
+    return factored
+
+
+def make_concat(left, right):
+    parts = []
+    for expr in (left, right):
+        for item in (expr.items if isinstance(expr, Concat) else (expr,)):
+            if item is EPSILON or item == EPSILON:
+                continue
+            append_concat_part(parts, item)
+    if not parts:
+        return EPSILON
+    if len(parts) == 1:
+        return parts[0]
+    return Concat(parts)
+
+
+def append_concat_part(parts, item):
+    if parts:
+        last = parts[-1]
+        if isinstance(last, Star) and isinstance(item, Star) and last.child == item.child \
+                and (type(last) is Star or type(item) is Star):
+            # x*x* -> x*, x+x* -> x+, x*x+ -> x+
+            if type(item) is Plus:
+                parts[-1] = item
+            return
+        if type(last) is Star and last.child == item:
+            parts[-1] = Plus(item)  # x*x -> x+
+            return
+        if type(item) is Star:
+            # x x* -> x+, also when x is a sequence already in parts: ab(ab)* -> (ab)+
+            body = item.child.items if isinstance(item.child, Concat) else (item.child,)
+            if len(parts) >= len(body) and tuple(parts[-len(body):]) == tuple(body):
+                del parts[-len(body):]
+                parts.append(Plus(item.child))
+                return
+    parts.append(item)
+
+
+def make_star(expr):
+    if expr == EPSILON:
+        return EPSILON
+    if isinstance(expr, Star):
+        return Star(expr.child)  # (x*)* and (x+)* -> x*
+    if isinstance(expr, Union) and EPSILON in expr.items:
+        rest = expr.items - {EPSILON}
+        inner = next(iter(rest)) if len(rest) == 1 else Union(rest)
+        return make_star(inner)  # (x?)* -> x*
+    return Star(expr)
+
 
 class RegexRecovery:
+    START = "start"
+    FINAL = "final"
+
     def recover_regex(self, dfa: DFA) -> str:
         """
-        Attempts to recover the regex pattern from the minimized DFA using state elimination.
+        Recovers a regex for the DFA's language by state elimination. Only states that
+        are reachable and can still reach a final state take part. The cheapest state
+        (fewest in x out edges) is eliminated first, and expressions are simplified as
+        they are combined. Returns "[]" for the empty language.
         """
-        # Create a mapping from state ID to state
-        state_map = {state.id: state for state in dfa.states}
-        final_states = {state.id for state in dfa.states if state.is_final}
-        start_state_id = dfa.start_state.id
-
-        # Remove unreachable states
-        reachable = self.get_reachable_states(dfa)
-        state_map = {sid: state_map[sid] for sid in reachable}
-
-        # Initialize regex expressions between states
-        regex_matrix = {}
-        for i in state_map:
-            regex_matrix[i] = {}
-            for j in state_map:
-                regex_matrix[i][j] = set()
-
-        # Populate initial transitions
-        for state in state_map.values():
-            for symbol, target in state.transitions.items():
-                regex_matrix[state.id][target.id].add(self.escape_regex(symbol))
-
-        # State elimination
-        states = set(state_map.keys())
-        states.remove(start_state_id)
-        states -= final_states
-
-        for elim_state in list(states):
-            for i in list(state_map.keys()):
-                for j in list(state_map.keys()):
-                    if regex_matrix[i][elim_state] and regex_matrix[elim_state][j]:
-                        part1 = regex_matrix[i][j]
-                        part2 = set()
-                        for r1 in regex_matrix[i][elim_state]:
-                            for r2 in regex_matrix[elim_state][elim_state]:
-                                part2.add(f"({r1})({self.union_regex(regex_matrix[elim_state][elim_state])})*")
-                            for r3 in regex_matrix[elim_state][j]:
-                                part2.add(f"({r1})({self.union_regex(regex_matrix[elim_state][elim_state])})*({r3})")
-                        regex_matrix[i][j].update(part2)
-            # Remove elim_state from the matrix
-            for i in regex_matrix:
-                if elim_state in regex_matrix[i]:
-                    del regex_matrix[i][elim_state]
-            for j in regex_matrix:
-                if elim_state in regex_matrix[j]:
-                    del regex_matrix[j][elim_state]
-            states.remove(elim_state)
-
-        # Combine regex from start state to all final states
-        recovered_regex = set()
-        for final_state in final_states:
-            if regex_matrix[start_state_id][final_state]:
-                recovered_regex.update(regex_matrix[start_state_id][final_state])
-
-        if not recovered_regex:
-            return ""
-        elif len(recovered_regex) == 1:
-            return next(iter(recovered_regex))
-        else:
-            return "(" + "|".join(recovered_regex) + ")"
+        expr = self.recover_expression(dfa)
+        if expr is None:
+            return "[]"
+        return expr.render()
+
+    def recover_expression(self, dfa: DFA):
+        states = self.get_live_states(dfa)
+        if dfa.start_state not in states:
+            return None
+
+        # Sparse adjacency, indexed in both directions: node -> neighbour -> expression
+        out_edges = {self.START: {}, self.FINAL: {}}
+        in_edges = {self.START: {}, self.FINAL: {}}
+        for state in states:
+            out_edges[state.id] = {}
+            in_edges[state.id] = {}
+
+        def add_edge(source, target, expr):
+            existing = out_edges[source].get(target)
+            if existing is not None:
+                expr = make_union(existing, expr)
+            out_edges[source][target] = expr
+            in_edges[target][source] = expr
+
+        add_edge(self.START, dfa.start_state.id, EPSILON)
+        for state in states:
+            for symbol, target in state.get_transitions().items():
+                if target in states:
+                    add_edge(state.id, target.id, Symbol(symbol))
+            if state.is_final:
+                add_edge(state.id, self.FINAL, EPSILON)
+
+        def cost(node):
+            # Size of the expressions created by eliminating node: every in x out pair
+            # gets a copy of its in-edge, loop and out-edge (Delgado & Morais weight)
+            loop = out_edges[node].get(node)
+            ins = [expr for source, expr in in_edges[node].items() if source != node]
+            outs = [expr for target, expr in out_edges[node].items() if target != node]
+            weight = sum(expr.size for expr in ins) * (len(outs) - 1) \
+                + sum(expr.size for expr in outs) * (len(ins) - 1)
+            if loop is not None:
+                weight += loop.size * (len(ins) * len(outs) - 1)
+            return weight
+
+        heap = [(cost(state.id), state.id) for state in states]
+        heapq.heapify(heap)
+        eliminated = set()
+
+        while heap:
+            node_cost, node = heapq.heappop(heap)
+            if node in eliminated:
+                continue
+            current_cost = cost(node)
+            if current_cost != node_cost:
+                heapq.heappush(heap, (current_cost, node))
+                continue
+            eliminated.add(node)
+
+            loop = out_edges[node].pop(node, None)
+            in_edges[node].pop(node, None)
+            loop_star = make_star(loop) if loop is not None else EPSILON
+
+            predecessors = in_edges.pop(node)
+            successors = out_edges.pop(node)
+            for source in predecessors:
+                del out_edges[source][node]
+            for target in successors:
+                del in_edges[target][node]
+            for source, into in predecessors.items():
+                prefix = make_concat(into, loop_star)
+                for target, out_of in successors.items():
+                    add_edge(source, target, make_concat(prefix, out_of))
+
+            for neighbour in set(predecessors) | set(successors):
+                if neighbour not in (self.START, self.FINAL):
+                    heapq.heappush(heap, (cost(neighbour), neighbour))
+
+        return out_edges[self.START].get(self.FINAL)
 
     def get_reachable_states(self, dfa: DFA) -> set:
         """
         Returns a set of reachable state IDs from the start state.
         """
-        reachable = set()
-        queue = deque()
-        queue.append(dfa.start_state.id)
-        reachable.add(dfa.start_state.id)
+        return {state.id for state in self._reachable_states(dfa)}
+
+    def get_live_states(self, dfa: DFA) -> set:
+        """
+        Returns the reachable states from which a final state can still be reached.
+        """
+        reachable = self._reachable_states(dfa)
+        predecessors = {state: [] for state in reachable}
+        for state in reachable:
+            for target in state.get_transitions().values():
+                predecessors[target].append(state)
 
+        live = {state for state in reachable if state.is_final}
+        queue = deque(live)
         while queue:
             current = queue.popleft()
-            state = next((s for s in dfa.states if s.id == current), None)
-            if state:
-                for target in state.transitions.values():
-                    if target.id not in reachable:
-                        reachable.add(target.id)
-                        queue.append(target.id)
+            for source in predecessors[current]:
+                if source not in live:
+                    live.add(source)
+                    queue.append(source)
+        return live
+
+    def _reachable_states(self, dfa: DFA) -> set:
+        reachable = {dfa.start_state}
+        queue = deque([dfa.start_state])
+        while queue:
+            state: DFAState = queue.popleft()
+            for target in state.get_transitions().values():
+                if target not in reachable:
+                    reachable.add(target)
+                    queue.append(target)
         return reachable
 
     def escape_regex(self, symbol: str) -> str:
-        special_chars = set(".^$*+?{}[]\\|()")
-        if symbol in special_chars:
-            return f"\\{symbol}"
-        else:
-            return symbol
-
-    def union_regex(self, regex_set: set) -> str:
-        if not regex_set:
-            return ""
-        elif len(regex_set) == 1:
-            return next(iter(regex_set))
-        else:
-            return "(" + "|".join(regex_set) + ")"
+        return escape_symbol(symbol)
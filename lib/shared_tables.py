@@ -0,0 +1,301 @@
+# lib/shared_tables.py
+
+import bisect
+import hashlib
+import secrets
+import struct
+from multiprocessing import shared_memory
+
+from lib.pattern import compile as compile_pattern
+from lib.dfa_table import DFATable
+from lib.assertions import CONTEXTS, EDGE, symbol_context
+
+# Block layout: header, the symbol classes as runs of consecutive code points (or
+# byte values) with the same class (three int32 arrays: first code, last code,
+# class), transitions (int32, n_states x n_classes, -1 for none), accepting flags
+# (one byte per state). Symbols are in the same class when every state sends them
+# to the same target, so a wide class such as [\u0000-\uffff] takes one run and one
+# column. Tables with assertions add the start state per context (int32, -1 for
+# none) and per state a byte whose bit c tells whether it accepts before context c.
+HEADER = struct.Struct("<4sIIIII")  # magic, n_states, n_classes, n_runs, start, flags
+MAGIC = b"RXT2"
+FLAG_BYTE_MODE = 1
+FLAG_ASSERTIONS = 2
+NO_TRANSITION = -1
+
+_attached = {}  # Per-process SharedTable views by block name, see attach()
+
+
+def pattern_key(pattern: str, byte_mode: bool = False) -> str:
+    return hashlib.sha256(f"{int(byte_mode)}:{pattern}".encode("utf-8")).hexdigest()
+
+
+def symbol_classes(table: DFATable, byte_mode: bool = False):
+    """
+    Returns (runs, columns): runs lists (first code, last code, class) for runs of
+    consecutive codes of the alphabet in the same class, and columns[c] maps each
+    state to its target on class c.
+    """
+    moves = {}  # Code -> (state, target) pairs, in state order
+    for state, row in enumerate(table.transitions):
+        for symbol, target in row.items():
+            moves.setdefault(symbol if byte_mode else ord(symbol), []).append((state, target))
+    classes = {}  # Moves -> class
+    columns = []
+    runs = []
+    for code in sorted(moves):
+        signature = tuple(moves[code])
+        cls = classes.get(signature)
+        if cls is None:
+            cls = classes[signature] = len(columns)
+            columns.append(dict(signature))
+        if runs and runs[-1][1] == code - 1 and runs[-1][2] == cls:
+            runs[-1][1] = code
+        else:
+            runs.append([code, code, cls])
+    return runs, columns
+
+
+def encode_table(table: DFATable, byte_mode: bool = False) -> bytes:
+    runs, columns = symbol_classes(table, byte_mode)
+    width = len(columns)
+    dense = [NO_TRANSITION] * (len(table) * width)
+    for cls, column in enumerate(columns):
+        for state, target in column.items():
+            dense[state * width + cls] = target
+    flags = FLAG_BYTE_MODE if byte_mode else 0
+    if table.has_assertions:
+        flags |= FLAG_ASSERTIONS
+    parts = [
+        HEADER.pack(MAGIC, len(table), width, len(runs), table.start, flags),
+        struct.pack(f"<{len(runs)}i", *(run[0] for run in runs)),
+        struct.pack(f"<{len(runs)}i", *(run[1] for run in runs)),
+        struct.pack(f"<{len(runs)}i", *(run[2] for run in runs)),
+        struct.pack(f"<{len(dense)}i", *dense),
+        bytes(table.accepting),
+    ]
+    if table.has_assertions:
+        starts = [NO_TRANSITION if state is None else state for state in table.start_states]
+        parts.append(struct.pack(f"<{len(CONTEXTS)}i", *starts))
+        parts.append(bytes(sum(1 << context for context in CONTEXTS if accepts[context]) for accepts in table.accepts))
+    return b"".join(parts)
+
+
+class SharedTable:
+    """
+    Read-only view of a DFA published by SharedTableRegistry. The transitions stay in
+    the shared memory block and are read through memoryviews; each process only
+    keeps a cache of the class of the symbols it has looked up. Matching follows
+    DFATable.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.shm = _open_block(name)
+        buffer = self.shm.buf
+        magic, self.n_states, self.n_classes, n_runs, self.start, flags = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise ValueError(f"Shared memory block {name} does not hold a transition table")
+        self.byte_mode = bool(flags & FLAG_BYTE_MODE)
+        offset = HEADER.size
+        runs = struct.unpack_from(f"<{3 * n_runs}i", buffer, offset)
+        self.run_firsts = runs[:n_runs]
+        self.run_lasts = runs[n_runs:2 * n_runs]
+        self.run_classes = runs[2 * n_runs:]
+        self.columns = {}  # Symbol -> class, -1 outside the alphabet; filled by _column
+        transitions_start = offset + 12 * n_runs
+        transitions_end = transitions_start + 4 * self.n_states * self.n_classes
+        self.transitions = buffer[transitions_start:transitions_end].toreadonly().cast('i')
+        accepting_end = transitions_end + self.n_states
+        self.accepting = buffer[transitions_end:accepting_end].toreadonly()
+        self.start_states = None  # Start state per context, only for tables with assertions
+        self.accept_masks = None  # Per state, bit c set when it accepts before context c
+        if flags & FLAG_ASSERTIONS:
+            starts_end = accepting_end + 4 * len(CONTEXTS)
+            starts = struct.unpack_from(f"<{len(CONTEXTS)}i", buffer, accepting_end)
+            self.start_states = tuple(None if state == NO_TRANSITION else state for state in starts)
+            self.accept_masks = buffer[starts_end:starts_end + self.n_states].toreadonly()
+
+    def _column(self, symbol) -> int:
+        # Looks the symbol's run up on first sight and caches its class
+        code = symbol if self.byte_mode else ord(symbol)
+        run = bisect.bisect_right(self.run_firsts, code) - 1
+        column = self.run_classes[run] if run >= 0 and code <= self.run_lasts[run] else -1
+        self.columns[symbol] = column
+        return column
+
+    def __len__(self):
+        return self.n_states
+
+    def _prepare_input(self, string):
+        if self.byte_mode:
+            if isinstance(string, str):
+                return string.encode("utf-8")
+            if not isinstance(string, bytes):
+                return memoryview(string).cast('B')
+        return string
+
+    def match(self, input_str) -> bool:
+        transitions = self.transitions
+        columns = self.columns
+        width = self.n_classes
+        state = self.start
+        for symbol in self._prepare_input(input_str):
+            column = columns.get(symbol)
+            if column is None:
+                column = self._column(symbol)
+            if column < 0:
+                return False
+            state = transitions[state * width + column]
+            if state < 0:
+                return False
+        return bool(self.accepting[state])
+
+    def findall(self, input_str) -> list:
+        text = self._prepare_input(input_str)
+        if self.start_states is not None:
+            return self._anchored_findall(text)
+        transitions = self.transitions
+        accepting = self.accepting
+        columns = self.columns
+        width = self.n_classes
+        matches = []
+        length = len(text)
+        for i in range(length):
+            state = self.start
+            for j in range(i, length):
+                column = columns.get(text[j])
+                if column is None:
+                    column = self._column(text[j])
+                if column < 0:
+                    break
+                state = transitions[state * width + column]
+                if state < 0:
+                    break
+                if accepting[state]:
+                    matches.append(bytes(text[i:j+1]) if self.byte_mode else text[i:j+1])
+        return matches
+
+    def _anchored_findall(self, text) -> list:
+        # As DFATable with assertions: start by the context before, accept by the one after
+        transitions = self.transitions
+        masks = self.accept_masks
+        columns = self.columns
+        width = self.n_classes
+        matches = []
+        length = len(text)
+        contexts = [symbol_context(symbol) for symbol in text]
+        contexts.append(EDGE)
+        for i in range(length):
+            state = self.start_states[contexts[i - 1] if i else EDGE]
+            if state is None:
+                continue
+            for j in range(i, length):
+                column = columns.get(text[j])
+                if column is None:
+                    column = self._column(text[j])
+                if column < 0:
+                    break
+                state = transitions[state * width + column]
+                if state < 0:
+                    break
+                if masks[state] >> contexts[j + 1] & 1:
+                    matches.append(bytes(text[i:j+1]) if self.byte_mode else text[i:j+1])
+        return matches
+
+    def close(self):
+        # Views must be released before the mapping can be closed
+        self.transitions.release()
+        self.accepting.release()
+        if self.accept_masks is not None:
+            self.accept_masks.release()
+        self.shm.close()
+
+    def __repr__(self):
+        return f"SharedTable({self.name!r}, states={self.n_states}, classes={self.n_classes})"
+
+
+def _open_block(name):
+    try:
+        # Python 3.13+: attaching must not register the block with this process's
+        # resource tracker, or it would be unlinked when an unrelated process exits
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def attach(name: str) -> SharedTable:
+    """
+    Returns this process's view of a published table, attaching on first use. Before
+    Python 3.13 attaching registers the block with the resource tracker, which is
+    harmless in pool workers started by the publishing process, as they share its
+    tracker.
+    """
+    table = _attached.get(name)
+    if table is None:
+        table = _attached[name] = SharedTable(name)
+    return table
+
+
+def detach(name: str):
+    table = _attached.pop(name, None)
+    if table is not None:
+        table.close()
+
+
+def detach_all():
+    for name in list(_attached):
+        detach(name)
+
+
+class SharedTableRegistry:
+    """
+    Publishes compiled transition tables into shared memory once, in the parent
+    process, keyed by a hash of the pattern and mode. Workers receive the block name
+    (a short string) and attach() to it instead of pickling or recompiling the DFA.
+    The registry owns the blocks: unpublish() or close() (also on leaving a with
+    block) unlinks them, after which workers can no longer attach.
+    """
+    def __init__(self):
+        self.blocks = {}  # pattern key -> SharedMemory
+        # Random per registry, so registries in this or other processes that publish
+        # the same pattern get distinct block names (kept short for macOS's limit)
+        self.token = secrets.token_hex(4)
+
+    def publish(self, pattern: str, byte_mode: bool = False, budget=None) -> str:
+        key = pattern_key(pattern, byte_mode)
+        block = self.blocks.get(key)
+        if block is None:
+            compiled = compile_pattern(pattern, budget=budget, byte_mode=byte_mode, shift_and=False)
+            data = encode_table(compiled.table, byte_mode)
+            block = shared_memory.SharedMemory(name=f"rxt_{self.token}_{key[:16]}", create=True, size=len(data))
+            block.buf[:len(data)] = data
+            self.blocks[key] = block
+        return block.name
+
+    def name_of(self, pattern: str, byte_mode: bool = False) -> str:
+        block = self.blocks.get(pattern_key(pattern, byte_mode))
+        return block.name if block is not None else None
+
+    def unpublish(self, pattern: str, byte_mode: bool = False):
+        block = self.blocks.pop(pattern_key(pattern, byte_mode), None)
+        if block is not None:
+            self._release(block)
+
+    def close(self):
+        while self.blocks:
+            self._release(self.blocks.popitem()[1])
+
+    def _release(self, block):
+        detach(block.name)  # The publishing process may have attached itself
+        block.close()
+        block.unlink()
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,149 @@
+# lib/shift_and.py
+
+from lib.glushkov import GlushkovAutomaton
+
+# Automata with at most this many states (positions + initial) get one follow table
+# indexed by the whole state vector, so a step is a single list lookup
+FULL_TABLE_BITS = 12
+# Largest linear automaton RegexLib picks this engine for, see bench_shift_and
+MAX_LINEAR_POSITIONS = 256
+
+
+class ShiftAndMatcher:
+    """
+    Matches with the position automaton of a pattern directly, instead of building
+    and minimizing a DFA. The set of active positions is an int; one step on c is
+
+        reach(states) & masks[c]
+
+    with masks[c] precomputed per character. When every position is only followed
+    by the next one (a sequence of classes such as 'ab[0-9]c') reach is a plain
+    shift, which is the classic Shift-And; small automata look the whole vector up
+    in one table, and larger ones go through GlushkovAutomaton.reach.
+    """
+    def __init__(self, automaton: GlushkovAutomaton):
+        self.automaton = automaton
+        self.masks = automaton.masks
+        self.final_mask = automaton.final_mask
+        self.linear = automaton.is_linear()
+        self.table = None
+        if not self.linear and len(automaton) + 1 <= FULL_TABLE_BITS:
+            self.table = automaton.follow_table(len(automaton) + 1)
+
+    @staticmethod
+    def suits(automaton: GlushkovAutomaton) -> bool:
+        # Whether matching keeps up with a minimized DFA: a shift or a single table
+        # lookup per step; beyond that the per-byte tables fall behind
+        if automaton.is_linear():
+            return len(automaton) <= MAX_LINEAR_POSITIONS
+        return len(automaton) + 1 <= FULL_TABLE_BITS
+
+    def __len__(self):
+        return len(self.automaton)
+
+    def _reach(self):
+        # Returns the cheapest reach(states) available; None for the linear case,
+        # where the callers shift instead
+        if self.linear:
+            return None
+        if self.table is not None:
+            return self.table.__getitem__
+        return self.automaton.reach
+
+    def match(self, input_str) -> bool:
+        masks = self.masks
+        reach = self._reach()
+        states = 1
+        for symbol in input_str:
+            states = (states << 1 if reach is None else reach(states)) & masks.get(symbol, 0)
+            if not states:
+                return False
+        return bool(states & self.final_mask)
+
+    def findall(self, input_str) -> list:
+        # Same order as DFA.findall: by start, then by end. The steps are written
+        # out per kind of reach, as this loop is where matching spends its time
+        masks_get = self.masks.get
+        final_mask = self.final_mask
+        first = self.automaton.follow[0]
+        matches = []
+        length = len(input_str)
+        table = self.table
+        reach = self.automaton.reach
+        for i in range(length):
+            states = masks_get(input_str[i], 0) & first
+            if not states:
+                continue
+            if states & final_mask:
+                matches.append(input_str[i])
+            j = i + 1
+            if self.linear:
+                while j < length:
+                    states = (states << 1) & masks_get(input_str[j], 0)
+                    if not states:
+                        break
+                    j += 1
+                    if states & final_mask:
+                        matches.append(input_str[i:j])
+            elif table is not None:
+                while j < length:
+                    states = table[states] & masks_get(input_str[j], 0)
+                    if not states:
+                        break
+                    j += 1
+                    if states & final_mask:
+                        matches.append(input_str[i:j])
+            else:
+                while j < length:
+                    states = reach(states) & masks_get(input_str[j], 0)
+                    if not states:
+                        break
+                    j += 1
+                    if states & final_mask:
+                        matches.append(input_str[i:j])
+        return matches
+
+    def longest_match(self, input_str, start=0):
+        # Called once per candidate start by sub/split, so symbols that cannot start
+        # a match are rejected before any setup
+        masks_get = self.masks.get
+        length = len(input_str)
+        if start >= length:
+            return None
+        states = masks_get(input_str[start], 0) & self.automaton.follow[0]
+        if not states:
+            return None
+        final_mask = self.final_mask
+        end = start + 1 if states & final_mask else None
+        if self.linear:
+            for j in range(start + 1, length):
+                states = (states << 1) & masks_get(input_str[j], 0)
+                if not states:
+                    break
+                if states & final_mask:
+                    end = j + 1
+            return end
+        reach = self._reach()
+        for j in range(start + 1, length):
+            states = reach(states) & masks_get(input_str[j], 0)
+            if not states:
+                break
+            if states & final_mask:
+                end = j + 1
+        return end
+
+    def search(self, input_str) -> bool:
+        # All attempts run in one vector: the initial state is added before each step
+        masks = self.masks
+        reach = self._reach()
+        final_mask = self.final_mask & ~1
+        states = 0
+        for symbol in input_str:
+            states |= 1
+            states = (states << 1 if reach is None else reach(states)) & masks.get(symbol, 0)
+            if states & final_mask:
+                return True
+        return False
+
+    def __repr__(self):
+        return f"ShiftAndMatcher(positions={len(self)}, linear={self.linear})"
@@ -0,0 +1,63 @@
+# lib/stream_scanner.py
+
+from lib.dfa import DFA
+from lib.errors import RegexError
+
+class StreamScanner:
+    """
+    Runs a DFA incrementally over consecutive chunks of one input. feed() returns the
+    matches completed inside the chunk as (start, end, text) with absolute offsets,
+    ordered by end offset. Together they are the same matches DFA.findall reports for
+    the concatenated input. Only the text from the oldest still-running match attempt
+    is buffered, so memory does not grow with the length of the stream.
+    """
+    def __init__(self, dfa: DFA):
+        if dfa.has_assertions:
+            raise RegexError("StreamScanner does not support patterns with assertions.")
+        self.dfa = dfa
+        self.offset = 0  # Absolute offset of the next symbol
+        self.runs = {}  # DFAState -> start offsets of the attempts currently in it
+        self.buffer = None  # Input retained from buffer_start onwards
+        self.buffer_start = 0
+
+    def feed(self, chunk) -> list:
+        if self.buffer is None:
+            self.buffer = chunk[:0]
+        start_state = self.dfa.start_state
+        matches = []
+        self.buffer += chunk
+        runs = self.runs
+        offset = self.offset
+        for symbol in chunk:
+            # A new attempt starts at every position
+            if start_state in runs:
+                runs[start_state].append(offset)
+            else:
+                runs[start_state] = [offset]
+            stepped = {}
+            for state, starts in runs.items():
+                target = state.get_transition(symbol)
+                if target is None:
+                    continue
+                if target in stepped:
+                    stepped[target].extend(starts)
+                else:
+                    stepped[target] = starts
+            offset += 1
+            for state, starts in stepped.items():
+                if state.is_final:
+                    for start in starts:
+                        matches.append((start, offset))
+            runs = stepped
+        self.runs = runs
+        self.offset = offset
+
+        buffer = self.buffer
+        result = [(start, end, buffer[start - self.buffer_start:end - self.buffer_start]) for start, end in
+                  sorted(matches, key=lambda span: (span[1], span[0]))]
+        # Drop input no running attempt can still include
+        oldest = min((min(starts) for starts in runs.values()), default=offset)
+        if oldest > self.buffer_start:
+            self.buffer = buffer[oldest - self.buffer_start:]
+            self.buffer_start = oldest
+        return result
@@ -0,0 +1,223 @@
+# lib/substitution.py
+"""
+sub/subn/split on top of match spans. Spans are leftmost-longest and do not
+overlap: the longest match at the first offset where one starts, then the search
+goes on from its end. Empty matches are never reported, as in findall.
+
+Results are assembled from slices of the input, written to a list that is joined
+once at the end, or to a writer (anything with write(), such as io.StringIO,
+io.BytesIO or a file), so no string is ever concatenated piece by piece.
+
+matcher is any engine with longest_match(text, start) (DFA, DFATable, ShiftAndMatcher,
+...). The streaming variants work on a DFATable over an iterable of chunks.
+"""
+from lib.errors import RegexError
+
+
+def iter_spans(matcher, text, count: int = 0):
+    # (start, end) of the non-overlapping matches, at most count of them unless 0
+    longest_match = matcher.longest_match
+    length = len(text)
+    start = 0
+    found = 0
+    while start < length and (not count or found < count):
+        end = longest_match(text, start)
+        if end is None:
+            start += 1
+        else:
+            yield start, end
+            found += 1
+            start = end
+
+
+def _replacement(repl, matched):
+    if callable(repl):
+        # Slices of memoryviews (byte mode buffers) are handed out as bytes
+        return repl(matched if isinstance(matched, (str, bytes)) else bytes(matched))
+    return repl
+
+
+def _joiner(text):
+    return "" if isinstance(text, str) else b""
+
+
+def subn(matcher, repl, text, count: int = 0, writer=None):
+    """
+    Returns (result, number of replacements), result being text with its matches
+    replaced by repl: a literal str/bytes, or a callable given the matched text and
+    returning its replacement. With a writer, the pieces are written to it instead
+    and it is returned in place of the result.
+    """
+    pieces = []
+    write = pieces.append if writer is None else writer.write
+    last = 0
+    replaced = 0
+    for start, end in iter_spans(matcher, text, count):
+        if last < start:
+            write(text[last:start])
+        write(_replacement(repl, text[start:end]))
+        last = end
+        replaced += 1
+    if last < len(text):
+        write(text[last:])
+    if writer is not None:
+        return writer, replaced
+    return _joiner(text).join(pieces), replaced
+
+
+def sub(matcher, repl, text, count: int = 0, writer=None):
+    return subn(matcher, repl, text, count, writer)[0]
+
+
+def split(matcher, text, maxsplit: int = 0) -> list:
+    """
+    Returns the pieces of text between matches (at most maxsplit splits unless 0);
+    like str.split, a match at either end gives an empty first or last piece.
+    """
+    pieces = []
+    last = 0
+    for start, end in iter_spans(matcher, text, maxsplit):
+        pieces.append(text[last:start])
+        last = end
+    pieces.append(text[last:])
+    if not isinstance(text, (str, bytes)):
+        return [bytes(piece) for piece in pieces]
+    return pieces
+
+
+def iter_segments(table, chunks, max_held: int = None):
+    """
+    Yields (is_match, text) segments that together spell out the concatenated
+    chunks, splitting off the same matches as iter_spans would on the whole input.
+    The running match attempt (its DFA state, the text it has read and its longest
+    match so far) is carried from one chunk to the next, as in StreamScanner, so the
+    text held before a chunk is not scanned again when it arrives. The rest is
+    yielded as soon as the chunk has been scanned.
+
+    Time and memory still depend on the attempts. An attempt is held in full until
+    it ends, as a list of pieces, and one that ends without a match is scanned again
+    from its second symbol, as in iter_spans: long failing attempts cost time
+    quadratic in their length, and an attempt that never ends (a.*b over a stream
+    without b) holds everything after its start. With max_held, a RegexError is
+    raised once an attempt holds more than that many symbols after a chunk.
+    """
+    if table.has_assertions:
+        raise RegexError("Streaming does not support patterns with assertions.")
+    transitions = table.transitions
+    steps = table.steps
+    accepting = table.accepting
+    start_state = table.start
+    state = start_state
+    held = []  # Pieces of the text read by the running attempt
+    read = 0  # Length of that text
+    end = None  # Length of the longest match of the attempt so far
+    skipped = []  # Pieces no match can include, not yet yielded
+
+    def feed(text, final):
+        nonlocal state, held, read, end
+        empty = text[:0]
+        todo = [(text, 0)]
+        while todo:
+            text, i = todo.pop()
+            length = len(text)
+            # The attempt has read held + text[mark:i]; text[free:mark] is skipped
+            free = mark = i
+            while True:
+                if i < length:
+                    target = steps[state](text[i])
+                    if target is None:
+                        if not read:
+                            i += 1
+                            mark = i
+                            continue
+                    else:
+                        state = target
+                        i += 1
+                        read += 1
+                        if accepting[target]:
+                            end = read
+                        if transitions[target]:
+                            continue
+                elif not (final and read):
+                    if free < mark:
+                        skipped.append(text[free:mark])
+                    if mark < length:
+                        held.append(text[mark:])
+                    if max_held is not None and read > max_held:
+                        raise RegexError(f"A match attempt holds {read} symbols of the stream, "
+                                         f"more than max_held={max_held}.")
+                    break
+                # The attempt is over: split off its match, or its first symbol when it
+                # has none, and scan the rest of what it read again. That rest is the
+                # unread part of text, scanned in place, or a new piece cut from held
+                # and scanned before text
+                if end is None and not held:
+                    i = mark = mark + 1
+                    state, read = start_state, 0
+                    continue
+                if free < mark:
+                    skipped.append(text[free:mark])
+                head = empty.join(held)
+                advance = 1 if end is None else end
+                if advance >= len(head):
+                    piece = head + text[mark:mark + advance - len(head)]
+                    i = free = mark = mark + advance - len(head)
+                    rest = None
+                else:
+                    piece, rest = head[:advance], head[advance:]
+                if end is None:
+                    skipped.append(piece)
+                else:
+                    if skipped:
+                        yield False, empty.join(skipped)
+                        skipped.clear()
+                    yield True, piece
+                state, held, read, end = start_state, [], 0, None
+                if rest is not None:
+                    todo.append((text, mark))
+                    todo.append((rest, 0))
+                    break
+        if skipped:
+            yield False, empty.join(skipped)
+            skipped.clear()
+
+    last = None
+    for chunk in chunks:
+        last = chunk
+        yield from feed(chunk, False)
+    if last is not None:
+        yield from feed(last[:0], True)
+
+
+def sub_stream(table, repl, chunks, count: int = 0, max_held: int = None):
+    """
+    Generator form of sub() for inputs read in chunks: yields the output in pieces,
+    which can be written out as they come (see iter_segments for what is buffered).
+    """
+    replaced = 0
+    for is_match, text in iter_segments(table, chunks, max_held):
+        if is_match and (not count or replaced < count):
+            replaced += 1
+            yield _replacement(repl, text)
+        else:
+            yield text
+
+
+def split_stream(table, chunks, maxsplit: int = 0, max_held: int = None):
+    """
+    Generator form of split() for inputs read in chunks. Each piece is held until
+    the match that ends it, so memory is bounded by the longest piece.
+    """
+    parts = []
+    splits = 0
+    empty = None
+    for is_match, text in iter_segments(table, chunks, max_held):
+        if empty is None:
+            empty = _joiner(text)
+        if is_match and (not maxsplit or splits < maxsplit):
+            splits += 1
+            yield empty.join(parts)
+            parts = []
+        else:
+            parts.append(text)
+    yield (empty if empty is not None else "").join(parts)
@@ -16,16 +16,21 @@ class TokenType(Enum):
     REPEAT_START = auto()
     REPEAT_END = auto()
     BACKREFERENCE = auto()
-    EMPTY_STRING = auto()
+    ASSERTION = auto()
     ANY_CHAR = auto()
     COMMA = auto()
     DIGIT = auto()
+    AND = auto()
+    COMPLEMENT = auto()
     END = auto()
 
 class Token:
-    def __init__(self, token_type: TokenType, value: str):
+    __slots__ = ("type", "value", "position")
+
+    def __init__(self, token_type: TokenType, value: str, position: int = None):
         self.type = token_type
-        self.value = value     
+        self.value = value
+        self.position = position  # Offset in the pattern, when known
 
     def __repr__(self):
         return f"Token({self.type}, '{self.value}')"
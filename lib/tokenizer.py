@@ -0,0 +1,154 @@
+# lib/tokenizer.py
+
+from lib.lexer import Lexer
+from lib.parser import Parser
+from lib.nfa import NFA, NFAState
+from lib.nfa_builder_visitor import NFABuilderVisitor
+from lib.nfa_to_dfa_converter import NFAtoDFAConverter
+from lib.dfa_table import DFATable
+from lib.assertions import EDGE, symbol_context
+from lib.errors import TokenizeError
+
+class Tokenizer:
+    """
+    Maximal-munch tokenizer over an ordered list of (name, pattern) rules. All rules
+    are compiled into one minimized DFA whose final states are tagged with the index
+    of the rule they accept; when several rules match the same longest token the
+    earliest rule wins. Tokens are (name, value, position) tuples, and rules named
+    in skip (e.g. whitespace) are matched but not returned.
+
+    Scanning takes linear time: a (state, position) pair from which no token could
+    be accepted is remembered, and later runs stop as soon as they reach it
+    (Reps, "Maximal-munch tokenization in linear time").
+
+    Rules may use assertions such as '\\b' or '^'. A token then starts from the
+    start state for the context of the character before it, and the rule it
+    accepts depends on the context of the character after it.
+    """
+    def __init__(self, rules, skip=()):
+        self.names = tuple(name for name, _ in rules)
+        self.skip = frozenset(skip)
+        start = NFAState(False)
+        for tag, (name, pattern) in enumerate(rules):
+            nfa = NFABuilderVisitor().build(Parser(Lexer(pattern)).parse())
+            for state in nfa.get_final_states():
+                state.tag = tag
+            start.add_epsilon_transition(nfa.get_start_state())
+        dfa = NFAtoDFAConverter().convert(NFA(start, set())).minimize()
+        for state in dfa.start_states if dfa.has_assertions else (dfa.start_state,):
+            tags = [tag for tag in (state.accept_tags or (state.tag,)) if tag is not None] if state else []
+            if tags:
+                raise ValueError(f"Rule '{self.names[min(tags)]}' matches the empty string")
+        self.table = DFATable.from_dfa(dfa)
+
+    def tokenize(self, text: str) -> list:
+        return list(self.iter_tokens((text,)))
+
+    def iter_tokens(self, chunks):
+        """
+        Tokenizes text arriving in chunks. The running token attempt (its DFA state,
+        the text it has read and the longest token it has accepted) is carried from
+        one chunk to the next, as in StreamScanner, so a token spanning chunk
+        boundaries is not scanned again from its start. Positions are offsets into
+        the whole stream.
+        """
+        table = self.table
+        transitions = table.transitions
+        steps = table.steps
+        anchored = table.has_assertions
+        context_tags = table.context_tags
+        start_states = table.start_states
+        tags = table.tags or (None,) * len(table)
+        names = self.names
+        skip = self.skip
+        states = len(table)
+        failed = set()  # position * states + state, for runs known not to accept again
+        visited = []
+        prune_at = 1024
+        # The running attempt: its stream offset, the context of the character before
+        # it, its state, the text it has read (held, read symbols long) and the rule
+        # and length of the longest token it has accepted
+        start = 0
+        before = EDGE
+        state = start_states[before] if anchored else table.start
+        held = []
+        read = 0
+        last_tag = None
+        last_end = 0
+
+        def feed(text, final):
+            nonlocal start, before, state, held, read, last_tag, last_end, failed, prune_at
+            todo = [(text, 0)]
+            while todo:
+                text, i = todo.pop()
+                length = len(text)
+                mark = i  # The attempt has read held + text[mark:i]
+                while True:
+                    if i == length and not read:
+                        break
+                    if state is not None:
+                        # Under assertions the rule accepted depends on the next character
+                        if not anchored:
+                            tag = tags[state]
+                        elif i < length:
+                            tag = context_tags[state][symbol_context(text[i])]
+                        elif final:
+                            tag = context_tags[state][EDGE]
+                        else:
+                            held.append(text[mark:])
+                            break
+                        if tag is not None:
+                            last_tag = tag
+                            last_end = read
+                            visited.clear()
+                        if i < length:
+                            target = steps[state](text[i])
+                            if target is not None:
+                                state = target
+                                i += 1
+                                read += 1
+                                key = (start + read) * states + target
+                                if key not in failed:
+                                    visited.append(key)
+                                    continue
+                        elif not final and transitions[state]:
+                            held.append(text[mark:])
+                            break
+                    # The attempt is over: yield its token and go on from its end. The
+                    # token ends in text, whose unread part is scanned again in place, or in
+                    # held, whose unread part becomes a new piece to scan before text
+                    failed.update(visited)
+                    visited.clear()
+                    head = "".join(held)
+                    if last_tag is None:
+                        following = [text[mark:i + 20]] + [piece[j:j + 20] for piece, j in reversed(todo)]
+                        raise TokenizeError(start, (head + "".join(following))[:20])
+                    if last_end >= len(head):
+                        token = head + text[mark:mark + last_end - len(head)]
+                        rest = None
+                        i = mark = mark + last_end - len(head)
+                    else:
+                        token = head[:last_end]
+                        rest = head[last_end:]
+                    name = names[last_tag]
+                    if name not in skip:
+                        yield name, token, start
+                    if anchored:
+                        before = symbol_context(token[-1])
+                        state = start_states[before]
+                    else:
+                        state = table.start
+                    start += last_end
+                    held, read, last_tag, last_end = [], 0, None, 0
+                    if rest is not None:
+                        todo.append((text, mark))
+                        todo.append((rest, 0))
+                        break
+            if len(failed) > prune_at:
+                # Runs only go forward from the running attempt
+                failed = {key for key in failed if key > start * states}
+                prune_at = max(1024, 2 * len(failed))
+
+        for chunk in chunks:
+            yield from feed(chunk, False)
+        yield from feed("", True)
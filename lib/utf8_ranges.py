@@ -0,0 +1,81 @@
+# lib/utf8_ranges.py
+
+MAX_CODE_POINT = 0x10FFFF
+SURROGATES = (0xD800, 0xDFFF)
+# Largest code point encoded with 1, 2 and 3 bytes
+ENCODING_LIMITS = (0x7F, 0x7FF, 0xFFFF)
+
+
+def merge_ranges(ranges):
+    """
+    Sorts (start, end) code point ranges and merges overlapping or adjacent ones.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def complement_ranges(ranges):
+    """
+    Returns the code point ranges (surrogates excluded) not covered by ranges.
+    """
+    result = []
+    next_start = 0
+    for start, end in merge_ranges(list(ranges) + [SURROGATES]):
+        if start > next_start:
+            result.append((next_start, start - 1))
+        next_start = max(next_start, end + 1)
+    if next_start <= MAX_CODE_POINT:
+        result.append((next_start, MAX_CODE_POINT))
+    return result
+
+
+def utf8_sequences(start, end):
+    """
+    Splits the code point range [start, end] into sequences of byte ranges such that
+    the UTF-8 encodings of the range are exactly the byte strings matched by one of
+    the sequences. Each sequence is a tuple of (low, high) byte ranges.
+    Surrogates have no UTF-8 encoding and are skipped.
+    """
+    sequences = []
+    stack = [(start, end)]
+    while stack:
+        start, end = stack.pop()
+        if start > end:
+            continue
+        if start <= SURROGATES[1] and end >= SURROGATES[0]:
+            # Ranges are pushed high part first so they come off the stack in order
+            stack.append((SURROGATES[1] + 1, end))
+            stack.append((start, SURROGATES[0] - 1))
+            continue
+        split = _split_range(start, end)
+        if split:
+            stack.append(split[1])
+            stack.append(split[0])
+            continue
+        first, last = chr(start).encode("utf-8"), chr(end).encode("utf-8")
+        sequences.append(tuple(zip(first, last)))
+    return sequences
+
+
+def _split_range(start, end):
+    # Both ends must use the same encoding length...
+    for limit in ENCODING_LIMITS:
+        if start <= limit < end:
+            return (start, limit), (limit + 1, end)
+    if end <= 0x7F:
+        return None
+    # ...and differ only in bytes that span their full continuation range
+    for i in range(1, 4):
+        mask = (1 << (6 * i)) - 1
+        if start & ~mask != end & ~mask:
+            if start & mask:
+                return (start, start | mask), ((start | mask) + 1, end)
+            if end & mask != mask:
+                return (start, (end & ~mask) - 1), (end & ~mask, end)
+    return None
@@ -4,7 +4,15 @@ def main():
     regex = RegexLib()
     pattern = r"(a|b)*c{2,3}"
     print(f"Compiling pattern: {pattern}")
-    regex.compile(pattern)
+    stats = regex.compile(pattern)
+    if stats.positions is not None:
+        size = f"{stats.positions} positions"
+    elif stats.trie_states is not None:
+        size = f"{stats.trie_states} trie states"
+    else:
+        size = f"{stats.min_dfa_states} minimized DFA states"
+    print(f"Compilation successful. Engine {stats.engine} with {size}.")
+    print(stats)
 
     test_strings = ["aaabcc", "ababc", "c", "abcc", "abccc", "abcccc"]
     for s in test_strings:
@@ -0,0 +1,52 @@
+# tests/test_compile.py
+"""
+Compile options, hooks and stats: what the caller asked for is what was compiled
+and reported.
+"""
+import pytest
+
+from lib.regex_lib import RegexLib
+from lib.compile_options import CompileOptions
+from lib.errors import NotCompiledError
+
+
+def test_hooks_see_every_phase_in_order():
+    calls = []
+    regex = RegexLib(hooks=[lambda phase, seconds, stats: calls.append((phase, stats.pattern))])
+    stats = regex.compile("(a|b)*c", shift_and=False, codegen=True)
+    assert [phase for phase, _ in calls] == ["lex", "parse", "nfa", "optimize", "determinize", "minimize", "codegen"]
+    assert all(pattern == "(a|b)*c" for _, pattern in calls)
+    assert set(stats.phase_times) == {phase for phase, _ in calls}
+    assert stats.min_dfa_states <= stats.dfa_states and stats.engine == "dfa_codegen"
+    assert set(stats.as_dict()) >= {"phase_times", "total_time", "engine"}
+
+
+@pytest.mark.parametrize("keywords", [{"derivatives": True, "codegen": True}, {"shift_and": True, "byte_mode": True},
+                                      {"engine": "nfa", "codegen": True}, {"engine": "regex"},
+                                      {"fallback": "dfa"}, {"engine": "aho_corasick", "byte_mode": True}])
+def test_conflicting_options_are_rejected_up_front(keywords):
+    with pytest.raises(ValueError):
+        CompileOptions(**keywords)
+
+
+def test_options_object_and_keywords_give_the_same_compile():
+    options = CompileOptions(shift_and=False, ignorecase=True)
+    by_object, by_keywords = RegexLib(), RegexLib()
+    by_object.compile("Ab+", options)
+    by_keywords.compile("Ab+", shift_and=False, ignorecase=True)
+    assert by_object.engine == by_keywords.engine == "dfa"
+    assert by_object.findall("aBB ab") == by_keywords.findall("aBB ab") == ["aB", "aBB", "ab"]
+    with pytest.raises(ValueError):
+        RegexLib().compile("a", options, codegen=True)
+    with pytest.raises(AttributeError):
+        options.codegen = True
+
+
+def test_failed_compile_leaves_the_instance_uncompiled():
+    regex = RegexLib()
+    regex.compile("ab")
+    with pytest.raises(SyntaxError):
+        regex.compile("(ab")
+    assert regex.stats is None and regex.engine is None
+    with pytest.raises(NotCompiledError):
+        regex.match("ab")
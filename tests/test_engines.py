@@ -0,0 +1,267 @@
+# tests/test_engines.py
+"""
+Every engine must report the matches of the minimized DFA. The DFA is checked
+against Python's re on every substring of the texts, then each engine is compiled
+for the same patterns and compared with it through match, findall, sub and split.
+"""
+import random
+import re
+
+import pytest
+
+from lib.regex_lib import RegexLib
+from lib.compile_budget import CompileBudget
+from lib.fragment_cache import FragmentCache
+from lib.shared_tables import SharedTableRegistry, attach, detach
+
+PATTERNS = ["a", "abc", "a|b", "ab|ba", "a*b", "(a|b)*c", "a+b?", "[a-c]+", "[^a ]+", "x(ab|a)*y?", "a{2,3}",
+            "(ab){1,2}c?", "c{2}|b", ".b", "a.*c", "(a|ab)(c|bcd)", "[0-9]+-[0-9]{2}", "(x|y|z)+"]
+_rng = random.Random(7)
+TEXTS = ["", "abcbcd", "aab aaab", "12-34 1-2"] + [
+    "".join(_rng.choice("abcdxyz0-1 \n") for _ in range(_rng.randint(1, 30))) for _ in range(40)]
+
+
+def compiled(pattern, **options):
+    regex = RegexLib()
+    regex.compile(pattern, **options)
+    return regex
+
+
+def reference(pattern):
+    return compiled(pattern, shift_and=False)
+
+
+def assert_agrees(regex, expected, texts=TEXTS):
+    for text in texts:
+        matches = expected.findall(text)
+        assert regex.findall(text) == matches, text
+        for candidate in set(matches) | {text, text[:3]}:
+            assert regex.match(candidate) == expected.match(candidate), candidate
+        assert regex.sub("<>", text) == expected.sub("<>", text), text
+        assert regex.split(text) == expected.split(text), text
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_dfa_matches_every_substring_re_accepts(pattern):
+    regex = reference(pattern)
+    oracle = re.compile(pattern)
+    for text in TEXTS:
+        substrings = [text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)
+                      if oracle.fullmatch(text, i, j)]
+        assert regex.findall(text) == substrings, text
+
+
+@pytest.mark.parametrize("engine", ["lazy_dfa", "nfa"])
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_simulations_agree_with_dfa(pattern, engine):
+    regex = compiled(pattern, engine=engine)
+    assert regex.engine == engine
+    assert_agrees(regex, reference(pattern))
+
+
+@pytest.mark.parametrize("fallback", ["lazy_dfa", "nfa"])
+def test_budget_fallback_agrees_with_dfa(fallback):
+    pattern = "(a|b)*a(a|b){4}"
+    regex = compiled(pattern, budget=CompileBudget(max_dfa_states=4), fallback=fallback)
+    assert regex.engine == fallback
+    assert regex.stats.fallback_reason
+    assert_agrees(regex, reference(pattern))
+
+# Without '.' and negated sets, which only cover printable ASCII outside byte mode
+UNICODE_PATTERNS = ["é+", "[à-ü]x?", "日本|本語", "é[a-z]*", "(ä|ö)*ü"]
+UNICODE_TEXTS = ["", "ééa é", "àxüx ÿ", "日本語の本語", "aäöüäü ö", "xé日é"]
+
+
+@pytest.mark.parametrize("pattern", UNICODE_PATTERNS)
+def test_byte_mode_agrees_with_dfa_over_utf8(pattern):
+    regex = compiled(pattern, byte_mode=True)
+    expected = reference(pattern)
+    for text in UNICODE_TEXTS:
+        data = text.encode("utf-8")
+        assert regex.findall(data) == [match.encode("utf-8") for match in expected.findall(text)], text
+        assert regex.sub("-", data) == expected.sub("-", text).encode("utf-8"), text
+        spans = [(char_start, char_end) for _, _, char_start, char_end in regex.finditer_bytes(data, True)]
+        assert [text[start:end] for start, end in spans] == expected.findall(text), text
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_codegen_agrees_with_dfa(pattern):
+    regex = compiled(pattern, codegen=True)
+    assert regex.engine == "dfa_codegen"
+    assert_agrees(regex, reference(pattern))
+
+
+@pytest.mark.parametrize("full_line", [False, True])
+@pytest.mark.parametrize("pattern", PATTERNS + ["^ab", "b$", "\\bab\\b"])
+def test_line_matcher_agrees_with_dfa_per_line(pattern, full_line):
+    regex = reference(pattern)
+    buffer = "\n".join(TEXTS)
+    expected = []
+    start = 0
+    for number, line in enumerate(buffer.split("\n"), 1):
+        if line and (regex.match(line) if full_line else regex.findall(line)):
+            expected.append((number, start, start + len(line)))
+        start += len(line) + 1
+    assert list(regex.match_lines(buffer, full_line)) == expected
+
+
+def test_fragment_cache_agrees_with_dfa():
+    # Shared subtrees and, on the second pass, whole DFAs are served from the cache
+    cache = FragmentCache(min_fragment_size=1)
+    for pattern in PATTERNS + [f"({pattern})x" for pattern in PATTERNS] + PATTERNS:
+        regex = RegexLib(fragment_cache=cache)
+        regex.compile(pattern)
+        assert_agrees(regex, reference(pattern))
+    assert regex.stats.reuse_ratio == 1.0
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_derivatives_agree_with_dfa(pattern):
+    regex = compiled(pattern, derivatives=True)
+    assert regex.engine == "derivative"
+    assert_agrees(regex, reference(pattern))
+
+
+def substrings_where(accepts, text):
+    return [text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1) if accepts(text[i:j])]
+
+
+@pytest.mark.parametrize("left, right", [("[a-c]+", "(a|b)*c"), ("a.*", ".*c"), ("(ab)*", "a(ba)*b")])
+def test_derivative_intersection_and_complement(left, right):
+    first, second = reference(left), reference(right)
+    both = compiled(f"({left})&({right})", derivatives=True)
+    outside = compiled(f"~({left})", derivatives=True)
+    for text in TEXTS:
+        assert both.findall(text) == substrings_where(lambda s: first.match(s) and second.match(s), text), text
+        assert outside.findall(text) == substrings_where(lambda s: not first.match(s), text), text
+
+
+@pytest.mark.parametrize("byte_mode", [False, True])
+def test_shared_tables_agree_with_dfa(byte_mode):
+    cases = [(pattern, TEXTS) for pattern in PATTERNS + ["^ab", "b$", "\\bab\\b"]]
+    if byte_mode:
+        cases += [(pattern, UNICODE_TEXTS) for pattern in UNICODE_PATTERNS]
+    with SharedTableRegistry() as registry:
+        for pattern, texts in cases:
+            name = registry.publish(pattern, byte_mode)
+            table = attach(name)
+            expected = reference(pattern)
+            try:
+                for text in texts:
+                    matches = table.findall(text)
+                    if byte_mode:
+                        matches = [match.decode("utf-8") for match in matches]
+                    assert matches == expected.findall(text), text
+                    assert table.match(text[:3]) == expected.match(text[:3]), text
+            finally:
+                detach(name)
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_unoptimized_nfa_gives_the_same_dfa(pattern):
+    regex = compiled(pattern, shift_and=False, optimize=False)
+    expected = reference(pattern)
+    assert regex.stats.optimized_nfa_states is None
+    assert expected.stats.optimized_nfa_states <= expected.stats.nfa_states
+    assert regex.stats.min_dfa_states == expected.stats.min_dfa_states
+    assert_agrees(regex, expected)
+
+ANCHORED_PATTERNS = ["^ab", "b$", "\\bab\\b", "\\Aa+", "a+\\z", "\\Ba", "(^|x)a", "a(\\b|c)", "^[a-c]+$", "(a$|b)+",
+                     "\\b[a-z]+\\b", "a\\B"]
+ANCHORED_TEXTS = ["ab\nab", "ab ab_ab", "\n\nb\n", "xa xab"] + [
+    "".join(_rng.choice("abcx_ \n") for _ in range(_rng.randint(1, 20))) for _ in range(30)]
+
+
+@pytest.mark.parametrize("pattern", ANCHORED_PATTERNS)
+def test_assertions_match_where_re_asserts(pattern):
+    # re with MULTILINE reads ^ and $ as line starts and ends; the lookbehind pins the match end
+    regex = reference(pattern)
+    translated = pattern.replace("\\z", "\\Z")
+    for text in ANCHORED_TEXTS:
+        substrings = [text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)
+                      if re.compile(rf"(?:{translated})(?<=\A[\s\S]{{{j}}})", re.M | re.A).match(text, i)]
+        assert regex.findall(text) == substrings, text
+        assert regex.dfa_min.findall(text) == substrings, text
+
+
+def edits(word, alphabet):
+    # Every string one deletion, substitution or insertion away from word
+    for i in range(len(word) + 1):
+        if i < len(word):
+            yield word[:i] + word[i + 1:]
+            for symbol in alphabet:
+                yield word[:i] + symbol + word[i + 1:]
+        for symbol in alphabet:
+            yield word[:i] + symbol + word[i:]
+
+
+@pytest.mark.parametrize("pattern", ["abc", "a(b|c)*d", "(ab)+", "a?b{2}c"])
+def test_fuzzy_match_finds_the_nearest_matching_string(pattern):
+    regex = reference(pattern)
+    for word in ["", "abc", "acb", "abbd", "abab", "bbc", "xbcd", "aacd"]:
+        nearest, frontier = None, {word}
+        for cost in range(3):
+            if any(regex.match(candidate) for candidate in frontier):
+                nearest = cost
+                break
+            frontier = {near for candidate in frontier for near in edits(candidate, "abcdx")}
+        assert regex.fuzzy_match(word, 2) == nearest, word
+
+
+# The last two have too many positions for one follow table and step through reach()
+@pytest.mark.parametrize("pattern", PATTERNS + ["(a|b|c)*(ab|ba|cc)(a|b)(c|x)(a|b)(x|y)c", "(abc|bca|cab|xyz)+(a|b)"])
+def test_shift_and_agrees_with_dfa(pattern):
+    regex = compiled(pattern, shift_and=True)
+    assert regex.engine == "shift_and"
+    assert_agrees(regex, reference(pattern))
+    assert regex.dfa_min is not None  # Built on first use for the DFA-only methods
+    assert regex.recover_regex()
+
+
+@pytest.mark.parametrize("pattern", PATTERNS + ANCHORED_PATTERNS)
+def test_planned_engine_agrees_with_dfa(pattern):
+    regex = compiled(pattern, engine="auto")
+    assert regex.plan is not None and regex.engine == regex.plan.engine
+    texts = ANCHORED_TEXTS if pattern in ANCHORED_PATTERNS else TEXTS
+    assert_agrees(regex, reference(pattern), texts)
+
+
+@pytest.mark.parametrize("pattern", ["(a|b|c)*(ab|ba|cc)(a|b)(c|x)(a|b)(x|y)c", "(abc|bca|cab|xyz)+(a|b)"])
+def test_planner_picks_a_simulation_over_budget(pattern):
+    regex = compiled(pattern, engine="auto", budget=CompileBudget(max_dfa_states=1))
+    assert regex.engine in ("lazy_dfa", "nfa")
+    assert_agrees(regex, reference(pattern))
+
+WORD_LISTS = [["ab", "ba"], ["a", "ab", "abc", "bc", "c"], ["he", "she", "his", "hers"], ["x", "xx", "xxx"],
+              ["abcx", "bcx", "cx", "x0", "0-1"]]
+
+
+@pytest.mark.parametrize("words", WORD_LISTS)
+def test_aho_corasick_agrees_with_dfa(words):
+    pattern = "|".join(words)
+    regex = compiled(pattern)
+    assert regex.engine == "aho_corasick"
+    texts = TEXTS + ["ushers his", "xxxx x", "abcxbcx0-1"]
+    assert_agrees(regex, reference(pattern), texts)
+    assert_agrees(compiled(pattern, engine="aho_corasick"), reference(pattern), texts)
+
+# Negated sets are left out, as outside byte mode they only cover printable ASCII
+CASELESS_PATTERNS = ["abc", "[a-c]+", "é+x", "(Ab|bA)*C", "k", "s+", "straße", "[A-Z]x"]
+CASELESS_TEXTS = ["ABC abc AbC", "ÉéX", "KkK", "sSſ", "STRASSE straße STRAẞE"] + [
+    "".join(_rng.choice("aAbBcCxX kKKsSſéÉ") for _ in range(_rng.randint(1, 15))) for _ in range(30)]
+
+
+@pytest.mark.parametrize("options", [{"shift_and": False}, {"shift_and": True}, {"derivatives": True},
+                                     {"byte_mode": True}])
+@pytest.mark.parametrize("pattern", CASELESS_PATTERNS)
+def test_ignorecase_matches_where_re_ignores_case(pattern, options):
+    regex = compiled(pattern, ignorecase=True, **options)
+    byte_mode = options.get("byte_mode", False)
+    oracle = re.compile(pattern, re.IGNORECASE)
+    for text in CASELESS_TEXTS:
+        substrings = [text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)
+                      if oracle.fullmatch(text, i, j)]
+        if byte_mode:
+            assert regex.findall(text.encode("utf-8")) == [match.encode("utf-8") for match in substrings], text
+        else:
+            assert regex.findall(text) == substrings, text
@@ -0,0 +1,65 @@
+# tests/test_grep.py
+"""
+grep must print the lines a per-line findall finds, in file order, however the
+search is spread over workers.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lib.regex_lib import RegexLib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATTERN = "ab+c|x[0-9]"
+
+
+def run_grep(*args):
+    result = subprocess.run([sys.executable, "-m", "lib.grep", *args], cwd=ROOT, capture_output=True, check=False)
+    return result.returncode, result.stdout.decode("utf-8")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(40):
+        folder = tmp_path / f"dir{i % 3}"
+        folder.mkdir(exist_ok=True)
+        lines = [f"line {j} " + ("abbc" if (i + j) % 7 == 0 else "") + ("x5" if (i * j) % 11 == 3 else "")
+                 for j in range(30)]
+        (folder / f"file{i:02}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return tmp_path
+
+
+def expected_output(root):
+    regex = RegexLib()
+    regex.compile(PATTERN)
+    output = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(folder, name)
+            with open(path, encoding="utf-8") as file:
+                for number, line in enumerate(file.read().split("\n")[:-1], 1):
+                    if regex.findall(line):
+                        output.append(f"{path}:{number}:{line}\n")
+    return "".join(output)
+
+
+@pytest.mark.parametrize("workers", [["-j", "1"], ["-j", "3", "--threads"], ["-j", "2"]])
+def test_grep_prints_matching_lines_in_file_order(tree, workers):
+    status, output = run_grep("-n", *workers, PATTERN, str(tree))
+    assert status == 0
+    assert output == expected_output(str(tree))
+    assert output.count("\n") > 40
+
+
+def test_grep_counts_per_file(tree):
+    _, output = run_grep("-c", "-j", "2", PATTERN, str(tree))
+    counts = {}
+    for line in expected_output(str(tree)).splitlines():
+        path = line.split(":", 1)[0]
+        counts[path] = counts.get(path, 0) + 1
+    for line in output.splitlines():
+        path, count = line.rsplit(":", 1)
+        assert int(count) == counts.get(path, 0), path
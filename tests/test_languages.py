@@ -0,0 +1,47 @@
+# tests/test_languages.py
+"""
+Language-level results of the minimized DFA: recovered regexes and the product
+operations are checked against the DFAs they come from, string by string.
+"""
+from itertools import product
+
+import pytest
+
+from lib.regex_lib import RegexLib
+
+PATTERNS = ["a", "abc", "a|b", "ab|ba", "a*b", "(a|b)*c", "a+b?", "[a-c]+", "x(ab|a)*y?", "a{2,3}",
+            "(ab){1,2}c?", "c{2}|b", "(a|ab)(c|bcd)", "(a|b)*a(a|b){2}", "((ab)*|c)+"]
+WORDS = ["".join(letters) for length in range(5) for letters in product("abcdy", repeat=length)]
+
+
+def dfa_of(pattern):
+    regex = RegexLib()
+    regex.compile(pattern, shift_and=False)
+    return regex.dfa_min
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_recovered_regex_has_the_same_language(pattern):
+    regex = RegexLib()
+    regex.compile(pattern, shift_and=False)
+    recovered = regex.recover_regex()
+    dfa = dfa_of(recovered)
+    assert dfa.is_equivalent(regex.dfa_min), recovered
+    assert [word for word in WORDS if dfa.match(word)] == [word for word in WORDS if regex.match(word)], recovered
+
+
+@pytest.mark.parametrize("left, right", [("(a|b)*c", "a*b*c"), ("[a-c]+", "a+b?"), ("(ab)*", "((ab)*|c)+"),
+                                         ("a{2,3}", "a+"), ("abc", "x(ab|a)*y?")])
+def test_product_operations_agree_word_by_word(left, right):
+    first, second = dfa_of(left), dfa_of(right)
+    operations = [(first.intersect(second), lambda a, b: a and b), (first.union(second), lambda a, b: a or b),
+                  (first.difference(second), lambda a, b: a and not b)]
+    for dfa, combine in operations:
+        for word in WORDS:
+            assert dfa.match(word) == combine(first.match(word), second.match(word)), word
+    differing = [word for word in WORDS if first.match(word) != second.match(word)]
+    counterexample = first.find_counterexample(second)
+    if differing:
+        assert counterexample is not None and len(counterexample) <= len(differing[0])
+        assert first.match(counterexample) != second.match(counterexample)
+    assert first.is_subset(second) == all(second.match(word) for word in WORDS if first.match(word))
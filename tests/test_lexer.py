@@ -0,0 +1,32 @@
+# tests/test_lexer.py
+"""
+scan() and get_token() share one set of rules, so they must lex every pattern,
+valid or not, into the same tokens.
+"""
+import random
+
+import pytest
+
+from lib.lexer import Lexer
+from lib.token import TokenType
+
+SYMBOLS = ["a", "b", "1", "23", "\\", "\\b", "\\A", "\\1", "(", "(?:", "(:", ")", "[", "]", "^", "-", "$", "|",
+           "*", "+", "?", "{", "}", ",", ".", "&", "~", " "]
+
+
+def one_by_one(lexer):
+    tokens = []
+    while True:
+        token = lexer.get_token()
+        tokens.append((token.type, token.value, token.position))
+        if token.type == TokenType.END:
+            return tokens
+
+
+@pytest.mark.parametrize("extended", [False, True])
+def test_scan_gives_the_tokens_of_get_token(extended):
+    rng = random.Random(13)
+    for _ in range(2000):
+        pattern = "".join(rng.choice(SYMBOLS) for _ in range(rng.randint(0, 12)))
+        scanned = [(token.type, token.value, token.position) for token in Lexer(pattern, extended).tokenize()]
+        assert scanned == one_by_one(Lexer(pattern, extended)), pattern
@@ -0,0 +1,77 @@
+# tests/test_pattern.py
+"""
+Patterns are immutable, pickle into Patterns that match the same, and give the
+results RegexLib gives for the same options.
+"""
+import pickle
+
+import pytest
+
+from lib.pattern import compile, compile_many, map_match
+from lib.regex_lib import RegexLib
+
+TEXTS = ["", "abcc ab", "aabccc foo", "barfoo ccc", "xfoxbar"]
+OPTIONS = [{}, {"shift_and": False}, {"codegen": True}, {"engine": "lazy_dfa"}, {"engine": "nfa"},
+           {"derivatives": True}, {"shift_and": True}]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_pickled_pattern_matches_like_regex_lib(options):
+    pattern = "(a|b)*c{2,3}|foo"
+    compiled = compile(pattern, **options)
+    regex = RegexLib()
+    regex.compile(pattern, **options)
+    loaded = pickle.loads(pickle.dumps(compiled))
+    assert loaded.engine == compiled.engine == regex.engine
+    for text in TEXTS:
+        assert loaded.findall(text) == compiled.findall(text) == regex.findall(text), text
+        assert loaded.sub("-", text) == compiled.sub("-", text) == regex.sub("-", text), text
+
+
+def test_literal_alternations_pickle_with_their_trie():
+    compiled = compile("foo|bar|baz")
+    assert compiled.engine == "aho_corasick"
+    loaded = pickle.loads(pickle.dumps(compiled))
+    assert loaded.findall("barfoo bazbar") == ["bar", "foo", "baz", "bar"]
+
+
+def test_pattern_stats_and_table_are_read_only():
+    compiled = compile("ab+c", shift_and=False)
+    with pytest.raises(AttributeError):
+        compiled.engine = "nfa"
+    with pytest.raises(AttributeError):
+        compiled.stats.engine = "nfa"
+    with pytest.raises(TypeError):
+        compiled.stats.phase_times["lex"] = 0.0
+    with pytest.raises(AttributeError):
+        compiled.table.start = 1
+    with pytest.raises(TypeError):
+        compiled.table.transitions[0]["b"] = 0
+    assert pickle.loads(pickle.dumps(compiled.stats)).phase_times == compiled.stats.phase_times
+
+
+def test_table_is_built_on_first_use_for_the_fast_engines():
+    compiled = compile("ab+c")
+    assert compiled.engine == "shift_and"
+    assert "".join(compiled.sub_stream("-", ["xa", "bbcab", "c"])) == "x--"
+
+
+def test_map_match_agrees_with_findall():
+    compiled = compile("(a|b)*c{2,3}")
+    items = [text * count for text in TEXTS for count in range(3)]
+    assert map_match(compiled, items, workers=4, batch_size=2, method="findall") == \
+        [compiled.findall(item) for item in items]
+
+
+def test_compile_many_keeps_order_and_reports_errors():
+    patterns = ["a+b", "(x", "foo|bar", "[a-c]*c", "a{3,2}", "(ab)+"] * 3
+    results = compile_many(patterns, workers=2, batch_size=4, shift_and=False)
+    assert [result.pattern for result in results] == patterns
+    for result in results:
+        if result.pattern in ("(x", "a{3,2}"):
+            assert not result.ok and result.compiled is None
+            continue
+        assert result.ok and result.compiled.engine == "dfa"
+        expected = compile(result.pattern)
+        for text in TEXTS:
+            assert result.compiled.findall(text) == expected.findall(text), text
@@ -0,0 +1,160 @@
+# tests/test_streaming.py
+"""
+Streaming must not depend on where the input is cut. Each streaming API is fed
+the texts in every two-piece split, one symbol at a time and in random chunk
+sizes, and must give what its whole-input counterpart gives.
+"""
+import asyncio
+import random
+
+import pytest
+
+from lib.regex_lib import RegexLib
+from lib.stream_scanner import StreamScanner
+from lib.async_scan import scan_stream
+from lib.tokenizer import Tokenizer
+from lib.errors import RegexError, TokenizeError
+
+PATTERNS = ["ab", "a+", "(ab|ba)*c", "x[0-9]{2,3}", "aa?b", "[a-c]+x?", "(a|b)*c{2,3}"]
+_rng = random.Random(11)
+TEXTS = ["", "ab", "aaab bab", "x12x1234 x9", "ababbac ccabc"] + [
+    "".join(_rng.choice("abcx0123 ") for _ in range(_rng.randint(1, 24))) for _ in range(20)]
+
+
+def compiled(pattern, **options):
+    regex = RegexLib()
+    regex.compile(pattern, shift_and=False, **options)
+    return regex
+
+
+def chunkings(text, seed=0):
+    # The whole text, every split into two pieces, single symbols and random sizes
+    yield [text]
+    for cut in range(len(text) + 1):
+        yield [text[:cut], text[cut:]]
+    yield [text[i:i + 1] for i in range(len(text))]
+    rng = random.Random(seed)
+    for _ in range(3):
+        chunks, i = [], 0
+        while i < len(text):
+            size = rng.randint(0, 4)  # Empty chunks included
+            chunks.append(text[i:i + size])
+            i += size
+        yield chunks
+
+
+def all_spans(regex, text):
+    # Every (start, end) of a non-empty match, ordered by end as StreamScanner reports them
+    return sorted(((i, j) for i in range(len(text)) for j in range(i + 1, len(text) + 1)
+                   if regex.match(text[i:j])), key=lambda span: (span[1], span[0]))
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_stream_scanner_ignores_chunk_boundaries(pattern):
+    regex = compiled(pattern)
+    for text in TEXTS:
+        expected = all_spans(regex, text)
+        for chunks in chunkings(text):
+            scanner = StreamScanner(regex.dfa_min)
+            found = [match for chunk in chunks for match in scanner.feed(chunk)]
+            assert [(start, end) for start, end, _ in found] == expected, chunks
+            assert all(matched == text[start:end] for start, end, matched in found), chunks
+
+
+async def _scan(regex, chunks):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+    return [match async for match in scan_stream(regex, source())]
+
+
+def test_scan_stream_decodes_characters_cut_between_chunks():
+    regex = compiled("é+|日本")
+    text = "aéé 日本é"
+    data = text.encode("utf-8")
+    expected = all_spans(regex, text)
+    for chunks in chunkings(data):
+        found = asyncio.run(_scan(regex, chunks))
+        assert [(start, end) for start, end, _ in found] == expected, chunks
+
+
+RULES = [("if", "if"), ("name", "[a-z]+"), ("number", "[0-9]+(\\.[0-9]+)?"), ("op", "<|<=|=|=="), ("dot", "\\."),
+         ("space", " +")]
+# "1." and "2.." make the number rule back off to a shorter token
+SOURCES = ["if x<=10 ifs", "a==b=c", "1.5 1 12.25if", "1.x 2..3", "", "   ", "iff if i"]
+
+
+def munch(text):
+    # Maximal munch with one compiled regex per rule: longest token, earliest rule on ties
+    rules = [(name, compiled(pattern)) for name, pattern in RULES]
+    tokens, position = [], 0
+    while position < len(text):
+        ends = [(rule.matcher.longest_match(text, position) or 0, -index, name)
+                for index, (name, rule) in enumerate(rules)]
+        end, _, name = max(ends)
+        assert end, f"no rule at {position}"
+        if name != "space":
+            tokens.append((name, text[position:end], position))
+        position = end
+    return tokens
+
+
+def test_tokens_are_the_maximal_munch_whatever_the_chunks():
+    tokenizer = Tokenizer(RULES, skip={"space"})
+    for text in SOURCES:
+        expected = munch(text)
+        assert tokenizer.tokenize(text) == expected
+        for chunks in chunkings(text):
+            assert list(tokenizer.iter_tokens(chunks)) == expected, chunks
+
+
+def test_tokenize_error_position_does_not_depend_on_the_chunks():
+    tokenizer = Tokenizer(RULES, skip={"space"})
+    text = "x = 1.5 # comment"
+    for chunks in chunkings(text):
+        with pytest.raises(TokenizeError) as error:
+            list(tokenizer.iter_tokens(chunks))
+        assert error.value.position == text.index("#"), chunks
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_sub_and_split_streams_ignore_chunk_boundaries(pattern):
+    regex = compiled(pattern)
+    for text in TEXTS:
+        for chunks in chunkings(text):
+            assert "".join(regex.sub_stream("<>", chunks)) == regex.sub("<>", text), chunks
+            assert "".join(regex.sub_stream(str.upper, chunks, count=2)) == regex.sub(str.upper, text, 2), chunks
+            assert list(regex.split_stream(chunks)) == regex.split(text), chunks
+            assert list(regex.split_stream(chunks, maxsplit=1)) == regex.split(text, 1), chunks
+
+
+def test_byte_mode_sub_stream_cuts_inside_characters():
+    regex = compiled("é+|日本", byte_mode=True)
+    data = "aéé 日本é".encode("utf-8")
+    for chunks in chunkings(data):
+        assert b"".join(regex.sub_stream("-", chunks)) == "a- -".encode("utf-8") + b"-", chunks
+
+
+def test_max_held_stops_an_attempt_that_never_ends():
+    regex = compiled("a.*b")
+    chunks = ["xa"] + ["aaaa"] * 10
+    with pytest.raises(RegexError):
+        list(regex.sub_stream("-", chunks, max_held=16))
+    assert "".join(regex.sub_stream("-", chunks + ["b"], max_held=64)) == "x-"
+
+
+@pytest.mark.parametrize("interval", [1, 3, 16])
+@pytest.mark.parametrize("pattern", PATTERNS + ["a.*b"])
+def test_incremental_matches_follow_edits(pattern, interval):
+    regex = compiled(pattern)
+    rng = random.Random(interval)
+    text = "".join(rng.choice("abcx01 ") for _ in range(60))
+    matcher = regex.incremental(text, interval)
+    for _ in range(40):
+        offset = rng.randint(0, len(text))
+        deleted = rng.randint(0, min(5, len(text) - offset))
+        inserted = "".join(rng.choice("abcx01 ") for _ in range(rng.randint(0, 5)))
+        matcher.edit(offset, deleted, inserted)
+        text = text[:offset] + inserted + text[offset + deleted:]
+        assert matcher.text == text
+        assert matcher.findall() == regex.findall(text), (offset, deleted, inserted)